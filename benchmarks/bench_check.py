@@ -0,0 +1,38 @@
+"""Throughput of link checks."""
+
+import pytest
+
+from ckan.tests.helpers import call_action
+
+from ckanext.check_link import processing
+
+OPTIONS = {"save": False, "clear_available": False, "skip_invalid": True, "link_patch": {"timeout": 5}}
+
+
+@pytest.mark.usefixtures("with_plugins")
+def test_url_check(farm, recorder, size):
+    urls = farm.urls(size)
+
+    with recorder.measure("url_check", size) as m:
+        for batch in processing.batches(urls, processing.batch_size()):
+            m.links += len(call_action("check_link_url_check", url=batch, link_patch={"timeout": 5}))
+
+
+@pytest.mark.usefixtures("with_plugins")
+def test_search_check(portal, recorder, size):
+    with recorder.measure("search_check", size) as m:
+        m.links = len(call_action("check_link_search_check", rows=len(portal), skip_invalid=True))
+
+
+@pytest.mark.usefixtures("with_plugins")
+def test_pipeline(portal, recorder, size):
+    with recorder.measure("pipeline_save", size) as m:
+
+        def on_checked(rows, reports):
+            m.links += len(reports)
+
+        processing.Pipeline(
+            {"ignore_auth": True},
+            dict(OPTIONS, save=True),
+            on_checked=on_checked,
+        ).run(processing.batches(portal, processing.batch_size()))
@@ -0,0 +1,26 @@
+"""Throughput of CLI commands."""
+
+import pytest
+from click.testing import CliRunner
+
+from ckanext.check_link.cli import check_link
+
+
+@pytest.mark.usefixtures("with_plugins")
+@pytest.mark.parametrize("batch_size", [1, 100])
+def test_check_resources(portal, recorder, size, batch_size):
+    with recorder.measure(f"cli_check_resources_batch_{batch_size}", size) as m:
+        result = CliRunner().invoke(check_link, ["check-resources", "--batch-size", str(batch_size)])
+        m.links = len(portal)
+
+    assert result.exit_code == 0, result.output
+
+
+@pytest.mark.usefixtures("with_plugins")
+@pytest.mark.parametrize("workers", [1, 4])
+def test_check_packages(portal, recorder, size, workers):
+    with recorder.measure(f"cli_check_packages_workers_{workers}", size) as m:
+        result = CliRunner().invoke(check_link, ["check-packages", "--chunk", "10", "--workers", str(workers)])
+        m.links = len(portal)
+
+    assert result.exit_code == 0, result.output
@@ -0,0 +1,50 @@
+"""Throughput of report storage and search."""
+
+import pytest
+
+from ckan.tests.helpers import call_action
+
+from ckanext.check_link import processing
+
+STATES = ["available", "missing", "error", "timeout", "moved"]
+
+
+def _reports(portal):
+    return [
+        {"url": url, "state": STATES[idx % len(STATES)], "resource_id": resource_id, "package_id": package_id}
+        for idx, (resource_id, package_id, url) in enumerate(portal)
+    ]
+
+
+@pytest.mark.usefixtures("with_plugins")
+def test_save_reports(portal, recorder, size):
+    reports = _reports(portal)
+
+    with recorder.measure("save_reports", size) as m:
+        for batch in processing.batches(reports, processing.batch_size()):
+            processing.save_reports({"ignore_auth": True}, batch, clear=False)
+            m.links += len(batch)
+
+
+@pytest.mark.usefixtures("with_plugins")
+def test_report_search(portal, recorder, size):
+    processing.save_reports({"ignore_auth": True}, _reports(portal), clear=False)
+    pages = 20
+
+    with recorder.measure("report_search", size) as m:
+        for page in range(pages):
+            result = call_action(
+                "check_link_report_search",
+                exclude_state=["available"],
+                limit=100,
+                offset=page * 100,
+            )
+            m.links += len(result["results"])
+
+
+@pytest.mark.usefixtures("with_plugins")
+def test_bulk_delete(portal, recorder, size):
+    processing.save_reports({"ignore_auth": True}, _reports(portal), clear=False)
+
+    with recorder.measure("bulk_delete", size) as m:
+        m.links = call_action("check_link_report_bulk_delete", batch_size=1000)["deleted"]
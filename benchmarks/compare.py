@@ -0,0 +1,64 @@
+"""Compare two benchmark result files.
+
+Usage:
+
+    python benchmarks/compare.py benchmarks/results/0.3.1-*.json benchmarks/results/0.4.0-*.json
+
+The exit code is non-zero if throughput of any benchmark dropped by more than
+the threshold. Files produced with `--bench-memory` contain only peak memory,
+so compare them with each other.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+
+def _load(path: str) -> dict[tuple[str, int], dict[str, Any]]:
+    data = json.loads(Path(path).read_text())
+    return {(r["name"], r["size"]): r for r in data["results"]}
+
+
+def _change(old: float | None, new: float | None) -> float | None:
+    if not old or new is None:
+        return None
+    return (new - old) / old * 100
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline", help="Results of the previous release")
+    parser.add_argument("current", help="Results of the current version")
+    parser.add_argument("-t", "--threshold", type=float, default=10, help="Allowed throughput drop, percents")
+    args = parser.parse_args()
+
+    baseline = _load(args.baseline)
+    current = _load(args.current)
+
+    regressions = 0
+    print(f"{'benchmark':<40} {'size':>8} {'links/s':>12} {'change':>9} {'peak KB':>10} {'change':>9}")  # noqa: T201
+    for key in sorted(baseline.keys() & current.keys()):
+        old, new = baseline[key], current[key]
+        speed = _change(old["links_per_second"], new["links_per_second"])
+        memory = _change(old["peak_memory_kb"], new["peak_memory_kb"])
+        if speed is not None and speed < -args.threshold:
+            regressions += 1
+
+        print(  # noqa: T201
+            f"{key[0]:<40} {key[1]:>8} {new['links_per_second'] or 0:>12.1f} "
+            f"{'' if speed is None else f'{speed:+.1f}%':>9} {new['peak_memory_kb'] or 0:>10} "
+            f"{'' if memory is None else f'{memory:+.1f}%':>9}"
+        )
+
+    if regressions:
+        print(f"{regressions} benchmark(s) slowed down by more than {args.threshold}%")  # noqa: T201
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
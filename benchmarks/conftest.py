@@ -0,0 +1,228 @@
+"""Fixtures of the benchmark suite.
+
+Benchmarks are regular pytest tests collected from `bench_*.py` files. They
+require the same environment as the test suite (CKAN test database and Solr)
+and are executed only when requested explicitly:
+
+    pytest benchmarks/bench_*.py --bench-sizes 1000,10000
+
+Every benchmark records the number of processed links and elapsed time.
+Tracing of allocations slows the code down, so the peak memory is measured in
+a separate run with `--bench-memory`, that does not record time. Results are
+written into the JSON file at the end of the session.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import json
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from importlib.metadata import version
+from pathlib import Path
+from typing import Any
+
+import pytest
+import sqlalchemy as sa
+
+from ckan import model
+from ckan.lib import search
+from ckan.model.types import make_uuid
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from farm import Farm, FarmConfig  # noqa: E402
+
+RESOURCES_PER_PACKAGE = 10
+
+
+def pytest_addoption(parser: pytest.Parser):
+    group = parser.getgroup("check-link benchmarks")
+    group.addoption("--bench-sizes", default="1000", help="Comma-separated sizes of synthetic portals")
+    group.addoption("--bench-output", default=None, help="Path to the JSON file with results")
+    group.addoption("--bench-memory", action="store_true", help="Measure peak memory instead of time")
+    group.addoption("--farm-hosts", type=int, default=FarmConfig.hosts, help="Number of simulated hosts")
+    group.addoption("--farm-latency", type=float, default=FarmConfig.latency, help="Response latency, seconds")
+    group.addoption("--farm-error-rate", type=float, default=FarmConfig.error_rate, help="Share of error responses")
+    group.addoption("--farm-redirect-rate", type=float, default=FarmConfig.redirect_rate, help="Share of redirects")
+    group.addoption("--farm-slow-rate", type=float, default=FarmConfig.slow_rate, help="Share of slow bodies")
+    group.addoption("--farm-dead-rate", type=float, default=FarmConfig.dead_rate, help="Share of dead ports")
+
+
+def pytest_generate_tests(metafunc: pytest.Metafunc):
+    if "size" in metafunc.fixturenames:
+        sizes = [int(size) for size in metafunc.config.getoption("bench_sizes").split(",")]
+        metafunc.parametrize("size", sizes, ids=[f"{size}" for size in sizes], scope="module")
+
+
+@dataclasses.dataclass
+class Measurement:
+    name: str
+    size: int
+    links: int = 0
+    seconds: float = 0
+    peak_memory_kb: int | None = None
+    max_rss_kb: int = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        data = dataclasses.asdict(self)
+        data["links_per_second"] = round(self.links / self.seconds, 2) if self.seconds else None
+        return data
+
+
+class Recorder:
+    """Collection of benchmark measurements.
+
+    Args:
+        memory: Trace allocations of measured blocks instead of timing them
+    """
+
+    def __init__(self, memory: bool = False):
+        self.memory = memory
+        self.measurements: list[Measurement] = []
+
+    @contextlib.contextmanager
+    def measure(self, name: str, size: int) -> Iterator[Measurement]:
+        """Measure time or memory of the block.
+
+        The caller sets the number of processed links on the yielded object.
+        When allocations are traced, the time is not recorded, because the
+        tracing makes the code noticeably slower.
+
+        Args:
+            name: Name of the benchmark
+            size: Size of the synthetic portal
+
+        Yields:
+            Measurement of the block
+        """
+        measurement = Measurement(name, size)
+        if self.memory:
+            tracemalloc.start()
+
+        start = time.perf_counter()
+        try:
+            yield measurement
+        finally:
+            if self.memory:
+                measurement.peak_memory_kb = tracemalloc.get_traced_memory()[1] // 1024
+                tracemalloc.stop()
+            else:
+                measurement.seconds = round(time.perf_counter() - start, 4)
+
+            measurement.max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            self.measurements.append(measurement)
+
+    def dump(self, path: Path, farm: FarmConfig):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(
+            json.dumps(
+                {
+                    "version": version("ckanext-check-link"),
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "python": platform.python_version(),
+                    "farm": dataclasses.asdict(farm),
+                    "memory": self.memory,
+                    "results": [m.as_dict() for m in self.measurements],
+                },
+                indent=2,
+            )
+        )
+
+
+@pytest.fixture(scope="session")
+def farm_config(pytestconfig: pytest.Config) -> FarmConfig:
+    return FarmConfig(
+        hosts=pytestconfig.getoption("farm_hosts"),
+        latency=pytestconfig.getoption("farm_latency"),
+        error_rate=pytestconfig.getoption("farm_error_rate"),
+        redirect_rate=pytestconfig.getoption("farm_redirect_rate"),
+        slow_rate=pytestconfig.getoption("farm_slow_rate"),
+        dead_rate=pytestconfig.getoption("farm_dead_rate"),
+    )
+
+
+@pytest.fixture(scope="session")
+def farm(farm_config: FarmConfig) -> Iterator[Farm]:
+    with Farm(farm_config) as instance:
+        yield instance
+
+
+@pytest.fixture(scope="session")
+def recorder(pytestconfig: pytest.Config, farm_config: FarmConfig) -> Iterator[Recorder]:
+    memory = pytestconfig.getoption("bench_memory")
+    instance = Recorder(memory)
+    yield instance
+
+    output = pytestconfig.getoption("bench_output")
+    if output:
+        path = Path(output)
+    else:
+        # the folder is ignored by git
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        kind = "-memory" if memory else ""
+        path = Path(__file__).parent / "results" / f"{version('ckanext-check-link')}-{stamp}{kind}.json"
+
+    instance.dump(path, farm_config)
+
+
+@pytest.fixture()
+def _clean_db(reset_db: Any, migrate_db_for: Any):
+    reset_db()
+    migrate_db_for("check_link")
+
+
+@pytest.fixture()
+def portal(_clean_db: Any, farm: Farm, size: int) -> list[tuple[str, str, str]]:
+    """Create synthetic portal with the given number of resources.
+
+    Packages and resources are inserted with bulk statements and indexed
+    afterwards, which is much faster than creating them through actions.
+
+    Returns:
+        `(resource_id, package_id, url)` triples of created resources
+    """
+    urls = farm.urls(size)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    packages: list[dict[str, Any]] = []
+    resources: list[dict[str, Any]] = []
+    for idx, url in enumerate(urls):
+        if idx % RESOURCES_PER_PACKAGE == 0:
+            packages.append(
+                {
+                    "id": make_uuid(),
+                    "name": f"bench-{idx}",
+                    "title": f"Benchmark {idx}",
+                    "type": "dataset",
+                    "state": "active",
+                    "private": False,
+                    "metadata_created": now,
+                    "metadata_modified": now,
+                }
+            )
+        resources.append(
+            {
+                "id": make_uuid(),
+                "package_id": packages[-1]["id"],
+                "url": url,
+                "state": "active",
+                "position": idx % RESOURCES_PER_PACKAGE,
+                "created": now,
+            }
+        )
+
+    model.Session.execute(sa.insert(model.package_table), packages)
+    model.Session.execute(sa.insert(model.resource_table), resources)
+    model.Session.commit()
+
+    search.rebuild(force=True, defer_commit=True)
+    search.commit()
+
+    return [(r["id"], r["package_id"], r["url"]) for r in resources]
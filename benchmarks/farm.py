@@ -0,0 +1,172 @@
+"""Local stand-in for remote servers referenced by resources.
+
+The farm starts several HTTP servers on localhost, one per simulated host.
+The behaviour of every URL is encoded in its path:
+
+* `/ok/<n>` - 200 response;
+* `/error/<n>` - 404, 500 or 503 response;
+* `/redirect/<n>` - permanent redirect to `/ok/<n>`;
+* `/slow/<n>` - HEAD is not allowed, GET streams the body in small pieces.
+
+Every response is delayed by the configured latency. Dead hosts are ports that
+were reserved and released, so connections to them are refused.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import random
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+__all__ = ["Farm", "FarmConfig"]
+
+_ERRORS = [404, 500, 503]
+
+
+@dataclasses.dataclass
+class FarmConfig:
+    """Behaviour of the farm.
+
+    Rates define the share of generated URLs with the given behaviour. The
+    rest of URLs respond with 200.
+    """
+
+    hosts: int = 4
+    latency: float = 0.01
+    error_rate: float = 0.05
+    redirect_rate: float = 0.05
+    slow_rate: float = 0.01
+    dead_rate: float = 0.01
+    slow_chunks: int = 5
+    slow_delay: float = 0.05
+    seed: int = 42
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config: FarmConfig
+
+    def log_message(self, format: str, *args: Any):  # noqa: A002
+        pass
+
+    def do_HEAD(self):  # noqa: N802
+        self._respond(body=False)
+
+    def do_GET(self):  # noqa: N802
+        self._respond(body=True)
+
+    def _respond(self, body: bool):
+        time.sleep(self.config.latency)
+        _, kind, n = self.path.split("/", 2)
+
+        if kind == "error":
+            self._empty(_ERRORS[int(n) % len(_ERRORS)])
+
+        elif kind == "redirect":
+            self.send_response(301)
+            self.send_header("Location", f"/ok/{n}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        elif kind == "slow" and not body:
+            self._empty(405)
+
+        elif kind == "slow":
+            chunk = b"x" * 1024
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(chunk) * self.config.slow_chunks))
+            self.end_headers()
+            for _ in range(self.config.slow_chunks):
+                self.wfile.write(chunk)
+                self.wfile.flush()
+                time.sleep(self.config.slow_delay)
+
+        else:
+            self._empty(200)
+
+    def _empty(self, status: int):
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+class Farm:
+    """Collection of local HTTP servers.
+
+    Args:
+        config: Behaviour of the farm
+    """
+
+    def __init__(self, config: FarmConfig):
+        self.config = config
+        self.servers: list[ThreadingHTTPServer] = []
+        self.threads: list[threading.Thread] = []
+        self.dead_ports: list[int] = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc: object):
+        self.stop()
+
+    def start(self):
+        """Start servers and reserve dead ports."""
+        handler = type("Handler", (_Handler,), {"config": self.config})
+        for _ in range(self.config.hosts):
+            server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+            server.daemon_threads = True
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            self.servers.append(server)
+            self.threads.append(thread)
+
+        for _ in range(self.config.hosts):
+            with socket.socket() as sock:
+                sock.bind(("127.0.0.1", 0))
+                self.dead_ports.append(sock.getsockname()[1])
+
+    def stop(self):
+        """Shut down servers."""
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+        for thread in self.threads:
+            thread.join()
+
+    def urls(self, n: int) -> list[str]:
+        """Generate URLs with the configured distribution of behaviours.
+
+        The same configuration always produces the same list of URLs.
+
+        Args:
+            n: Number of URLs
+
+        Returns:
+            List of URLs
+        """
+        rng = random.Random(self.config.seed)  # noqa: S311
+        weights = {
+            "error": self.config.error_rate,
+            "redirect": self.config.redirect_rate,
+            "slow": self.config.slow_rate,
+            "dead": self.config.dead_rate,
+        }
+        weights["ok"] = max(0.0, 1 - sum(weights.values()))
+        kinds = rng.choices(list(weights), list(weights.values()), k=n)
+
+        result: list[str] = []
+        for idx, kind in enumerate(kinds):
+            if kind == "dead":
+                port = rng.choice(self.dead_ports)
+                result.append(f"http://127.0.0.1:{port}/ok/{idx}")
+            else:
+                port = rng.choice(self.servers).server_address[1]
+                result.append(f"http://127.0.0.1:{port}/{kind}/{idx}")
+
+        return result
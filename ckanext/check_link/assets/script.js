@@ -1,10 +1,92 @@
-ckan.module("check_link-module", function ($, _) {
+/*
+ * Loads the table of link check reports from the partial endpoint and swaps
+ * it on paging and filtering, without reloading the whole page.
+ *
+ * url - URL of the endpoint that renders the table and the pager
+ * loaded - whether the table is already rendered by the server
+ *
+ * Examples
+ *
+ * <div data-module="check-link-report" data-module-url="/check-link/report/global/table"></div>
+ *
+ */
+ckan.module("check-link-report", function ($) {
   "use strict";
   return {
     options: {
-      debug: false,
+      url: null,
+      loaded: false,
     },
 
-    initialize: function () {},
+    initialize: function () {
+      $.proxyAll(this, /_on/);
+      this.el.on("submit", "form", this._onSubmit);
+      this.el.on("click", "a.pagination--switch-button", this._onNavigate);
+      $(window).on("popstate", this._onPopState);
+
+      if (!this.options.loaded) {
+        this.load(window.location.search);
+      }
+    },
+
+    teardown: function () {
+      this.el.off("submit", "form", this._onSubmit);
+      this.el.off("click", "a.pagination--switch-button", this._onNavigate);
+      $(window).off("popstate", this._onPopState);
+    },
+
+    /* Fetch the table for the query string and replace the current one.
+     *
+     * search - query string with collection parameters, including `?`
+     * push - add the query string to the browser history
+     *
+     * Returns the jQuery XHR.
+     */
+    load: function (search, push) {
+      var el = this.el;
+      el.attr("aria-busy", "true");
+
+      return $.get(this.options.url + search)
+        .done(function (html) {
+          el.html(html);
+          el.find("[data-module]").each(function () {
+            ckan.module.initializeElement(this);
+          });
+
+          if (push) {
+            window.history.pushState(
+              { checkLinkReport: true },
+              "",
+              window.location.pathname + search,
+            );
+          }
+        })
+        .fail(function () {
+          // fall back to the regular navigation
+          if (push) {
+            window.location.search = search;
+          }
+        })
+        .always(function () {
+          el.removeAttr("aria-busy");
+        });
+    },
+
+    _onSubmit: function (event) {
+      event.preventDefault();
+      var query = $(event.target).serialize();
+      this.load(query ? "?" + query : "", true);
+    },
+
+    _onNavigate: function (event) {
+      event.preventDefault();
+      // links of the pager are built for the table endpoint, only their
+      // query string is used
+      this.load(new URL(event.currentTarget.href, window.location.href).search, true);
+    },
+
+    _onPopState: function () {
+      this.load(window.location.search);
+    },
   };
 });
@@ -0,0 +1,262 @@
+"""Cache of rendered report pages.
+
+Report pages render the collection of reports on every request, which is
+expensive for large portals. The rendered fragment of the page and the number
+of reports are cached under a key that combines the scope of the page
+(`global`, `package:<id>` or `organization:<id>`), the current version of the
+scope, the path of the request, the language and the filters from the query
+string. Links of the fragment, like pager links, are built for the path, so
+different endpoints never share entries.
+
+Versions are counters that are incremented whenever a report inside the scope
+is saved or deleted, so entries of the previous version are never read again
+and expire after the TTL. Changes that cannot be attributed to a scope, like
+deletion of reports by arbitrary filters, increment the shared epoch that is
+included into every key.
+
+Entries and versions are stored in Redis, so they are shared by all web
+workers, or in the memory of the current process.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from typing import Any
+
+import sqlalchemy as sa
+
+import ckan.plugins.toolkit as tk
+from ckan import model
+from ckan.lib.redis import connect_to_redis
+
+CONFIG_BACKEND = "ckanext.check_link.report.cache.backend"
+CONFIG_TTL = "ckanext.check_link.report.cache.ttl"
+
+DEFAULT_BACKEND = "redis"
+DEFAULT_TTL = 300
+
+BACKEND_REDIS = "redis"
+BACKEND_MEMORY = "memory"
+
+GLOBAL = "global"
+_EPOCH = "*"
+
+# maximal number of pages kept by the in-memory backend
+_MEMORY_SIZE = 1000
+
+__all__ = [
+    "GLOBAL",
+    "enabled",
+    "get_or_render",
+    "invalidate",
+    "invalidate_all",
+    "invalidate_resources",
+    "organization_scope",
+    "package_scope",
+    "resource_scopes",
+    "ttl",
+]
+
+
+def organization_scope(organization_id: str) -> str:
+    """Scope of the organization report page."""
+    return f"organization:{organization_id}"
+
+
+def package_scope(package_id: str) -> str:
+    """Scope of the package report page."""
+    return f"package:{package_id}"
+
+
+def enabled() -> bool:
+    """Check whether report pages are cached.
+
+    Returns:
+        True if the backend is configured and TTL is positive
+    """
+    return _backend_name() in (BACKEND_REDIS, BACKEND_MEMORY) and ttl() > 0
+
+
+def ttl() -> int:
+    """Lifetime of cached pages in seconds."""
+    return tk.asint(tk.config.get(CONFIG_TTL, DEFAULT_TTL))
+
+
+def _backend_name() -> str:
+    return tk.config.get(CONFIG_BACKEND, DEFAULT_BACKEND)
+
+
+class _MemoryBackend:
+    """Process-local storage with expiration and bounded size."""
+
+    def __init__(self, size: int = _MEMORY_SIZE):
+        self.size = size
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self.versions: dict[str, int] = {}
+
+    def get_versions(self, scopes: list[str]) -> list[int]:
+        with self.lock:
+            return [self.versions.get(scope, 0) for scope in scopes]
+
+    def bump(self, scopes: Iterable[str]):
+        with self.lock:
+            for scope in scopes:
+                self.versions[scope] = self.versions.get(scope, 0) + 1
+
+    def get(self, key: str) -> str | None:
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None:
+                return None
+
+            expires, value = item
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: int):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+
+class _RedisBackend:
+    """Storage shared by all processes of the portal."""
+
+    def _prefix(self) -> str:
+        return "ckan:{}:check_link:report_cache:".format(tk.config["ckan.site_id"])
+
+    def get_versions(self, scopes: list[str]) -> list[int]:
+        prefix = self._prefix() + "version:"
+        values = connect_to_redis().mget([prefix + scope for scope in scopes])
+        return [int(value or 0) for value in values]
+
+    def bump(self, scopes: Iterable[str]):
+        prefix = self._prefix() + "version:"
+        pipe = connect_to_redis().pipeline(transaction=False)
+        for scope in scopes:
+            pipe.incr(prefix + scope)
+        pipe.execute()
+
+    def get(self, key: str) -> str | None:
+        value = connect_to_redis().get(self._prefix() + "page:" + key)
+        return value.decode() if value is not None else None
+
+    def set(self, key: str, value: str, ttl: int):
+        connect_to_redis().setex(self._prefix() + "page:" + key, ttl, value)
+
+
+_memory = _MemoryBackend()
+_redis = _RedisBackend()
+
+
+def _backend() -> _MemoryBackend | _RedisBackend:
+    return _redis if _backend_name() == BACKEND_REDIS else _memory
+
+
+def _key(scope: str, versions: list[int], params: dict[str, Any]) -> str:
+    payload = json.dumps([scope, versions, tk.request.path, tk.h.lang(), params], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def get_or_render(scope: str, params: dict[str, Any], render: Callable[[], dict[str, Any]]) -> dict[str, Any]:
+    """Get the cached page or render and cache it.
+
+    Versions are read before rendering, so if the scope is invalidated while
+    the page is rendered, the result is stored under the outdated key and
+    never served.
+
+    Args:
+        scope: Scope of the page
+        params: Collection parameters from the request
+        render: Function that produces JSON-serializable content of the page
+
+    Returns:
+        Content of the page
+    """
+    if not enabled():
+        return render()
+
+    backend = _backend()
+    key = _key(scope, backend.get_versions([_EPOCH, scope]), params)
+
+    cached = backend.get(key)
+    if cached is not None:
+        return json.loads(cached)
+
+    content = render()
+    backend.set(key, json.dumps(content), ttl())
+    return content
+
+
+def invalidate(scopes: Iterable[str]):
+    """Invalidate cached pages of the given scopes.
+
+    Args:
+        scopes: Scopes affected by the change
+    """
+    if not enabled():
+        return
+
+    scopes = set(scopes)
+    if scopes:
+        _backend().bump(scopes)
+
+
+def invalidate_all():
+    """Invalidate every cached page."""
+    invalidate([_EPOCH])
+
+
+def invalidate_resources(resource_ids: Iterable[str | None]):
+    """Invalidate pages that may contain reports of the given resources.
+
+    The global page is always invalidated, because it contains reports of
+    all resources as well as free-standing reports. Packages and
+    organizations of resources are resolved with a single query.
+
+    Args:
+        resource_ids: IDs of resources whose reports were changed. None
+            stands for a report that is not attached to a resource
+    """
+    if not enabled():
+        return
+
+    invalidate(resource_scopes(resource_ids))
+
+
+def resource_scopes(resource_ids: Iterable[str | None]) -> set[str]:
+    """Find pages that may contain reports of the given resources.
+
+    Args:
+        resource_ids: IDs of resources. None stands for a report that is not
+            attached to a resource
+
+    Returns:
+        Global scope and scopes of packages and organizations of resources
+    """
+    scopes = {GLOBAL}
+    ids = list({id_ for id_ in resource_ids if id_})
+    if ids:
+        stmt = (
+            sa.select(model.Resource.package_id, model.Package.owner_org)
+            .join(model.Package, model.Package.id == model.Resource.package_id)
+            .where(model.Resource.id.in_(ids))
+        )
+        for package_id, owner_org in model.Session.execute(stmt):
+            scopes.add(package_scope(package_id))
+            if owner_org:
+                scopes.add(organization_scope(owner_org))
+
+    return scopes
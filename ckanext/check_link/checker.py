@@ -0,0 +1,357 @@
+"""Link checker that records timings of requests.
+
+`TimedChecker` extends the checker from the check-link library and passes
+httpx trace callback to every request. Trace events of the transport are
+converted into durations of request phases:
+
+* connect - opening TCP connection, including name resolution;
+* tls - TLS handshake;
+* ttfb - from sending request headers to receiving response headers;
+* total - the whole check, including fallback GET and redirects;
+* bytes - number of bytes downloaded.
+
+Phases that did not happen (e.g. connect and tls when a connection was reused
+from the pool) are reported as `None`.
+
+Both checkers record redirects followed by every request. When the chain
+starts with permanent redirects, the URL they lead to is the `target` of the
+link. If the target of the previous check is passed to the checker, it is
+requested directly and the original URL is requested only when the target
+does not respond with success.
+
+`FingerprintChecker` additionally hashes the body of successful responses
+while it is streamed, up to the byte cap, so changes of files behind links
+are detected in the same pass as their availability.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+import httpx
+from check_link import AsyncChecker, Link, Option
+
+import ckan.plugins.toolkit as tk
+
+CONFIG_COLLECT_TIMINGS = "ckanext.check_link.check.collect_timings"
+DEFAULT_COLLECT_TIMINGS = True
+
+CONFIG_CACHE_REDIRECTS = "ckanext.check_link.check.cache_redirects"
+DEFAULT_CACHE_REDIRECTS = True
+
+CONFIG_FINGERPRINT = "ckanext.check_link.check.fingerprint"
+DEFAULT_FINGERPRINT = False
+
+CONFIG_FINGERPRINT_MAX_BYTES = "ckanext.check_link.check.fingerprint_max_bytes"
+DEFAULT_FINGERPRINT_MAX_BYTES = 10 * 1024 * 1024
+
+TIMINGS = ["connect", "tls", "ttfb", "total"]
+
+PERMANENT_REDIRECTS = {httpx.codes.MOVED_PERMANENTLY, httpx.codes.PERMANENT_REDIRECT}
+
+# response headers stored together with the digest of the content
+FINGERPRINT_HEADERS = ["content-type", "content-length", "etag", "last-modified"]
+
+__all__ = [
+    "FINGERPRINT_HEADERS",
+    "PERMANENT_REDIRECTS",
+    "TIMINGS",
+    "FingerprintChecker",
+    "TimedChecker",
+    "cache_redirects",
+    "check_links",
+    "collect_timings",
+    "fingerprint",
+    "fingerprint_max_bytes",
+    "make_checker",
+]
+
+
+def collect_timings() -> bool:
+    """Check whether timings of requests must be recorded.
+
+    Returns:
+        True if checks are performed by `TimedChecker`
+    """
+    return tk.asbool(tk.config.get(CONFIG_COLLECT_TIMINGS, DEFAULT_COLLECT_TIMINGS))
+
+
+def cache_redirects() -> bool:
+    """Check whether redirects of links must be recorded and reused.
+
+    Returns:
+        True if redirect chains are stored in reports
+    """
+    return tk.asbool(tk.config.get(CONFIG_CACHE_REDIRECTS, DEFAULT_CACHE_REDIRECTS))
+
+
+def fingerprint() -> bool:
+    """Check whether content of links must be hashed.
+
+    Returns:
+        True if checks are performed by `FingerprintChecker`
+    """
+    return tk.asbool(tk.config.get(CONFIG_FINGERPRINT, DEFAULT_FINGERPRINT))
+
+
+def fingerprint_max_bytes() -> int:
+    """Maximal number of bytes of the content that are hashed.
+
+    Returns:
+        Configured byte cap
+    """
+    return tk.asint(tk.config.get(CONFIG_FINGERPRINT_MAX_BYTES, DEFAULT_FINGERPRINT_MAX_BYTES))
+
+
+def make_checker(redirects: dict[int, dict[str, Any]] | None = None) -> TimedChecker | None:
+    """Create the checker required by the configuration.
+
+    Args:
+        redirects: Redirects recorded by previous checks, using `id()` of
+            the link as a key
+
+    Returns:
+        Checker that hashes content, checker that records timings and
+        redirects, or None if the plain checker from the library is enough
+    """
+    redirects = redirects or {}
+    if fingerprint():
+        return FingerprintChecker(redirects=redirects, max_bytes=fingerprint_max_bytes())
+
+    if collect_timings() or cache_redirects():
+        return TimedChecker(redirects=redirects)
+
+    return None
+
+
+def describe_redirects(resp: httpx.Response) -> dict[str, Any] | None:
+    """Describe redirects that led to the response.
+
+    Args:
+        resp: Final response
+
+    Returns:
+        Dictionary with the `chain` of redirects, the `final_url`, the
+        `permanent` flag, that is set when every redirect is permanent, and
+        the `target`, i.e. the URL reached through leading permanent
+        redirects. None if there were no redirects
+    """
+    if not resp.history:
+        return None
+
+    chain = [{"url": str(r.url), "code": r.status_code} for r in resp.history]
+    target = None
+    for hop, after in zip(resp.history, [*resp.history[1:], resp], strict=True):
+        if hop.status_code not in PERMANENT_REDIRECTS:
+            break
+        target = str(after.url)
+
+    return {
+        "chain": chain,
+        "final_url": str(resp.url),
+        "permanent": all(r.status_code in PERMANENT_REDIRECTS for r in resp.history),
+        "target": target,
+    }
+
+
+class _Trace:
+    """Trace callback that remembers the moment of every event."""
+
+    def __init__(self):
+        self.events: dict[str, float] = {}
+
+    async def __call__(self, name: str, info: dict[str, Any]):
+        # drop the protocol prefix: http11.send_request_headers.started and
+        # http2.send_request_headers.started are the same for us
+        self.events[name.split(".", 1)[1]] = time.perf_counter()
+
+    def span(self, first: str, last: str) -> float | None:
+        """Seconds between two events or None if any of them did not happen."""
+        if first in self.events and last in self.events:
+            return round(self.events[last] - self.events[first], 4)
+
+        return None
+
+
+@dataclass
+class TimedChecker(AsyncChecker):
+    """Asynchronous checker that records timings of every link.
+
+    Timings, redirects and `Retry-After` headers are stored in the `timings`,
+    `redirects` and `retry_after` dictionaries, using `id()` of the checked
+    link as a key. Redirects that
+    are passed to the checker are reused: their `target` is requested
+    instead of the link and they are kept if the target is available.
+    """
+
+    timings: dict[int, dict[str, Any]] = field(default_factory=dict)
+    redirects: dict[int, dict[str, Any]] = field(default_factory=dict)
+    retry_after: dict[int, str] = field(default_factory=dict)
+
+    async def _ping(self, link: Link, headers: dict[str, str]) -> httpx.Response:
+        trace = _Trace()
+        start = time.perf_counter()
+        resp: httpx.Response | None = None
+
+        try:
+            resp = await self._follow(link, headers, trace)
+        finally:
+            self.timings[id(link)] = {
+                "connect": trace.span("connect_tcp.started", "connect_tcp.complete"),
+                "tls": trace.span("start_tls.started", "start_tls.complete"),
+                "ttfb": trace.span("send_request_headers.started", "receive_response_headers.complete"),
+                "total": round(time.perf_counter() - start, 4),
+                "bytes": resp.num_bytes_downloaded if resp else 0,
+            }
+
+        if value := resp.headers.get("retry-after"):
+            self.retry_after[id(link)] = value
+
+        return resp
+
+    async def _follow(self, link: Link, headers: dict[str, str], trace: _Trace) -> httpx.Response:
+        """Request the cached target of the link, falling back to the link."""
+        cached = self.redirects.pop(id(link), None)
+        if cached and cached.get("target"):
+            try:
+                resp = await self._traced_ping(cached["target"], link, headers, trace)
+            except httpx.HTTPError:
+                pass
+            else:
+                if resp.is_success:
+                    self.redirects[id(link)] = cached
+                    return resp
+
+        resp = await self._traced_ping(str(link), link, headers, trace)
+        if redirects := describe_redirects(resp):
+            self.redirects[id(link)] = redirects
+
+        return resp
+
+    async def _traced_ping(self, url: str, link: Link, headers: dict[str, str], trace: _Trace) -> httpx.Response:
+        allow_redirects = bool(self.options & Option.allow_redirects)
+        extensions = {"trace": trace}
+
+        if self.options & Option.try_head:
+            resp = await self.session.head(
+                url,
+                headers=headers,
+                follow_redirects=allow_redirects,
+                timeout=link.timeout,
+                extensions=extensions,
+            )
+            if resp.status_code != httpx.codes.METHOD_NOT_ALLOWED:
+                return resp
+
+        async with self.session.stream(
+            "GET",
+            url,
+            follow_redirects=allow_redirects,
+            headers=headers,
+            timeout=link.timeout,
+            extensions=extensions,
+        ) as resp:
+            return resp
+
+
+@dataclass
+class FingerprintChecker(TimedChecker):
+    """Checker that hashes content of every successful response.
+
+    Links are always requested with GET, because the body of HEAD response is
+    empty. Fingerprints are stored in the `fingerprints` dictionary, using
+    `id()` of the checked link as a key, and contain the SHA-256 `digest` of
+    the first `max_bytes` of the content, the number of hashed bytes as
+    `size`, the `complete` flag, that is set when the whole content is hashed,
+    and content headers of the response.
+    """
+
+    max_bytes: int = DEFAULT_FINGERPRINT_MAX_BYTES
+    fingerprints: dict[int, dict[str, Any]] = field(default_factory=dict)
+
+    async def _traced_ping(self, url: str, link: Link, headers: dict[str, str], trace: _Trace) -> httpx.Response:
+        async with self.session.stream(
+            "GET",
+            url,
+            follow_redirects=bool(self.options & Option.allow_redirects),
+            headers=headers,
+            timeout=link.timeout,
+            extensions={"trace": trace},
+        ) as resp:
+            if resp.is_success:
+                self.fingerprints[id(link)] = await self._fingerprint(resp)
+            return resp
+
+    async def _fingerprint(self, resp: httpx.Response) -> dict[str, Any]:
+        digest = hashlib.sha256()
+        size = 0
+        complete = True
+
+        async for chunk in resp.aiter_bytes():
+            if size + len(chunk) > self.max_bytes:
+                chunk = chunk[: self.max_bytes - size]  # noqa: PLW2901
+                complete = False
+
+            digest.update(chunk)
+            size += len(chunk)
+            if not complete:
+                break
+
+        return {
+            "digest": f"sha256:{digest.hexdigest()}",
+            "size": size,
+            "complete": complete,
+            "headers": {name: resp.headers[name] for name in FINGERPRINT_HEADERS if name in resp.headers},
+        }
+
+
+def check_links(
+    links: list[Link],
+    checker_factory: Callable[[], AsyncChecker] = AsyncChecker,
+    timeout: float | None = None,
+) -> list[Link]:
+    """Check links concurrently, giving up after the timeout.
+
+    This is a version of `check_link.check_all` with a time budget. Checks
+    that are still running when the budget is exhausted are cancelled and
+    their links are left unchanged.
+
+    Args:
+        links: Links to check. They are updated in place
+        checker_factory: Factory of the checker
+        timeout: Number of seconds for the whole batch or None to wait for
+            all checks
+
+    Returns:
+        Links that were not checked before the timeout
+    """
+    if not links:
+        return []
+
+    if timeout is not None and timeout <= 0:
+        return list(links)
+
+    return asyncio.run(_check_links(links, checker_factory, timeout))
+
+
+async def _check_links(
+    links: list[Link], checker_factory: Callable[[], AsyncChecker], timeout: float | None
+) -> list[Link]:
+    async with checker_factory() as checker:
+        tasks = [asyncio.ensure_future(checker.check(link)) for link in links]
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    # unexpected errors of checks are propagated, as by `check_all`
+    for task in done:
+        task.result()
+
+    return [link for link, task in zip(links, tasks, strict=True) if task in pending]
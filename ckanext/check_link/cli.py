@@ -8,10 +8,12 @@ The CLI interface is designed for bulk operations and automation tasks.
 from __future__ import annotations
 
 import logging
+import os
+import time
 from collections import Counter
-from collections.abc import Iterable
-from itertools import islice
-from typing import TypeVar
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from typing import Any
 
 import click
 import sqlalchemy as sa
@@ -19,9 +21,10 @@ import sqlalchemy as sa
 import ckan.plugins.toolkit as tk
 from ckan import model, types
 
-from .model import Report
+from . import export, metrics, processing, retention, retry, selectors, utils
+from .frontier import PENDING, Frontier
+from .logic import schema
 
-T = TypeVar("T")
 log = logging.getLogger(__name__)
 
 __all__ = ["check_link"]
@@ -55,6 +58,26 @@ def check_link():
     "--organization",
     help="Check packages of specific organization",
 )
+@click.option(
+    "-w",
+    "--workers",
+    help="Number of worker processes. Resources of the same host are always checked by the same worker",
+    default=1,
+    type=click.IntRange(1),
+)
+@click.option("--frontier", type=click.Path(dir_okay=False), help="Keep the work list in the SQLite file")
+@click.option("--resume", is_flag=True, help="Continue the run stored in the frontier file")
+@click.option(
+    "--metrics-file",
+    type=click.Path(dir_okay=False),
+    help="Periodically write metrics of the run into the file in Prometheus text format",
+)
+@click.option("--skip-retries", is_flag=True, help="Leave the retry queue for the next run of check-retries")
+@click.option(
+    "--wait-retries",
+    is_flag=True,
+    help="Wait for queued retries that are not due yet. May take up to ckanext.check_link.retry.max_delay",
+)
 @click.argument("ids", nargs=-1)
 def check_packages(  # noqa: PLR0913
     include_draft: bool,
@@ -64,6 +87,12 @@ def check_packages(  # noqa: PLR0913
     delay: float,
     timeout: float,
     organization: str | None,
+    workers: int,
+    frontier: str | None,
+    resume: bool,
+    metrics_file: str | None,
+    skip_retries: bool,
+    wait_retries: bool,
 ):
     """Check every resource inside each package.
 
@@ -81,11 +110,16 @@ def check_packages(  # noqa: PLR0913
         delay: Delay between requests in seconds
         timeout: Request timeout in seconds
         organization: Specific organization to check packages from
+        workers: Number of worker processes
+        frontier: Path to the SQLite file with the work list
+        resume: Continue the run stored in the frontier file
+        metrics_file: Path to the file with metrics of the run
+        skip_retries: Do not drain the retry queue at the end of the run
+        wait_retries: Sleep until queued retries are due at the end of the run
     """
     user = tk.get_action("get_site_user")({"ignore_auth": True}, {})
     context = types.Context(user=user["name"])
 
-    check = tk.get_action("check_link_search_check")
     states = ["active"]
 
     if include_draft:
@@ -110,65 +144,204 @@ def check_packages(  # noqa: PLR0913
     if ids:
         stmt = stmt.where(model.Package.id.in_(ids) | model.Package.name.in_(ids))
 
+    options = {
+        "save": True,
+        "clear_available": True,
+        "skip_invalid": True,
+        "link_patch": {"delay": delay, "timeout": timeout},
+    }
+
+    size = processing.batch_size()
+    work = _open_frontier(frontier, resume, selectors.resources(stmt))
+
+    dump_metrics = _MetricsFile(metrics_file)
     stats: Counter[str] = Counter()
-    total = model.Session.scalar(sa.select(sa.func.count()).select_from(stmt))
-    with click.progressbar(model.Session.scalars(stmt), length=total) as bar:
-        while True:
-            buff = _take(bar, chunk)
-            if not buff:
-                break
-
-            result = check(
-                tk.fresh_context(context),
-                {
-                    "fq": "id:({})".format(" OR ".join(buff)),
-                    "save": True,
-                    "clear_available": True,
-                    "include_drafts": include_draft,
-                    "include_private": include_private,
-                    "skip_invalid": True,
-                    "rows": chunk,
-                    "link_patch": {"delay": delay, "timeout": timeout},
-                },
-            )
-            stats.update(r["state"] for r in result)
-            overview = (
-                ", ".join(
-                    f"{click.style(k, underline=True)}: {click.style(str(v), bold=True)}" for k, v in stats.items()
+    if work:
+        total, done = _frontier_progress(work)
+        rows = work.pending(size)
+    else:
+        total = model.Session.scalar(sa.select(sa.func.count()).select_from(selectors.resources(stmt).subquery()))
+        done = 0
+        rows = utils.stream_rows(selectors.resources(stmt), size)
+
+    with click.progressbar(length=total) as bar:
+        bar.update(done)
+
+        def on_progress(checked: int, states: Counter[str]):
+            stats.update(states)
+            bar.label = f"Overview: {_overview(stats)}"
+            bar.update(checked)
+            dump_metrics()
+
+        try:
+            if workers > 1:
+                processing.parallel(
+                    tk.fresh_context(context),
+                    options,
+                    rows,
+                    workers,
+                    size=size,
+                    on_checked=on_progress,
+                    on_saved=work and work.mark_saved,
                 )
-                or "not available"
-            )
-            bar.label = f"Overview: {overview}"
-            bar.update(chunk)
+            else:
+                # the next chunk of packages is loaded in background and reports of
+                # the previous chunk are saved while the current chunk is checked
+                processing.Pipeline(
+                    tk.fresh_context(context),
+                    options,
+                    on_checked=lambda rows, reports: on_progress(len(rows), Counter(r["state"] for r in reports)),
+                    on_saved=work and work.mark_saved,
+                ).run(processing.batches(rows, size) if work else _package_chunks(stmt, chunk))
+        finally:
+            dump_metrics(force=True)
+            if work:
+                work.close()
+
+    if not skip_retries:
+        _drain_retries(context, options, wait=wait_retries)
 
     click.secho("Done", fg="green")
 
 
-def _take(seq: Iterable[T], size: int) -> list[T]:
-    """Take a specified number of items from an iterable sequence.
+def _package_chunks(stmt: Any, size: int) -> Iterator[list[Any]]:
+    """Iterate through resources of packages, grouped by chunks of packages.
+
+    Args:
+        stmt: Statement that produces package IDs
+        size: Number of packages in a chunk
+
+    Yields:
+        Lists of `(resource_id, package_id, url)` triples
+    """
+    for buff in processing.batches(model.Session.scalars(stmt), size):
+        yield list(model.Session.execute(selectors.resources(buff)))
+
+
+def _open_frontier(path: str | None, resume: bool, stmt: Any) -> Frontier | None:
+    """Open the frontier file, taking a snapshot of the work list for a new run.
+
+    Args:
+        path: Path to the frontier file
+        resume: Continue the run stored in the file instead of taking a snapshot
+        stmt: Statement that produces `(resource_id, package_id, url)` triples
+
+    Returns:
+        Frontier or None if the file is not specified
+
+    Raises:
+        Abort: resume is requested without an existing frontier file
+    """
+    if not path:
+        if resume:
+            tk.error_shout("--resume requires --frontier")
+            raise click.Abort
+        return None
+
+    if resume and not os.path.exists(path):
+        tk.error_shout(f"Frontier {path} does not exist")
+        raise click.Abort
+
+    work = Frontier(path)
+    if not resume:
+        click.echo(f"Taking snapshot of the work list into {path}", err=True)
+        work.reset(utils.stream_rows(stmt, export.batch_size()))
+
+    return work
+
+
+def _frontier_progress(work: Frontier) -> tuple[int, int]:
+    """Compute the total number of items and the number of processed items.
+
+    Args:
+        work: Frontier of the run
+
+    Returns:
+        Total and processed number of items
+    """
+    stats = work.stats()
+    total = sum(stats.values())
+    return total, total - stats.get(PENDING, 0)
+
 
-    This internal utility function extracts a specified number of items
-    from an iterable sequence, which is useful for processing data in chunks.
+class _MetricsFile:
+    """Writer of the metrics file, that limits the frequency of writes.
 
     Args:
-        seq: The iterable sequence to take items from
-        size: The number of items to take
+        path: Path to the metrics file. Nothing is written if it's empty
+        interval: Minimal number of seconds between writes
+    """
+
+    def __init__(self, path: str | None, interval: float = 1):
+        self.path = path
+        self.interval = interval
+        self.written = 0.0
+
+    def __call__(self, force: bool = False):
+        if not self.path:
+            return
+
+        now = time.monotonic()
+        if force or now - self.written >= self.interval:
+            metrics.write(self.path)
+            self.written = now
+
+
+def _overview(stats: Counter[str]) -> str:
+    """Render statistics of link states for the progress bar.
+
+    Args:
+        stats: Number of checked links per state
 
     Returns:
-        A list containing the taken items
+        Styled summary of the statistics
     """
-    return list(islice(seq, size))
+    return (
+        ", ".join(f"{click.style(k, underline=True)}: {click.style(str(v), bold=True)}" for k, v in stats.items())
+        or "not available"
+    )
 
 
 @check_link.command()
 @click.option("-d", "--delay", default=0, help="Delay between requests", type=click.FloatRange(0))
 @click.option("-t", "--timeout", default=10, help="Request timeout", type=click.FloatRange(0))
+@click.option(
+    "-b",
+    "--batch-size",
+    help="Number of resources checked concurrently and saved at once. Default: ckanext.check_link.check.batch_size",
+    type=click.IntRange(1),
+)
+@click.option("--frontier", type=click.Path(dir_okay=False), help="Keep the work list in the SQLite file")
+@click.option("--resume", is_flag=True, help="Continue the run stored in the frontier file")
+@click.option(
+    "--metrics-file",
+    type=click.Path(dir_okay=False),
+    help="Periodically write metrics of the run into the file in Prometheus text format",
+)
+@click.option("--skip-retries", is_flag=True, help="Leave the retry queue for the next run of check-retries")
+@click.option(
+    "--wait-retries",
+    is_flag=True,
+    help="Wait for queued retries that are not due yet. May take up to ckanext.check_link.retry.max_delay",
+)
 @click.argument("ids", nargs=-1)
-def check_resources(ids: tuple[str, ...], delay: float, timeout: float):
+def check_resources(  # noqa: PLR0913
+    ids: tuple[str, ...],
+    delay: float,
+    timeout: float,
+    batch_size: int | None,
+    frontier: str | None,
+    resume: bool,
+    metrics_file: str | None,
+    skip_retries: bool,
+    wait_retries: bool,
+):
     """Check every resource on the portal.
 
     This command performs link checking for all active resources in the portal.
     It can be scoped to specific resources by providing their IDs as arguments.
+    Resource IDs and URLs are loaded straight from the database, URLs of every
+    batch are checked concurrently and reports of the batch are saved in bulk.
     The command provides real-time progress feedback with statistics on the
     distribution of link states (available, broken, etc.).
 
@@ -176,51 +349,181 @@ def check_resources(ids: tuple[str, ...], delay: float, timeout: float):
         ids: Specific resource IDs to check (checks all if empty)
         delay: Delay between requests in seconds
         timeout: Request timeout in seconds
+        batch_size: Number of resources checked and saved at once. The same as
+            in `check-packages` by default
+        frontier: Path to the SQLite file with the work list
+        resume: Continue the run stored in the frontier file
+        metrics_file: Path to the file with metrics of the run
+        skip_retries: Do not drain the retry queue at the end of the run
+        wait_retries: Sleep until queued retries are due at the end of the run
     """
     user = tk.get_action("get_site_user")({"ignore_auth": True}, {})
     context: types.Context = {"user": user["name"]}
+    options = {
+        "save": True,
+        "clear_available": True,
+        "skip_invalid": True,
+        "link_patch": {"delay": delay, "timeout": timeout},
+    }
+    batch_size = batch_size or processing.batch_size()
 
-    check = tk.get_action("check_link_resource_check")
     # Query for active resources, optionally filtered by specific IDs
-    q = model.Session.query(model.Resource.id).filter_by(state="active")
+    stmt = sa.select(model.Resource.id, model.Resource.package_id, selectors.resource_url()).where(
+        model.Resource.state == "active",
+    )
     if ids:
-        q = q.filter(model.Resource.id.in_(ids))
-
+        stmt = stmt.where(model.Resource.id.in_(ids))
+    stmt = stmt.order_by(model.Resource.id)
+
+    work = _open_frontier(frontier, resume, stmt)
+    if work:
+        total, done = _frontier_progress(work)
+        rows = work.pending(batch_size)
+    else:
+        total = model.Session.scalar(sa.select(sa.func.count()).select_from(stmt.subquery()))
+        done = 0
+        rows = utils.stream_rows(stmt, batch_size)
+
+    dump_metrics = _MetricsFile(metrics_file)
     stats: Counter[str] = Counter()
-    total = q.count()
-    overview = "Not ready yet"
-    with click.progressbar(q, length=total) as bar:
-        for res in bar:
-            bar.label = f"Current: {res.id}. Overview({total} total): {overview}"
-            try:
-                # Perform the link check for the current resource
-                result = check(
-                    tk.fresh_context(context),
-                    {
-                        "save": True,
-                        "clear_available": True,
-                        "id": res.id,
-                        "link_patch": {"delay": delay, "timeout": timeout},
-                    },
-                )
-            except tk.ValidationError:
-                # Log validation errors and mark as exception state
-                log.exception("Cannot check %s", res.id)
-                result = {"state": "exception"}
-
-            # Update statistics with the result
-            stats[result["state"]] += 1
-            overview = (
-                ", ".join(
-                    f"{click.style(k, underline=True)}: {click.style(str(v), bold=True)}" for k, v in stats.items()
-                )
-                or "not available"
-            )
-            bar.label = f"Current: {res.id}. Overview({total} total): {overview}"
+    with click.progressbar(length=total) as bar:
+        bar.update(done)
+
+        def on_checked(rows: list[Any], reports: list[dict[str, Any]]):
+            stats.update(r["state"] for r in reports)
+            # invalid URLs are skipped by the check and have no report
+            if skipped := len(rows) - len(reports):
+                stats["exception"] += skipped
+
+            bar.label = f"Current: {rows[-1][0]}. Overview({total} total): {_overview(stats)}"
+            bar.update(len(rows))
+            dump_metrics()
+
+        try:
+            processing.Pipeline(
+                tk.fresh_context(context),
+                options,
+                on_checked=on_checked,
+                on_saved=work and work.mark_saved,
+            ).run(processing.batches(rows, batch_size))
+        finally:
+            dump_metrics(force=True)
+            if work:
+                work.close()
+
+    if not skip_retries:
+        _drain_retries(context, options, wait=wait_retries)
 
     click.secho("Done", fg="green")
 
 
+@check_link.command()
+@click.option("-d", "--delay", default=0, help="Delay between requests", type=click.FloatRange(0))
+@click.option("-t", "--timeout", default=10, help="Request timeout", type=click.FloatRange(0))
+@click.option("--wait", is_flag=True, help="Wait for retries that are not due yet")
+def check_retries(delay: float, timeout: float, wait: bool):
+    """Check links from the retry queue.
+
+    Links that failed with transient errors (timeouts, 429, 502, 503) are
+    put into the retry queue by bulk checks. This command checks links whose
+    retry is due, e.g. when it's scheduled by cron.
+
+    Args:
+        delay: Delay between requests in seconds
+        timeout: Request timeout in seconds
+        wait: Sleep until remaining retries are due, draining the whole queue
+    """
+    user = tk.get_action("get_site_user")({"ignore_auth": True}, {})
+    context: types.Context = {"user": user["name"]}
+
+    _drain_retries(
+        context,
+        {"clear_available": True, "skip_invalid": True, "link_patch": {"delay": delay, "timeout": timeout}},
+        wait=wait,
+    )
+    click.secho("Done", fg="green")
+
+
+def _drain_retries(context: types.Context, options: dict[str, Any], *, wait: bool = False):
+    """Check links from the retry queue and report the progress.
+
+    Args:
+        context: CKAN context dictionary containing user and session information
+        options: Check options
+        wait: Sleep until remaining retries are due
+    """
+    if not retry.max_attempts():
+        return
+
+    stats: Counter[str] = Counter()
+
+    def on_checked(reports: list[dict[str, Any]]):
+        stats.update(r["state"] for r in reports)
+        click.echo(f"Retries: {_overview(stats)}")
+
+    checked = processing.check_retries(tk.fresh_context(context), options, wait=wait, on_checked=on_checked)
+    click.secho(f"Retried {checked} links", fg="green")
+
+
+def _report_filter_options(func: Any) -> Any:
+    """Add options that correspond to filters of `check_link_report_search`.
+
+    Args:
+        func: Click command
+
+    Returns:
+        Command with filter options
+    """
+    options = [
+        click.option("-s", "--since", type=click.DateTime(), help="Only reports checked at or after the given moment"),
+        click.option("--include-state", multiple=True, help="Only reports in the given state"),
+        click.option("--exclude-state", multiple=True, help="Skip reports in the given state"),
+        click.option("--attached-only", is_flag=True, help="Only reports attached to resources"),
+        click.option("--free-only", is_flag=True, help="Only reports not attached to resources"),
+        click.option("--package", help="Only reports of the package's resources"),
+        click.option("--organization", help="Only reports of the organization's resources"),
+    ]
+    for option in reversed(options):
+        func = option(func)
+
+    return func
+
+
+def _report_filters(  # noqa: PLR0913
+    *,
+    since: datetime | None,
+    include_state: tuple[str, ...],
+    exclude_state: tuple[str, ...],
+    attached_only: bool,
+    free_only: bool,
+    package: str | None,
+    organization: str | None,
+) -> dict[str, Any]:
+    """Convert values of filter options into report filters.
+
+    Args:
+        since: Only reports checked at or after this moment
+        include_state: Only reports in these states
+        exclude_state: Skip reports in these states
+        attached_only: Only reports attached to resources
+        free_only: Only reports not attached to resources
+        package: ID or name of the package
+        organization: ID or name of the organization
+
+    Returns:
+        Filters accepted by `check_link_report_search`
+    """
+    return {
+        "include_state": list(include_state),
+        "exclude_state": list(exclude_state),
+        "attached_only": attached_only,
+        "free_only": free_only,
+        "package_id": package,
+        "organization_id": organization,
+        "since": since and since.isoformat(),
+    }
+
+
 @check_link.command()
 @click.option(
     "-o",
@@ -228,31 +531,158 @@ def check_resources(ids: tuple[str, ...], delay: float, timeout: float):
     is_flag=True,
     help="Only drop reports that point to an unexisting resource",
 )
-def delete_reports(orphans_only: bool):
+@click.option(
+    "-b",
+    "--batch-size",
+    type=click.IntRange(1),
+    help="Delete reports in chunks of the given size, committing each chunk separately",
+)
+@_report_filter_options
+def delete_reports(orphans_only: bool, batch_size: int | None, **filters: Any):
     """Delete check-link reports.
 
     This command provides the ability to clean up link check reports from the database.
     It can delete all reports or only orphaned reports that point to resources that
-    no longer exist or are not in an active state. This helps maintain a clean
-    database by removing obsolete reports.
+    no longer exist or are not in an active state. Filters match
+    `check_link_report_search` and reports are removed with a single `DELETE`
+    statement, or in chunks when `--batch-size` is specified.
 
     Args:
         orphans_only: If True, only delete reports that point to non-existing resources
+        batch_size: Number of reports deleted in a single transaction
+        filters: Values of report filter options
     """
-    q = model.Session.query(Report)
-    if orphans_only:
-        # Find reports that are associated with a resource ID but where the resource
-        # either doesn't exist anymore or is not in an active state
-        q = q.outerjoin(model.Resource, Report.resource_id == model.Resource.id).filter(
-            Report.resource_id.isnot(None),
-            model.Resource.id.is_(None) | (model.Resource.state != "active"),
-        )
-
     user = tk.get_action("get_site_user")({"ignore_auth": True}, {})
     context: types.Context = {"user": user["name"]}
 
-    action = tk.get_action("check_link_report_delete")
-    with click.progressbar(q, length=q.count()) as bar:
-        for report in bar:
-            # Delete each report individually
-            action(tk.fresh_context(context), {"id": report.id})
+    try:
+        result = tk.get_action("check_link_report_bulk_delete")(
+            context,
+            dict(_report_filters(**filters), orphans_only=orphans_only, batch_size=batch_size),
+        )
+    except tk.ValidationError as e:
+        tk.error_shout(e.error_dict)
+        raise click.Abort from e
+
+    click.secho(f"Deleted {result['deleted']} reports", fg="green")
+
+
+@check_link.command()
+@click.option("--max-age", multiple=True, help="Maximal age of reports in the state as state=days. * matches any state")
+@click.option("--free-max-age", type=click.IntRange(0), help="Maximal age in days of reports without resource")
+@click.option("--orphans", is_flag=True, help="Remove reports of deleted or missing resources")
+@click.option("-b", "--batch-size", type=click.IntRange(1), help="Number of reports removed in a single transaction")
+@click.option("--sleep", type=click.FloatRange(0), help="Pause in seconds between batches")
+@click.option("-a", "--archive", type=click.Path(dir_okay=False), help="Append removed reports to gzipped NDJSON file")
+@click.option("--dry-run", is_flag=True, help="Only count reports that would be removed")
+@click.option("--enqueue", is_flag=True, help="Run the cleanup as a background job")
+def apply_retention(  # noqa: PLR0913
+    max_age: tuple[str, ...],
+    free_max_age: int | None,
+    orphans: bool,
+    batch_size: int | None,
+    sleep: float | None,
+    archive: str | None,
+    dry_run: bool,
+    enqueue: bool,
+):
+    """Remove reports according to the retention policy.
+
+    The policy is taken from `ckanext.check_link.retention.*` options, unless
+    any of `--max-age`, `--free-max-age` or `--orphans` is specified. Reports
+    are removed in batches, every batch in a separate transaction.
+
+    Args:
+        max_age: Maximal age of reports per state as state=days
+        free_max_age: Maximal age in days of reports without resource
+        orphans: Remove reports of deleted or missing resources
+        batch_size: Number of reports removed in a single transaction
+        sleep: Pause in seconds between batches
+        archive: Path to the archive of removed reports
+        dry_run: Only count reports that would be removed
+        enqueue: Run the cleanup as a background job
+    """
+    try:
+        policy = (
+            retention.Policy(retention.parse_max_age(max_age), free_max_age, orphans)
+            if max_age or free_max_age is not None or orphans
+            else retention.get_policy()
+        )
+    except ValueError as e:
+        tk.error_shout(e)
+        raise click.Abort from e
+
+    if not policy:
+        tk.error_shout("Retention policy is not configured")
+        raise click.Abort
+
+    options: dict[str, Any] = {"batch_size": batch_size, "sleep": sleep, "archive": archive}
+
+    if dry_run:
+        click.secho(f"{retention.enforce(policy, dry_run=True)} reports would be removed", fg="green")
+        return
+
+    if enqueue:
+        job = tk.enqueue_job(retention.enforce, [policy], options, title="check-link: apply retention policy")
+        click.secho(f"Enqueued job {job.id}", fg="green")
+        return
+
+    with click.progressbar(length=retention.enforce(policy, dry_run=True)) as bar:
+        removed = retention.enforce(policy, on_batch=bar.update, **options)
+
+    click.secho(f"Removed {removed} reports", fg="green")
+
+
+@check_link.command()
+@click.option(
+    "-f",
+    "--format",
+    "fmt",
+    type=click.Choice(export.FORMATS),
+    default="ndjson",
+    help="Output format",
+)
+@click.option("-o", "--output", default="-", help="Output file. Standard output by default")
+@_report_filter_options
+def export_reports(fmt: str, output: str, **filters: Any):
+    """Export reports as NDJSON or Parquet.
+
+    Reports are streamed from a server-side cursor and written in batches,
+    so exports of any size use a constant amount of memory. Filters match
+    `check_link_report_search`. For incremental synchronization, pass the
+    moment printed by the previous run as `--since`. Runs overlap by
+    `ckanext.check_link.export.checkpoint_margin` seconds, so some reports
+    are exported twice and must be deduplicated by their ID.
+
+    Args:
+        fmt: Output format, ndjson or parquet
+        output: Path to the output file, `-` for standard output
+        filters: Values of report filter options
+    """
+    if fmt == "parquet" and not export.parquet_available():
+        tk.error_shout("Parquet export requires pyarrow. Install ckanext-check-link[parquet]")
+        raise click.Abort
+
+    filters, errors = tk.navl_validate(
+        _report_filters(**filters),
+        schema.report_filters(),
+        {"model": model, "session": model.Session},
+    )
+    if errors:
+        tk.error_shout(errors)
+        raise click.Abort
+
+    # remember the moment before export starts: the next incremental run
+    # starting from it cannot miss reports saved while this one is running
+    checkpoint = export.checkpoint(datetime.now(timezone.utc).replace(tzinfo=None))
+
+    rows = utils.stream_rows(utils.export_statement(filters), export.batch_size())
+    if fmt == "parquet":
+        with click.open_file(output, "wb") as dest:
+            for chunk in export.iter_parquet(rows, export.batch_size()):
+                dest.write(chunk)
+    else:
+        with click.open_file(output, "w") as dest:
+            dest.writelines(export.iter_ndjson(rows))
+
+    click.secho(f"Next export since: {checkpoint.isoformat(timespec='seconds')}", fg="green", err=True)
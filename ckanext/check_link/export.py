@@ -0,0 +1,206 @@
+"""Serialization of link check reports into export formats.
+
+This module converts flat report rows produced by `utils.export_statement`
+into NDJSON lines or Parquet row groups. Both serializers are generators, so
+the content can be streamed to an HTTP response or written into a file without
+holding the whole export in memory.
+"""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Any
+
+import ckan.plugins.toolkit as tk
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+CONFIG_EXPORT_BATCH_SIZE = "ckanext.check_link.export.batch_size"
+DEFAULT_EXPORT_BATCH_SIZE = 1000
+
+CONFIG_CHECKPOINT_MARGIN = "ckanext.check_link.export.checkpoint_margin"
+DEFAULT_CHECKPOINT_MARGIN = 300
+
+FORMATS = ["ndjson", "parquet"]
+
+__all__ = ["FORMATS", "batch_size", "checkpoint", "iter_ndjson", "iter_parquet", "parquet_available", "record"]
+
+
+def batch_size() -> int:
+    """Number of rows fetched from the database and written at once.
+
+    Returns:
+        Configured batch size
+    """
+    return tk.asint(tk.config.get(CONFIG_EXPORT_BATCH_SIZE, DEFAULT_EXPORT_BATCH_SIZE))
+
+
+def checkpoint(start: datetime) -> datetime:
+    """Compute the moment from which the next incremental export starts.
+
+    Reports get their check time before the transaction that saves them is
+    committed, so rows committed after the export started may carry an
+    earlier timestamp. The checkpoint is moved back by the safety margin to
+    include them into the next export, at the cost of exporting some rows
+    twice.
+
+    Args:
+        start: Moment when the export started, naive UTC
+
+    Returns:
+        Value for `--since` of the next run
+    """
+    margin = tk.asint(tk.config.get(CONFIG_CHECKPOINT_MARGIN, DEFAULT_CHECKPOINT_MARGIN))
+    return start - timedelta(seconds=margin)
+
+
+def parquet_available() -> bool:
+    """Check whether the optional Parquet dependency is installed.
+
+    Returns:
+        True if `pyarrow` can be used
+    """
+    return pq is not None
+
+
+def record(row: Any) -> dict[str, Any]:
+    """Convert the export row into a JSON-serializable dictionary.
+
+    Args:
+        row: Row produced by `utils.export_statement`
+
+    Returns:
+        Dictionary with report data
+    """
+    return {
+        "id": row.id,
+        "url": row.url,
+        "state": row.state,
+        "created_at": row.created_at.isoformat(),
+        "resource_id": row.resource_id,
+        "package_id": row.package_id,
+        "package_name": row.package_name,
+        "organization_id": row.organization_id,
+        "details": row.details,
+    }
+
+
+def iter_ndjson(rows: Iterable[Any]) -> Iterator[str]:
+    """Serialize rows as newline-delimited JSON.
+
+    Args:
+        rows: Rows produced by `utils.export_statement`
+
+    Yields:
+        One JSON document per row, terminated by a newline
+    """
+    for row in rows:
+        yield json.dumps(record(row)) + "\n"
+
+
+class _ChunkSink:
+    """Write-only file object that accumulates written chunks.
+
+    Parquet writer flushes every row group into this sink, and accumulated
+    bytes are yielded to the consumer after each group.
+    """
+
+    def __init__(self):
+        self.chunks: list[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        """Return accumulated bytes and reset the buffer.
+
+        Returns:
+            Bytes written since the previous call
+        """
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _parquet_schema() -> Any:
+    return pa.schema(
+        [
+            ("id", pa.string()),
+            ("url", pa.string()),
+            ("state", pa.string()),
+            ("created_at", pa.timestamp("us")),
+            ("resource_id", pa.string()),
+            ("package_id", pa.string()),
+            ("package_name", pa.string()),
+            ("organization_id", pa.string()),
+            ("details", pa.string()),
+        ]
+    )
+
+
+def iter_parquet(rows: Iterable[Any], group_size: int) -> Iterator[bytes]:
+    """Serialize rows as a Parquet file written in row groups.
+
+    Every `group_size` rows are converted into a columnar batch and written as
+    a separate row group. `details` are stored as JSON strings.
+
+    Args:
+        rows: Rows produced by `utils.export_statement`
+        group_size: Number of rows in a single row group
+
+    Yields:
+        Chunks of the Parquet file
+
+    Raises:
+        RuntimeError: `pyarrow` is not installed
+    """
+    if not parquet_available():
+        msg = "Parquet export requires pyarrow. Install ckanext-check-link[parquet]"
+        raise RuntimeError(msg)
+
+    schema = _parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    iterator = iter(rows)
+
+    try:
+        while batch := list(islice(iterator, group_size)):
+            columns: dict[str, list[Any]] = {name: [] for name in schema.names}
+            for row in batch:
+                columns["id"].append(row.id)
+                columns["url"].append(row.url)
+                columns["state"].append(row.state)
+                columns["created_at"].append(row.created_at)
+                columns["resource_id"].append(row.resource_id)
+                columns["package_id"].append(row.package_id)
+                columns["package_name"].append(row.package_name)
+                columns["organization_id"].append(row.organization_id)
+                columns["details"].append(json.dumps(row.details))
+
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+
+    yield sink.drain()
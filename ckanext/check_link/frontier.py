@@ -0,0 +1,125 @@
+"""Disk-backed work list for long-running CLI checks.
+
+At the start of the run, `(resource_id, package_id, url)` triples are copied
+into a local SQLite file. Items are marked as done when their reports are
+saved, so an interrupted run can be resumed from the same file. Items are read
+back in pages, so the list of resources is never held in memory.
+
+Resources skipped by the check because of invalid URLs have no reports and
+remain pending. They are validated again on resume, without network requests.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from collections.abc import Iterable, Iterator
+from itertools import islice
+from typing import Any
+
+__all__ = ["Frontier"]
+
+PENDING = "pending"
+DONE = "done"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS frontier (
+    resource_id TEXT PRIMARY KEY,
+    package_id TEXT,
+    url TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    state TEXT
+);
+CREATE INDEX IF NOT EXISTS frontier_status_idx ON frontier (status);
+"""
+
+
+class Frontier:
+    """Resumable list of resources that are subject to checking.
+
+    The frontier is shared by stages of the processing pipeline, which run in
+    different threads, so every operation is serialized by the lock.
+
+    Args:
+        path: Path to the SQLite file
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        """Close the underlying connection."""
+        with self.lock:
+            self.conn.close()
+
+    def reset(self, rows: Iterable[tuple[str, str, str]], chunk: int = 1000):
+        """Replace the content of the frontier with a new work list.
+
+        Args:
+            rows: Iterable of `(resource_id, package_id, url)` triples
+            chunk: Number of rows inserted in a single statement
+        """
+        with self.lock:
+            self.conn.execute("DELETE FROM frontier")
+            iterator = iter(rows)
+            while batch := [tuple(row) for row in islice(iterator, chunk)]:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO frontier (resource_id, package_id, url) VALUES (?, ?, ?)",
+                    batch,
+                )
+            self.conn.commit()
+
+    def stats(self) -> dict[str, int]:
+        """Count items in every status.
+
+        Returns:
+            Number of items per status
+        """
+        with self.lock:
+            return dict(self.conn.execute("SELECT status, count(*) FROM frontier GROUP BY status").fetchall())
+
+    def pending(self, page_size: int) -> Iterator[tuple[str, str, str]]:
+        """Iterate over items that are not processed yet.
+
+        Items are fetched in pages using the position of the last item, so
+        marking items as done during iteration does not shift the pages.
+
+        Args:
+            page_size: Number of items fetched at once
+
+        Yields:
+            `(resource_id, package_id, url)` triples
+        """
+        last = 0
+        while True:
+            with self.lock:
+                page = self.conn.execute(
+                    "SELECT rowid, resource_id, package_id, url FROM frontier"
+                    " WHERE status = ? AND rowid > ? ORDER BY rowid LIMIT ?",
+                    (PENDING, last, page_size),
+                ).fetchall()
+
+            if not page:
+                return
+
+            last = page[-1][0]
+            for _rowid, resource_id, package_id, url in page:
+                yield resource_id, package_id, url
+
+    def mark_saved(self, reports: Iterable[dict[str, Any]]):
+        """Mark resources of saved reports as done.
+
+        Args:
+            reports: Saved reports
+        """
+        values = [(DONE, r["state"], r["resource_id"]) for r in reports if r.get("resource_id")]
+        if not values:
+            return
+
+        with self.lock:
+            self.conn.executemany("UPDATE frontier SET status = ?, state = ? WHERE resource_id = ?", values)
+            self.conn.commit()
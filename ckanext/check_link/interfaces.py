@@ -0,0 +1,71 @@
+"""Plugin interfaces of the ckanext-check-link extension."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from ckan.plugins import Interface
+
+if TYPE_CHECKING:
+    from ckanext.check_link.local import UrlChecker
+
+
+class ICheckLink(Interface):
+    """Extension point for reacting on link checks.
+
+    Check hooks receive the whole batch of URLs or reports and are called
+    once per batch, so implementations can process results with a single query
+    or message instead of doing it for every report.
+
+    Example:
+        ```python
+        class QualityPlugin(p.SingletonPlugin):
+            p.implements(ICheckLink, inherit=True)
+
+            def after_save(self, reports):
+                update_scores({r["resource_id"]: r["state"] for r in reports})
+        ```
+    """
+
+    def before_check(self, urls: list[str]) -> None:
+        """Called before URLs of the batch are checked.
+
+        The list can be modified in place to remove or replace URLs.
+
+        Args:
+            urls: URLs that are going to be checked
+        """
+
+    def after_check(self, reports: list[dict[str, Any]]) -> None:
+        """Called when the batch is checked, before reports are saved.
+
+        Reports of resources contain `resource_id` and `package_id`.
+
+        Args:
+            reports: Check results with `url`, `state`, `code`, `reason`,
+                `explanation` and other details
+        """
+
+    def after_save(self, reports: list[dict[str, Any]]) -> None:
+        """Called when the batch of reports is committed to the database.
+
+        Reports removed because of `clear_available` are not included.
+
+        Args:
+            reports: Saved rows with `id`, `url`, `state`, `resource_id`,
+                `details` and `created_at`
+        """
+
+    def get_url_checkers(self, checkers: list[UrlChecker]) -> list[UrlChecker]:
+        """Modify the chain of checkers that verify URLs without network requests.
+
+        Links claimed by none of checkers, or left undecided by them, are
+        checked over the network.
+
+        Args:
+            checkers: Enabled built-in checkers and checkers of other plugins
+
+        Returns:
+            Checkers in the order they are applied
+        """
+        return checkers
@@ -0,0 +1,264 @@
+"""Checkers that verify URLs of the portal without network requests.
+
+Links to the portal itself, e.g. uploaded resources, would otherwise be
+checked through the load balancer, keeping web workers busy and paying full
+network latency. Before the network check, every link is offered to the chain
+of `UrlChecker` objects. A checker that claims the link either sets its state
+or leaves it undecided, and undecided links are passed to the next checker and
+eventually to the network.
+
+Built-in checkers:
+
+* `UploadChecker` - downloads of uploaded resources are verified against the
+  local filestore;
+* `SiteChecker` - other URLs served by CKAN are requested in-process. Pages
+  are rendered by the process that runs the check, so it is disabled by
+  default, to keep web workers free when checks are triggered by API calls.
+
+Extensions modify the chain through `ICheckLink.get_url_checkers`.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+import time
+from collections.abc import Iterable
+from typing import Any
+from urllib.parse import SplitResult, urlsplit
+
+import flask
+import sqlalchemy as sa
+from check_link import Link
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import RoutingException
+
+import ckan.plugins as p
+import ckan.plugins.toolkit as tk
+from ckan import model
+from ckan.lib import uploader
+
+from .interfaces import ICheckLink
+
+log = logging.getLogger(__name__)
+
+CONFIG_LOCAL_UPLOADS = "ckanext.check_link.check.local_uploads"
+DEFAULT_LOCAL_UPLOADS = True
+
+CONFIG_LOCAL_SITE = "ckanext.check_link.check.local_site"
+DEFAULT_LOCAL_SITE = False
+
+__all__ = ["SiteChecker", "UploadChecker", "UrlChecker", "check_local", "get_checkers"]
+
+
+class UrlChecker:
+    """Checker of links that can be verified without network requests.
+
+    Subclasses select links by scheme and host of the URL and check the
+    whole batch of selected links at once.
+    """
+
+    def match(self, url: SplitResult) -> bool:
+        """Decide whether the link is handled by the checker.
+
+        Args:
+            url: Parsed URL of the link
+
+        Returns:
+            True if the link must be passed to `check`
+        """
+        return False
+
+    def check(self, links: list[Link]) -> list[Link]:
+        """Check links and update their state.
+
+        Args:
+            links: Links selected by `match`
+
+        Returns:
+            Links that the checker cannot decide about
+        """
+        return links
+
+
+class _SiteMixin:
+    """Selection of links pointing to the portal."""
+
+    def __init__(self, site_url: str):
+        site = urlsplit(site_url)
+        self.scheme = site.scheme
+        self.netloc = site.netloc.lower()
+        self.root = site.path.rstrip("/")
+
+    def match(self, url: SplitResult) -> bool:
+        return (
+            url.scheme == self.scheme
+            and url.netloc.lower() == self.netloc
+            and (url.path == self.root or url.path.startswith(self.root + "/"))
+        )
+
+
+class UploadChecker(_SiteMixin, UrlChecker):
+    """Checker of uploaded resources.
+
+    Download URLs are resolved into resources with a single query and files
+    are looked up in the local filestore. Only uploaded resources are reported
+    as missing. Unknown resources, resources stored by other uploaders and
+    resources that redirect to external URLs remain undecided.
+
+    Args:
+        site_url: Base URL of the portal
+    """
+
+    pattern = re.compile(r"/resource/(?P<resource_id>[^/]+)/download(?:/[^/]*)?/?$")
+
+    def match(self, url: SplitResult) -> bool:
+        return super().match(url) and bool(self.pattern.search(url.path))
+
+    def check(self, links: list[Link]) -> list[Link]:
+        ids = {id(link): self._resource_id(link) for link in links}
+        resources = {
+            row.id: row
+            for row in model.Session.execute(
+                sa.select(model.Resource.id, model.Resource.url, model.Resource.url_type, model.Resource.state).where(
+                    model.Resource.id.in_(set(ids.values()))
+                )
+            )
+        }
+
+        undecided: list[Link] = []
+        for link in links:
+            resource = resources.get(ids[id(link)])
+            # URLs that look like downloads but cannot be resolved into an
+            # uploaded resource are served by something else
+            path = self._path(resource) if resource and resource.url_type == "upload" else None
+            if path is None:
+                undecided.append(link)
+            elif resource.state == "active" and os.path.isfile(path):
+                link.state_from_code(200, "OK", {})
+            else:
+                link.state_from_code(404, "Not Found", {})
+
+        return undecided
+
+    def _resource_id(self, link: Link) -> str:
+        match = self.pattern.search(urlsplit(link.link).path)
+        return match["resource_id"] if match else ""
+
+    def _path(self, resource: Any) -> str | None:
+        upload = uploader.get_resource_uploader({"id": resource.id, "url": resource.url, "url_type": "upload"})
+        # other uploaders may return keys of remote storages from get_path
+        if not isinstance(upload, uploader.ResourceUpload) or not upload.storage_path:
+            return None
+
+        return upload.get_path(resource.id)
+
+
+class SiteChecker(_SiteMixin, UrlChecker):
+    """Checker of pages served by the portal.
+
+    URLs that are routed by the application are requested through the test
+    client of the Flask application. Requests are made from a separate
+    thread, so they do not share the database session and request globals
+    with the caller. Redirects, unknown routes and failed requests remain
+    undecided, because they may be served by other applications on the
+    same host.
+
+    Args:
+        site_url: Base URL of the portal
+        app: Flask application of the portal
+    """
+
+    def __init__(self, site_url: str, app: flask.Flask):
+        super().__init__(site_url)
+        self.site_url = site_url
+        self.app = app
+
+    def check(self, links: list[Link]) -> list[Link]:
+        undecided: list[Link] = []
+        thread = threading.Thread(target=self._check, args=(links, undecided), daemon=True)
+        thread.start()
+        thread.join()
+
+        return undecided
+
+    def _check(self, links: list[Link], undecided: list[Link]):
+        client = self.app.test_client()
+        adapter = self.app.url_map.bind(self.netloc, script_name=self.root or None)
+        try:
+            undecided.extend(link for link in links if not self._request(client, adapter, link))
+        finally:
+            model.Session.remove()
+
+    def _request(self, client: Any, adapter: Any, link: Link) -> bool:
+        url = urlsplit(link.link)
+        path = url.path[len(self.root) :] or "/"
+
+        try:
+            adapter.match(path, method="GET")
+        except (HTTPException, RoutingException):
+            return False
+
+        try:
+            resp = client.head(path, query_string=url.query, base_url=self.site_url, headers=link.headers)
+        except Exception:
+            log.exception("In-process check of %s failed", link.link)
+            return False
+
+        if 300 <= resp.status_code < 400:  # noqa: PLR2004
+            return False
+
+        link.state_from_code(resp.status_code, resp.status.partition(" ")[2], resp.headers)
+        return True
+
+
+def get_checkers() -> list[UrlChecker]:
+    """Build the chain of local checkers.
+
+    Returns:
+        Checkers in the order they are applied
+    """
+    site_url = tk.config["ckan.site_url"]
+    checkers: list[UrlChecker] = []
+
+    if tk.asbool(tk.config.get(CONFIG_LOCAL_UPLOADS, DEFAULT_LOCAL_UPLOADS)):
+        checkers.append(UploadChecker(site_url))
+
+    if tk.asbool(tk.config.get(CONFIG_LOCAL_SITE, DEFAULT_LOCAL_SITE)) and flask.has_app_context():
+        checkers.append(SiteChecker(site_url, flask.current_app._get_current_object()))  # noqa: SLF001
+
+    for plugin in p.PluginImplementations(ICheckLink):
+        checkers = plugin.get_url_checkers(checkers)
+
+    return checkers
+
+
+def check_local(links: Iterable[Link], checkers: Iterable[UrlChecker], deadline: float | None = None) -> list[Link]:
+    """Check links by local checkers.
+
+    Args:
+        links: Links to check
+        checkers: Chain of checkers
+        deadline: Value of `time.monotonic()` after which links are not
+            passed to remaining checkers
+
+    Returns:
+        Links that must be checked over the network
+    """
+    remaining = list(links)
+    for checker in checkers:
+        if not remaining or (deadline is not None and time.monotonic() >= deadline):
+            break
+
+        own: list[Link] = []
+        rest: list[Link] = []
+        for link in remaining:
+            (own if checker.match(urlsplit(link.link)) else rest).append(link)
+
+        if own:
+            rest.extend(checker.check(own))
+        remaining = rest
+
+    return remaining
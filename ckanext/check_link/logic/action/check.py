@@ -7,26 +7,37 @@ provide the foundation for all link checking functionality in the extension.
 
 from __future__ import annotations
 
-import contextlib
 import logging
 from collections.abc import Iterable
 from itertools import islice
 from typing import Any
 
-from check_link import Link, check_all
+import pysolr
+import sqlalchemy as sa
+from check_link import AsyncChecker, Link, State
 
+import ckan.plugins as p
 import ckan.plugins.toolkit as tk
-from ckan import types
+from ckan import authz, model, types
+from ckan.lib.plugins import get_permission_labels
+from ckan.lib.search.common import make_connection
 from ckan.lib.search.query import solr_literal
 from ckan.logic import validate
 
 from ckanext.toolbelt.decorators import Collector
 
+from ckanext.check_link import checker, local, metrics, processing, rules, selectors, urls, utils
+from ckanext.check_link.interfaces import ICheckLink
 from ckanext.check_link.logic import schema
+from ckanext.check_link.model import Url
+from ckanext.check_link.processing import save_reports
 
 CONFIG_TIMEOUT = "ckanext.check_link.check.timeout"
 DEFAULT_TIMEOUT = 10
 
+CONFIG_SEARCH_PAGE_SIZE = "ckanext.check_link.search.page_size"
+DEFAULT_SEARCH_PAGE_SIZE = 1000
+
 action: Any
 log = logging.getLogger(__name__)
 action, get_actions = Collector().split()
@@ -49,43 +60,270 @@ def check_link_url_check(context: types.Context, data_dict: dict[str, Any]):
             - clear_available: Whether to remove available reports when saving (default: False)
             - skip_invalid: Whether to skip invalid URLs instead of raising error (default: False)
             - link_patch: Additional parameters for link checking (default: {})
+            - deadline: Number of seconds after which unfinished checks are reported as pending (optional)
+            - defer: Whether to check pending links in a background job (default: False)
 
     Returns:
         List of dictionaries containing check results with keys: url, state, code, reason, explanation
+        and, unless disabled by the config option, timings of the request.
+        Reports of redirected URLs contain `redirect` with the chain of
+        redirects and the final URL. When fingerprinting is enabled, reports also contain the `fingerprint`
+        of the content and the `changed` flag, that is set when the digest
+        differs from the one recorded by the previous check of the URL
+
+    The deadline covers hooks and local checks as well: once it is reached,
+    remaining links are reported as pending without being checked. With
+    `defer`, reports that are finished after the deadline are saved by the
+    same background job that checks pending links.
+
+    `ICheckLink.before_check` and `ICheckLink.after_check` are not called
+    when the context contains `check_link_before_check=False` and
+    `check_link_after_check=False`. Callers that attach resource IDs to
+    reports use them to call hooks themselves. With
+    `check_link_positions=True` in the context, every report contains the
+    `position` of its URL in the `url` list, because invalid and skipped URLs
+    have no reports.
     """
     tk.check_access("check_link_url_check", context, data_dict)
+    deadline = processing.deadline(context, data_dict)
+
+    if context.get("check_link_before_check", True):
+        for plugin in p.PluginImplementations(ICheckLink):
+            plugin.before_check(data_dict["url"])
+
+    links, pending, aliases, positions = _make_links(data_dict)
+
+    # Links to the portal itself are checked without network requests
+    remote = local.check_local(pending, local.get_checkers(), deadline)
+    collect_timings = checker.collect_timings()
+    fingerprint = checker.fingerprint()
+    timed = checker.make_checker(_cached_redirects(remote)) if remote else None
+
+    # Execute the link checking for all remaining links. Links are updated
+    # in place, so results are collected from the original list
+    metrics.in_flight.inc(len(remote))
+    try:
+        with metrics.phase("network"):
+            unfinished = checker.check_links(
+                remote, (lambda: timed) if timed else AsyncChecker, processing.remaining(deadline)
+            )
+    finally:
+        metrics.in_flight.dec(len(remote))
+
+    unfinished_ids = set(map(id, unfinished))
+    reports: list[dict[str, Any]] = []
+    for link, position in zip(links, positions, strict=True):
+        # repeated URLs are checked once and share the result
+        source = aliases.get(id(link), link)
+        report = dict(_make_report(source, pending=id(source) in unfinished_ids), url=link.link)
+        report.update(_recorded(timed, id(source), collect_timings=collect_timings, fingerprint=fingerprint))
+        if context.get("check_link_positions"):
+            report["position"] = position
+        reports.append(report)
+
+    if fingerprint:
+        _mark_changed(reports)
+
+    metrics.record_reports(reports)
+
+    if context.get("check_link_after_check", True):
+        for plugin in p.PluginImplementations(ICheckLink):
+            plugin.after_check(reports)
+
+    _save_or_defer(context, reports, data_dict, deadline)
+    return reports
+
+
+def _save_or_defer(
+    context: types.Context, reports: list[dict[str, Any]], data_dict: dict[str, Any], deadline: float | None
+):
+    """Save reports and enqueue the check of pending links.
+
+    When the deadline is reached and pending links are deferred, reports are
+    saved by the same background job instead of the current call.
+
+    Args:
+        context: CKAN context dictionary containing user and session information
+        reports: Check results
+        data_dict: Dictionary with `save`, `defer`, `clear_available`,
+            `skip_invalid` and `link_patch`
+        deadline: Deadline of the check
+    """
+    late = data_dict["defer"] and (
+        processing.remaining(deadline) == 0 or any(r["state"] == processing.STATE_PENDING for r in reports)
+    )
+    if data_dict["save"] and not late:
+        save_reports(context, reports, data_dict["clear_available"])
+
+    if data_dict["defer"]:
+        processing.defer_pending(reports, data_dict, save=late and data_dict["save"])
+
+
+def _make_report(link: Link, *, pending: bool) -> dict[str, Any]:
+    """Convert checked link into report.
+
+    Args:
+        link: Checked link
+        pending: Whether the check did not finish before the deadline
+
+    Returns:
+        Report with `url`, `state`, `code`, `reason` and `explanation`
+    """
+    if pending:
+        return {
+            "url": link.link,
+            "state": processing.STATE_PENDING,
+            "code": None,
+            "reason": None,
+            "explanation": "Check did not finish before the deadline",
+        }
+
+    return {
+        "url": link.link,
+        "state": link.state.name,
+        "code": link.code,
+        "reason": link.reason,
+        "explanation": link.details,
+    }
+
+
+def _recorded(
+    timed: checker.TimedChecker | None, key: int, *, collect_timings: bool, fingerprint: bool
+) -> dict[str, Any]:
+    """Collect data recorded by the checker for the link.
+
+    Args:
+        timed: Checker used for network requests, if any
+        key: `id()` of the checked link
+        collect_timings: Whether timings are included
+        fingerprint: Whether the fingerprint is included
+
+    Returns:
+        Timings, redirects, `Retry-After` header and fingerprint of the link
+    """
+    result: dict[str, Any] = {}
+    if collect_timings:
+        result["timings"] = timed.timings.get(key) if timed else None
+
+    if timed and (redirect := timed.redirects.get(key)):
+        result["redirect"] = redirect
+
+    if timed and (retry_after := timed.retry_after.get(key)):
+        result["retry_after"] = retry_after
+
+    if fingerprint:
+        result["fingerprint"] = timed.fingerprints.get(key) if isinstance(timed, checker.FingerprintChecker) else None
+
+    return result
+
+
+def _cached_redirects(links: list[Link]) -> dict[int, dict[str, Any]]:
+    """Load redirects recorded by previous checks of links.
+
+    Only redirects with a `target`, i.e. starting with permanent redirects,
+    are loaded, because the target can be requested instead of the link.
+
+    Args:
+        links: Links that will be checked over the network
+
+    Returns:
+        Redirect details, using `id()` of the link as a key
+    """
+    if not checker.cache_redirects():
+        return {}
+
+    hashes = {urls.url_hash(link.link): id(link) for link in links}
+    rows = model.Session.execute(
+        sa.select(Url.id, Url.details["redirect"]).where(
+            Url.id.in_(hashes),
+            Url.details[("redirect", "target")].astext.isnot(None),
+        )
+    )
+
+    return {hashes[url_id]: redirect for url_id, redirect in rows}
+
+
+def _mark_changed(reports: list[dict[str, Any]]):
+    """Compare fingerprints of reports with the previous results of URLs.
+
+    The previous digest is taken from the shared result of the URL, so a
+    single query serves the whole batch. Reports without fingerprint, and
+    URLs that were never fingerprinted, are not marked as changed.
+
+    Args:
+        reports: Reports with `url` and `fingerprint`. Updated in place
+    """
+    fingerprinted = {urls.url_hash(r["url"]): r for r in reports if r["fingerprint"]}
+    previous: dict[str, str | None] = {}
+    if fingerprinted:
+        previous = dict(
+            model.Session.execute(
+                sa.select(Url.id, Url.details[("fingerprint", "digest")].astext).where(Url.id.in_(fingerprinted))
+            ).all()
+        )
+
+    for report in reports:
+        digest = previous.get(urls.url_hash(report["url"])) if report["fingerprint"] else None
+        report["changed"] = digest is not None and digest != report["fingerprint"]["digest"]
+
+
+def _make_links(data_dict: dict[str, Any]) -> tuple[list[Link], list[Link], dict[int, Link], list[int]]:
+    """Build links from URLs of the check.
+
+    Configured rules are applied before links are constructed: skipped URLs
+    are dropped, links to internal hosts and links that are always available
+    get their state immediately and the rest may get a custom timeout. URLs
+    with the same canonical form are checked only once.
+
+    Args:
+        data_dict: Dictionary with `url`, `link_patch` and `skip_invalid`
+
+    Returns:
+        All links in the original order, links that must be checked,
+        mapping from `id()` of repeated links to the checked link and
+        positions of all links in the list of URLs
+
+    Raises:
+        ValidationError: If an URL is invalid and `skip_invalid` is not set
+    """
     timeout: int = tk.asint(tk.config.get(CONFIG_TIMEOUT, DEFAULT_TIMEOUT))
+    compiled = rules.get_rules()
     links: list[Link] = []
+    pending: list[Link] = []
+    checked: dict[str, Link] = {}
+    aliases: dict[int, Link] = {}
+    positions: list[int] = []
 
     kwargs: dict[str, Any] = data_dict["link_patch"]
     kwargs.setdefault("timeout", timeout)
 
-    for url in data_dict["url"]:
+    for position, url in enumerate(data_dict["url"]):
+        match = compiled.match(url) if compiled else rules.Match()
+        if match.action == rules.SKIP:
+            log.debug("Skipping url by rule: %s", url)
+            continue
+
         try:
-            links.append(Link(url, **kwargs))
-        except ValueError as e:  # noqa: PERF203
+            link = Link(url, **(dict(kwargs, timeout=match.timeout) if match.timeout else kwargs))
+        except ValueError as e:
             if data_dict["skip_invalid"]:
                 log.debug("Skipping invalid url: %s", url)
-            else:
-                raise tk.ValidationError({"url": ["Must be a valid URL"]}) from e
-
-    # Execute the link checking for all collected links
-    reports: list[dict[str, Any]] = [
-        {
-            "url": link.link,
-            "state": link.state.name,
-            "code": link.code,
-            "reason": link.reason,
-            "explanation": link.details,
-        }
-        for link in check_all(links)
-    ]
+                continue
+            raise tk.ValidationError({"url": ["Must be a valid URL"]}) from e
+
+        links.append(link)
+        positions.append(position)
+        if match.action == rules.INTERNAL:
+            link.state, link.details = State.unknown, "Link points to an internal host and is not checked"
+        elif match.action == rules.AVAILABLE:
+            link.state, link.details = State.available, "Link is available according to the configured rules"
+        elif (key := urls.canonical(url)) in checked:
+            aliases[id(link)] = checked[key]
+        else:
+            checked[key] = link
+            pending.append(link)
 
-    # Save reports to database if requested
-    if data_dict["save"]:
-        _save_reports(context, reports, data_dict["clear_available"])
-
-    return reports
+    return links, pending, aliases, positions
 
 
 @action
@@ -104,22 +342,32 @@ def check_link_resource_check(context: types.Context, data_dict: dict[str, Any])
             - save: Whether to save results to database (default: False)
             - clear_available: Whether to remove available reports when saving (default: False)
             - link_patch: Additional parameters for link checking (default: {})
+            - deadline: Number of seconds after which the unfinished check is reported as pending (optional)
+            - defer: Whether to check the pending link in a background job (default: False)
 
     Returns:
         Dictionary containing check result with resource metadata
+
+    Raises:
+        ValidationError: If the URL of the resource is skipped by link rules
     """
     tk.check_access("check_link_resource_check", context, data_dict)
+    deadline = processing.deadline(context, data_dict)
     resource = tk.get_action("resource_show")(context, data_dict)
 
     result = tk.get_action("check_link_url_check")(
-        context, {"url": [resource["url"]], "link_patch": data_dict["link_patch"]}
+        dict(context, check_link_after_check=False, check_link_deadline=deadline),
+        {"url": [resource["url"]], "link_patch": data_dict["link_patch"]},
     )
 
-    report = dict(result[0], resource_id=resource["id"], package_id=resource["package_id"])
+    if not result:
+        raise tk.ValidationError({"url": ["URL is skipped by link rules"]})
 
-    if data_dict["save"]:
-        _save_reports(context, [report], data_dict["clear_available"])
+    report = dict(result[0], resource_id=resource["id"], package_id=resource["package_id"])
+    for plugin in p.PluginImplementations(ICheckLink):
+        plugin.after_check([report])
 
+    _save_or_defer(context, [report], dict(data_dict, skip_invalid=False), deadline)
     return report
 
 
@@ -129,8 +377,8 @@ def check_link_package_check(context: types.Context, data_dict: dict[str, Any]):
     """Check all resources within a specific package.
 
     This action performs comprehensive checking of all resources within a package.
-    It uses search-based checking to efficiently process all resources and can
-    include draft and private resources based on configuration.
+    Resources are selected directly from the database and the package can
+    be draft or private, depending on filters and permissions of the user.
 
     Args:
         context: CKAN context dictionary containing user and session information
@@ -142,16 +390,14 @@ def check_link_package_check(context: types.Context, data_dict: dict[str, Any]):
             - include_drafts: Whether to include draft resources (default: False)
             - include_private: Whether to include private resources (default: False)
             - link_patch: Additional parameters for link checking (default: {})
+            - deadline: Number of seconds after which remaining links are reported as pending (optional)
+            - defer: Whether to check pending links in a background job (default: False)
 
     Returns:
         List of check results for all resources in the package
     """
     tk.check_access("check_link_package_check", context, data_dict)
-    return _search_check(
-        context,
-        "res_url:* (id:{0} OR name:{0})".format(solr_literal(data_dict["id"])),
-        data_dict,
-    )["reports"]
+    return _scope_check(context, selectors.by_ids(_packages(context, data_dict), [data_dict["id"]]), data_dict)
 
 
 @action
@@ -159,7 +405,7 @@ def check_link_package_check(context: types.Context, data_dict: dict[str, Any]):
 def check_link_organization_check(context: types.Context, data_dict: dict[str, Any]):
     """Check all resources within a specific organization.
 
-    This action performs organization-wide link checking by finding all packages
+    This action performs organization-wide link checking by selecting all packages
     owned by the specified organization and checking all resources within them.
     It supports filtering for draft and private resources.
 
@@ -173,17 +419,19 @@ def check_link_organization_check(context: types.Context, data_dict: dict[str, A
             - include_drafts: Whether to include draft resources (default: False)
             - include_private: Whether to include private resources (default: False)
             - link_patch: Additional parameters for link checking (default: {})
+            - deadline: Number of seconds after which remaining links are reported as pending (optional)
+            - defer: Whether to check pending links in a background job (default: False)
 
     Returns:
         List of check results for all resources in the organization
     """
     tk.check_access("check_link_organization_check", context, data_dict)
 
-    return _search_check(
+    return _scope_check(
         context,
-        "res_url:* owner_org:{}".format(solr_literal(data_dict["id"])),
+        selectors.by_organization(_packages(context, data_dict), data_dict["id"]),
         data_dict,
-    )["reports"]
+    )
 
 
 @action
@@ -191,7 +439,7 @@ def check_link_organization_check(context: types.Context, data_dict: dict[str, A
 def check_link_group_check(context: types.Context, data_dict: dict[str, Any]):
     """Check all resources within a specific group.
 
-    This action performs group-based link checking by finding all packages
+    This action performs group-based link checking by selecting all packages
     associated with the specified group and checking all resources within them.
     It supports filtering for draft and private resources.
 
@@ -205,13 +453,15 @@ def check_link_group_check(context: types.Context, data_dict: dict[str, Any]):
             - include_drafts: Whether to include draft resources (default: False)
             - include_private: Whether to include private resources (default: False)
             - link_patch: Additional parameters for link checking (default: {})
+            - deadline: Number of seconds after which remaining links are reported as pending (optional)
+            - defer: Whether to check pending links in a background job (default: False)
 
     Returns:
         List of check results for all resources in the group
     """
     tk.check_access("check_link_group_check", context, data_dict)
 
-    return _search_check(context, "res_url:* groups:{}".format(solr_literal(data_dict["id"])), data_dict)["reports"]
+    return _scope_check(context, selectors.by_group(_packages(context, data_dict), data_dict["id"]), data_dict)
 
 
 @action
@@ -219,7 +469,7 @@ def check_link_group_check(context: types.Context, data_dict: dict[str, Any]):
 def check_link_user_check(context: types.Context, data_dict: dict[str, Any]):
     """Check all resources created by a specific user.
 
-    This action performs user-based link checking by finding all packages
+    This action performs user-based link checking by selecting all packages
     created by the specified user and checking all resources within them.
     It supports filtering for draft and private resources.
 
@@ -233,17 +483,15 @@ def check_link_user_check(context: types.Context, data_dict: dict[str, Any]):
             - include_drafts: Whether to include draft resources (default: False)
             - include_private: Whether to include private resources (default: False)
             - link_patch: Additional parameters for link checking (default: {})
+            - deadline: Number of seconds after which remaining links are reported as pending (optional)
+            - defer: Whether to check pending links in a background job (default: False)
 
     Returns:
         List of check results for all resources created by the user
     """
     tk.check_access("check_link_user_check", context, data_dict)
 
-    return _search_check(
-        context,
-        "res_url:* creator_user_id:{}".format(solr_literal(data_dict["id"])),
-        data_dict,
-    )["reports"]
+    return _scope_check(context, selectors.by_user(_packages(context, data_dict), data_dict["id"]), data_dict)
 
 
 @action
@@ -254,7 +502,7 @@ def check_link_search_check(context: types.Context, data_dict: dict[str, Any]):
     This action provides maximum flexibility by allowing link checking based
     on any CKAN search query. It finds packages matching the query and checks
     all resources within those packages. This is the most versatile checking
-    method and serves as the foundation for other search-based checks.
+    method and the only one that relies on the search index.
 
     Args:
         context: CKAN context dictionary containing user and session information
@@ -268,6 +516,8 @@ def check_link_search_check(context: types.Context, data_dict: dict[str, Any]):
             - start: Starting index for results (default: 0)
             - rows: Maximum number of packages to check (default: 10)
             - link_patch: Additional parameters for link checking (default: {})
+            - deadline: Number of seconds after which remaining links are reported as pending (optional)
+            - defer: Whether to check pending links in a background job (default: False)
 
     Returns:
         Dictionary with 'reports' key containing list of check results
@@ -277,12 +527,72 @@ def check_link_search_check(context: types.Context, data_dict: dict[str, Any]):
     return _search_check(context, data_dict["fq"], data_dict)["reports"]
 
 
+def _packages(context: types.Context, data_dict: dict[str, Any]):
+    """Select packages visible to the user according to check filters.
+
+    Args:
+        context: CKAN context dictionary containing user and session information
+        data_dict: Dictionary with `include_drafts` and `include_private` flags
+
+    Returns:
+        Package selector
+    """
+    return selectors.packages(context, data_dict["include_drafts"], data_dict["include_private"])
+
+
+def _scope_check(context: types.Context, packages: Any, data_dict: dict[str, Any]) -> list[dict[str, Any]]:
+    """Check resources of packages selected from the database.
+
+    Args:
+        context: CKAN context dictionary containing user and session information
+        packages: Package selector
+        data_dict: Dictionary containing check parameters including save options,
+                  pagination and link checking parameters
+
+    Returns:
+        List of check results
+    """
+    packages = selectors.paginate(packages, data_dict["start"], data_dict["rows"])
+    size = processing.batch_size()
+    rows = utils.stream_rows(selectors.resources(packages), size)
+
+    return _check_batches(context, processing.batches(rows, size), data_dict)
+
+
+def _check_batches(context: types.Context, batches: Iterable[list[Any]], data_dict: dict[str, Any]):
+    """Check batches of resources through the staged pipeline.
+
+    The next batch is enumerated and the previous one is saved while the
+    current batch is being checked. When the deadline is reached, remaining
+    batches are reported as pending without network requests.
+
+    Args:
+        context: CKAN context dictionary containing user and session information
+        batches: Lazy iterable of lists with `(resource_id, package_id, url)` triples
+        data_dict: Dictionary containing check parameters
+
+    Returns:
+        List of check results
+    """
+    reports: list[dict[str, Any]] = []
+    # all batches share the deadline of the action
+    context = dict(context, check_link_deadline=processing.deadline(context, data_dict))
+    processing.Pipeline(context, data_dict, on_checked=lambda _rows, batch: reports.extend(batch)).run(batches)
+
+    # pending links of all batches are checked by a single job
+    if data_dict["defer"]:
+        processing.defer_pending(reports, data_dict)
+
+    return reports
+
+
 def _search_check(context: types.Context, fq: str, data_dict: dict[str, Any]):
     """Perform a search-based link check operation.
 
     This internal function executes the core logic for search-based link checking.
-    It searches for packages matching the specified query, extracts resource URLs,
-    performs the link checks, and optionally saves the results to the database.
+    It searches for IDs of packages matching the specified query, selects their
+    resources from the database, performs the link checks, and optionally saves
+    the results to the database.
 
     Args:
         context: CKAN context dictionary containing user and session information
@@ -293,95 +603,114 @@ def _search_check(context: types.Context, fq: str, data_dict: dict[str, Any]):
     Returns:
         Dictionary with 'reports' key containing list of check results
     """
-    # Prepare search parameters with filtering options
-    params = {
-        "fq": fq,
-        "start": data_dict["start"],
-        "include_drafts": data_dict["include_drafts"],
-        # "include_deleted": data_dict["include_deleted"],
-        "include_private": data_dict["include_private"],
+    rows = _search_resources(context, fq, data_dict)
+
+    return {
+        "reports": _check_batches(context, processing.batches(rows, processing.batch_size()), data_dict),
     }
 
-    # Extract resource URLs and their associated IDs from packages
-    pairs = [
-        ({"resource_id": res["id"], "package_id": pkg["id"]}, res["url"])
-        for pkg in islice(_iterate_search(context, params), data_dict["rows"])
-        for res in pkg["resources"]
-        if res["url"]  # Only include resources with URLs
-    ]
 
-    if not pairs:
-        return {"reports": []}
+def _search_resources(context: types.Context, fq: str, data_dict: dict[str, Any]):
+    """Iterate through resources of packages matching the search query.
 
-    # Separate patches and URLs for batch processing
-    patches, urls = zip(*pairs, strict=False)
+    Args:
+        context: CKAN context dictionary containing user and session information
+        fq: Search filter query to find packages
+        data_dict: Dictionary containing search parameters
 
-    # Perform URL checks for all extracted URLs
-    result = tk.get_action("check_link_url_check")(
-        context,
-        {
-            "url": urls,
-            "skip_invalid": data_dict["skip_invalid"],
-            "link_patch": data_dict["link_patch"],
-        },
-    )
+    Yields:
+        `(resource_id, package_id, url)` triples
+    """
+    start: int = data_dict["start"]
+    ids = islice(_iterate_search(context, fq, data_dict), start, start + data_dict["rows"])
+    page_size = tk.asint(tk.config.get(CONFIG_SEARCH_PAGE_SIZE, DEFAULT_SEARCH_PAGE_SIZE))
 
-    # Combine check results with resource/package IDs
-    reports = [dict(report, **patch) for patch, report in zip(patches, result, strict=False)]
+    for chunk in processing.batches(ids, page_size):
+        yield from model.Session.execute(selectors.resources(chunk))
 
-    # Save reports to database if requested
-    if data_dict["save"]:
-        _save_reports(context, reports, data_dict["clear_available"])
-
-    return {
-        "reports": reports,
-    }
 
+def _iterate_search(context: types.Context, fq: str, data_dict: dict[str, Any]):
+    """Iterate through IDs of packages matching the search query.
 
-def _iterate_search(context: types.Context, params: dict[str, Any]):
-    """Iterate through search results for packages.
+    This internal generator talks to Solr directly and requests only package
+    IDs. Results are fetched in large pages using `cursorMark` deep paging, so
+    the cost of the request does not grow with the offset. Packages without
+    resource URLs are excluded by the search engine. Visibility filters are the
+    same as in `package_search`.
 
-    This internal generator function handles pagination of package search results,
-    yielding packages one by one to avoid memory issues with large result sets.
-    It automatically handles the pagination by incrementing the start parameter.
+    Because `package_search` is not called, `IPackageController` search hooks,
+    like `before_dataset_search`, are not applied to the query. Filters of
+    such plugins must be added to `fq` by the caller.
 
     Args:
         context: CKAN context dictionary containing user and session information
-        params: Search parameters including query, start index, and filters
+        fq: Search filter query
+        data_dict: Dictionary with `include_drafts`, `include_private`, `start`
+            and `rows` parameters
 
     Yields:
-        Package dictionaries from search results
+        IDs of packages from search results
     """
-    params.setdefault("start", 0)
+    page_size = min(
+        tk.asint(tk.config.get(CONFIG_SEARCH_PAGE_SIZE, DEFAULT_SEARCH_PAGE_SIZE)),
+        data_dict["start"] + data_dict["rows"],
+    )
+    params: dict[str, Any] = {
+        "fl": "id",
+        "fq": _search_filters(context, fq, data_dict),
+        "rows": max(page_size, 1),
+        "sort": "index_id asc",
+        "cursorMark": "*",
+    }
 
+    conn = make_connection()
     while True:
-        pack = tk.get_action("package_search")(context.copy(), params)
-        if not pack["results"]:
-            return
+        try:
+            result = conn.search(q="*:*", **params)
+        except pysolr.SolrError as e:
+            log.exception("Search check failed: %s", params)
+            raise tk.ValidationError({"fq": [f"Search error: {e}"]}) from e
 
-        yield from pack["results"]
+        yield from (doc["id"] for doc in result.docs)
 
-        params["start"] += len(pack["results"])
+        if not result.docs or result.nextCursorMark == params["cursorMark"]:
+            return
 
+        params["cursorMark"] = result.nextCursorMark
 
-def _save_reports(context: types.Context, reports: Iterable[dict[str, Any]], clear: bool):
-    """Save link check reports to the database.
 
-    This internal function handles the database operations for saving link check
-    reports. It can optionally remove available reports when saving, which helps
-    keep the database clean by removing successful checks while retaining failed ones.
+def _search_filters(context: types.Context, fq: str, data_dict: dict[str, Any]) -> list[str]:
+    """Build Solr filters that mirror visibility rules of `package_search`.
 
     Args:
         context: CKAN context dictionary containing user and session information
-        reports: Iterable of report dictionaries to save to the database
-        clear: Whether to remove available reports when saving (keeps only failed checks)
+        fq: Search filter query
+        data_dict: Dictionary with `include_drafts` and `include_private` flags
+
+    Returns:
+        List of filter queries
     """
-    save = tk.get_action("check_link_report_save")
-    delete = tk.get_action("check_link_report_delete")
+    user = model.User.get(context.get("user") or "")
+    sysadmin = bool(user and authz.is_sysadmin(user.name))
 
-    for report in reports:
-        if clear and report["state"] == "available":
-            with contextlib.suppress(tk.ObjectNotFound):
-                delete(context.copy(), report)
-        else:
-            save(context.copy(), report)
+    filters = [
+        fq,
+        "+site_id:{}".format(solr_literal(tk.config["ckan.site_id"])),
+        "+res_url:?*",
+    ]
+
+    if data_dict["include_drafts"] and sysadmin:
+        filters.append("+state:(active OR draft)")
+    elif data_dict["include_drafts"] and user:
+        filters.append(f"+(state:active OR (state:draft AND creator_user_id:{solr_literal(user.id)}))")
+    else:
+        filters.append("+state:active")
+
+    if not data_dict["include_private"]:
+        filters.append("+capacity:public")
+
+    if not (data_dict["include_private"] and sysadmin):
+        labels = get_permission_labels().get_user_dataset_labels(user)
+        filters.append("+permission_labels:({})".format(" OR ".join(solr_literal(label) for label in labels)))
+
+    return filters
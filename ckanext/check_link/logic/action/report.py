@@ -7,20 +7,40 @@ foundation for report management functionality in the extension.
 
 from __future__ import annotations
 
+from datetime import datetime, timezone
 from typing import Any
 
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import aliased
+
+import ckan.plugins as p
 import ckan.plugins.toolkit as tk
-from ckan import types
+from ckan import model, types
 from ckan.logic import validate
+from ckan.model.types import make_uuid
 
 from ckanext.toolbelt.decorators import Collector
 
+from ckanext.check_link import cache
+from ckanext.check_link.interfaces import ICheckLink
 from ckanext.check_link.logic import schema
-from ckanext.check_link.model import Report
+from ckanext.check_link.model import Report, Url
+from ckanext.check_link.retry import STATE_RETRY
+from ckanext.check_link.urls import canonical, url_hash
+from ckanext.check_link.utils import report_filters
 
 action: Any
 action, get_actions = Collector("check_link").split()
 
+_REPORT_COLUMNS = {"id", "url", "state", "resource_id", "details", "created_at", "url_id"}
+
+# keys of details that describe the report rather than the check of the URL
+_OWN_DETAILS = {"package_id", "resource_id"}
+
+# hostname part of the URL, without scheme, credentials and port
+_HOST_PATTERN = r"^[a-zA-Z][a-zA-Z0-9+.-]*://(?:[^@/]*@)?([^/:?#]+)"
+
 
 @action
 @validate(schema.report_save)
@@ -49,6 +69,9 @@ def report_save(context: types.Context, data_dict: dict[str, Any]):
     sess = context["session"]
     # Move extra fields to details dictionary
     data_dict["details"].update(data_dict.pop("__extras", {}))
+    data_dict["url_id"] = url_hash(data_dict["url"])
+    # the URL must exist before the report that references it is flushed
+    _store_urls(sess, [data_dict], datetime.now(timezone.utc).replace(tzinfo=None))
 
     try:
         # Check if a report already exists for this URL/resource combination
@@ -68,9 +91,274 @@ def report_save(context: types.Context, data_dict: dict[str, Any]):
                 continue
             setattr(report, k, v)
 
+    sess.flush()
+    shared = _share_results(sess, [{"id": report.id, "url_id": report.url_id, "state": report.state}])
     sess.commit()
+    cache.invalidate_resources([report.resource_id, *shared])
 
-    return report.dictize(context)
+    result = report.dictize(context)
+    for plugin in p.PluginImplementations(ICheckLink):
+        plugin.after_save([result])
+
+    return result
+
+
+@action
+@validate(schema.report_bulk_save)
+def report_bulk_save(context: types.Context, data_dict: dict[str, Any]):
+    """Save multiple link check reports using set-based statements.
+
+    This action is a bulk version of `check_link_report_save`. Reports attached
+    to resources are upserted by the resource ID and free-standing reports are
+    upserted by URL, using a single statement for each group. Reports for
+    resources that no longer exist are skipped. Fields that are not columns of
+    the report are moved into `details`, the same way as in the single save.
+    After commit, saved rows are passed to `ICheckLink.after_save` at once.
+
+    Args:
+        context: CKAN context dictionary containing user and session information
+        data_dict: Dictionary containing:
+            - reports: List of reports, each with `url`, `state` and optional
+              `resource_id` and `details`
+            - clear_available: Remove existing reports instead of saving
+              available ones (default: False)
+
+    Returns:
+        Dictionary with the number of `saved` and `deleted` reports
+    """
+    tk.check_access("check_link_report_bulk_save", context, data_dict)
+    sess = context["session"]
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    attached: dict[str, dict[str, Any]] = {}
+    free: dict[str, dict[str, Any]] = {}
+    obsolete: list[dict[str, Any]] = []
+
+    for report in data_dict["reports"]:
+        if "url" not in report or "state" not in report:
+            raise tk.ValidationError({"reports": ["Every report must contain url and state"]})
+
+        if data_dict["clear_available"] and report["state"] == "available":
+            obsolete.append(report)
+            continue
+
+        values = _report_values(report, now)
+        # the last report wins if the same resource or URL appears twice
+        if values["resource_id"]:
+            attached[values["resource_id"]] = values
+        else:
+            free[values["url_id"]] = values
+
+    if attached:
+        existing_resources = set(
+            sess.scalars(sa.select(model.Resource.id).where(model.Resource.id.in_(list(attached))))
+        )
+        attached = {k: v for k, v in attached.items() if k in existing_resources}
+
+    saved = [*attached.values(), *free.values()]
+    checked = [*saved, *(_report_values(r, now) for r in obsolete)]
+    _store_urls(sess, checked, now)
+    _upsert(sess, Report.resource_id, list(attached.values()))
+    # free-standing reports are unique by URL, see the partial index of the model
+    _upsert(sess, Report.url_id, list(free.values()), Report.resource_id.is_(None))
+
+    removed = _delete_obsolete(sess, obsolete)
+    shared = _share_results(sess, checked)
+    sess.commit()
+    cache.invalidate_resources([*removed, *shared, *(r.get("resource_id") for r in saved)])
+
+    if saved:
+        for plugin in p.PluginImplementations(ICheckLink):
+            plugin.after_save(saved)
+
+    return {"saved": len(saved), "deleted": len(removed)}
+
+
+def _upsert(sess: Any, conflict: Any, values: list[dict[str, Any]], where: Any = None):
+    """Insert reports, updating existing rows that conflict on the given column.
+
+    IDs of the values are replaced with IDs of the stored rows, so updated
+    reports keep their original ID.
+
+    Args:
+        sess: Database session
+        conflict: Unique column that identifies existing reports
+        values: Column values of reports
+        where: Predicate of the partial unique index on the column
+    """
+    if not values:
+        return
+
+    stmt = insert(Report).values(values)
+    ids = dict(
+        sess.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[conflict],
+                index_where=where,
+                set_={
+                    "url": stmt.excluded.url,
+                    "state": stmt.excluded.state,
+                    "details": stmt.excluded.details,
+                    "created_at": stmt.excluded.created_at,
+                    "url_id": stmt.excluded.url_id,
+                },
+            ).returning(conflict, Report.id)
+        ).all()
+    )
+    for item in values:
+        item["id"] = ids[item[conflict.key]]
+
+
+def _store_urls(sess: Any, reports: list[dict[str, Any]], now: datetime):
+    """Store results of reports as the latest checks of their URLs.
+
+    Details specific to the report, like `package_id`, are not stored.
+    Links waiting for a retry have no result yet: their URLs are created if
+    missing, but results of existing URLs are kept.
+
+    Args:
+        sess: Database session
+        reports: Column values of reports with `url`, `url_id`, `state`
+            and `details`
+        now: Timestamp of the check
+    """
+    latest: dict[str, dict[str, Any]] = {}
+    # retries go first, so the actual result wins when the URL appears twice
+    for report in sorted(reports, key=lambda r: r["state"] != STATE_RETRY):
+        latest[report["url_id"]] = {
+            "id": report["url_id"],
+            "url": canonical(report["url"]),
+            "state": report["state"],
+            "details": {k: v for k, v in report["details"].items() if k not in _OWN_DETAILS},
+            "created_at": now,
+        }
+
+    if not latest:
+        return
+
+    stmt = insert(Url).values(list(latest.values()))
+    sess.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[Url.id],
+            set_={
+                "state": stmt.excluded.state,
+                "details": stmt.excluded.details,
+                "created_at": stmt.excluded.created_at,
+            },
+            where=stmt.excluded.state != STATE_RETRY,
+        )
+    )
+
+
+def _share_results(sess: Any, reports: list[dict[str, Any]]) -> list[str | None]:
+    """Copy the latest results of URLs to every report that references them.
+
+    One check updates every resource pointing at the URL. Details of the
+    report are replaced by details of the check, except for keys specific to
+    the report, like `package_id`, which are kept.
+
+    The retry state is not a result and is not shared. Other reports of the
+    URL that already wait for a retry receive the new retry schedule, so the
+    bookkeeping of attempts stays the same for the whole URL.
+
+    Args:
+        sess: Database session
+        reports: Saved reports with `id`, `url_id` and `state`
+
+    Returns:
+        Resource IDs of updated reports, None for free-standing reports
+    """
+    settled = {r["url_id"] for r in reports if r["state"] != STATE_RETRY}
+    pending = [r["id"] for r in reports if r["state"] == STATE_RETRY]
+    shared: list[str | None] = []
+
+    if settled:
+        own = sa.func.jsonb_build_object(*(arg for key in sorted(_OWN_DETAILS) for arg in (key, Report.details[key])))
+        shared.extend(
+            sess.scalars(
+                sa.update(Report)
+                .where(Report.url_id == Url.id, Url.id.in_(settled))
+                .values(
+                    state=Url.state,
+                    details=Url.details.op("||")(sa.func.jsonb_strip_nulls(own)),
+                    created_at=Url.created_at,
+                )
+                .returning(Report.resource_id)
+                .execution_options(synchronize_session=False)
+            )
+        )
+
+    if pending:
+        source = aliased(Report)
+        shared.extend(
+            sess.scalars(
+                sa.update(Report)
+                .where(
+                    Report.url_id == source.url_id,
+                    Report.id != source.id,
+                    Report.state == STATE_RETRY,
+                    source.id.in_(pending),
+                )
+                .values(
+                    details=Report.details.op("||")(sa.func.jsonb_build_object("retry", source.details["retry"])),
+                    created_at=source.created_at,
+                )
+                .returning(Report.resource_id)
+                .execution_options(synchronize_session=False)
+            )
+        )
+
+    return shared
+
+
+def _delete_obsolete(sess: Any, reports: list[dict[str, Any]]) -> list[str | None]:
+    """Remove existing reports of resources and URLs from the list.
+
+    Args:
+        sess: Database session
+        reports: Reports that must not be kept
+
+    Returns:
+        Resource IDs of deleted rows, None for free-standing reports
+    """
+    if not reports:
+        return []
+
+    resource_ids = [r["resource_id"] for r in reports if r.get("resource_id")]
+    # reports of other resources that share the URL are obsolete as well
+    url_ids = [url_hash(r["url"]) for r in reports]
+    return list(
+        sess.scalars(
+            sa.delete(Report)
+            .where(Report.resource_id.in_(resource_ids) | Report.url_id.in_(url_ids))
+            .returning(Report.resource_id)
+            .execution_options(synchronize_session=False)
+        )
+    )
+
+
+def _report_values(report: dict[str, Any], now: datetime) -> dict[str, Any]:
+    """Convert report dictionary into column values of the report table.
+
+    Args:
+        report: Report produced by a check
+        now: Timestamp of the check
+
+    Returns:
+        Column values
+    """
+    details = dict(report.get("details") or {})
+    details.update({k: v for k, v in report.items() if k not in _REPORT_COLUMNS})
+
+    return {
+        "id": make_uuid(),
+        "url": report["url"],
+        "url_id": url_hash(report["url"]),
+        "state": report["state"],
+        "resource_id": report.get("resource_id"),
+        "details": details,
+        "created_at": now,
+    }
 
 
 @action
@@ -131,6 +419,9 @@ def report_search(context: types.Context, data_dict: dict[str, Any]):
             - include_state: States to include in results (optional)
             - attached_only: Only return reports attached to resources (default: False)
             - free_only: Only return reports not attached to resources (default: False)
+            - package_id: Only return reports of the package's resources (optional)
+            - organization_id: Only return reports of the organization's resources (optional)
+            - since: Only return reports checked at or after the given ISO datetime (optional)
 
     Returns:
         Dictionary with 'count' and 'results' keys, where results contain
@@ -148,19 +439,8 @@ def report_search(context: types.Context, data_dict: dict[str, Any]):
             {"free_only": ["Filters `attached_only` and `free_only` cannot be applied simultaneously"]}
         )
 
-    # Apply filters based on resource attachment status
-    if data_dict["free_only"]:
-        q = q.filter(Report.resource_id.is_(None))
-
-    if data_dict["attached_only"]:
-        q = q.filter(Report.resource_id.isnot(None))
-
-    # Apply state-based filters
-    if "exclude_state" in data_dict:
-        q = q.filter(Report.state.notin_(data_dict["exclude_state"]))
-
-    if "include_state" in data_dict:
-        q = q.filter(Report.state.in_(data_dict["include_state"]))
+    # Apply attachment and state filters shared with exports
+    q = report_filters(q, data_dict)
 
     # Get total count before applying pagination
     count = q.count()
@@ -201,4 +481,140 @@ def report_delete(context: types.Context, data_dict: dict[str, Any]):
 
     sess.delete(entity)
     sess.commit()
+    cache.invalidate_resources([entity.resource_id])
     return entity.dictize(context)
+
+
+@action
+@validate(schema.report_bulk_delete)
+def report_bulk_delete(context: types.Context, data_dict: dict[str, Any]):
+    """Delete all link check reports that match the filters.
+
+    Reports are removed with a single `DELETE` statement. When `batch_size`
+    is specified, reports are removed in chunks of the given size and every
+    chunk is committed separately, which keeps transactions short on large
+    tables.
+
+    Args:
+        context: CKAN context dictionary containing user and session information
+        data_dict: Dictionary containing filters of `check_link_report_search` and:
+            - orphans_only: Only delete reports of deleted or missing resources (default: False)
+            - batch_size: Number of reports deleted in a single transaction (optional)
+
+    Returns:
+        Dictionary with the number of `deleted` reports
+
+    Raises:
+        ValidationError: If conflicting filters are applied
+    """
+    tk.check_access("check_link_report_bulk_delete", context, data_dict)
+    sess = context["session"]
+
+    if data_dict["free_only"] and data_dict["attached_only"]:
+        raise tk.ValidationError(
+            {"free_only": ["Filters `attached_only` and `free_only` cannot be applied simultaneously"]}
+        )
+
+    size = data_dict.get("batch_size")
+    if not size:
+        deleted = sess.execute(
+            report_filters(sa.delete(Report), data_dict).execution_options(synchronize_session=False)
+        ).rowcount
+        sess.commit()
+        cache.invalidate_all()
+        return {"deleted": deleted}
+
+    deleted = 0
+    ids = report_filters(sa.select(Report.id), data_dict).limit(size)
+    while chunk := list(sess.scalars(ids)):
+        deleted += sess.execute(
+            sa.delete(Report).where(Report.id.in_(chunk)).execution_options(synchronize_session=False)
+        ).rowcount
+        sess.commit()
+
+    cache.invalidate_all()
+    return {"deleted": deleted}
+
+
+@action
+@validate(schema.latency_stats)
+def latency_stats(context: types.Context, data_dict: dict[str, Any]):
+    """Compute latency percentiles of checked links.
+
+    Timings recorded by the checker are aggregated on the database side, per
+    host of the URL or per organization that owns the resource. Reports
+    without the requested timing (e.g. saved before timings were recorded or
+    checked without opening a new connection) are ignored. Groups are ordered
+    by the 90th percentile, the slowest first.
+
+    Args:
+        context: CKAN context dictionary containing user and session information
+        data_dict: Dictionary containing filters of `check_link_report_search` and:
+            - group_by: `host` or `organization` (default: host)
+            - metric: `connect`, `tls`, `ttfb` or `total` (default: total)
+            - limit: Maximum number of groups (default: 20)
+
+    Returns:
+        Dictionary with `group_by`, `metric` and `results` keys. Every result
+        contains the `key` of the group, number of reports and average, p50,
+        p90, p99 of the metric in seconds
+
+    Raises:
+        ValidationError: If conflicting filters are applied
+    """
+    tk.check_access("check_link_latency_stats", context, data_dict)
+
+    if data_dict["free_only"] and data_dict["attached_only"]:
+        raise tk.ValidationError(
+            {"free_only": ["Filters `attached_only` and `free_only` cannot be applied simultaneously"]}
+        )
+
+    value = Report.details[("timings", data_dict["metric"])].astext.cast(sa.Float)
+    p90 = sa.func.percentile_cont(0.9).within_group(value)
+
+    if data_dict["group_by"] == "organization":
+        key = sa.func.coalesce(model.Group.name, model.Package.owner_org)
+        stmt = (
+            sa.select(key.label("key"))
+            .join(model.Resource, model.Resource.id == Report.resource_id)
+            .join(model.Package, model.Package.id == model.Resource.package_id)
+            .outerjoin(model.Group, model.Group.id == model.Package.owner_org)
+        )
+    else:
+        key = sa.func.lower(sa.func.substring(Report.url, _HOST_PATTERN))
+        stmt = sa.select(key.label("key")).select_from(Report)
+
+    stmt = (
+        report_filters(stmt, data_dict)
+        .add_columns(
+            sa.func.count().label("count"),
+            sa.func.avg(value).label("avg"),
+            sa.func.percentile_cont(0.5).within_group(value).label("p50"),
+            p90.label("p90"),
+            sa.func.percentile_cont(0.99).within_group(value).label("p99"),
+        )
+        .where(value.isnot(None))
+        .group_by(key)
+        .order_by(p90.desc())
+        .limit(data_dict["limit"])
+    )
+
+    return {
+        "group_by": data_dict["group_by"],
+        "metric": data_dict["metric"],
+        "results": [
+            {
+                "key": row["key"],
+                "count": row["count"],
+                "avg": _round(row["avg"]),
+                "p50": _round(row["p50"]),
+                "p90": _round(row["p90"]),
+                "p99": _round(row["p99"]),
+            }
+            for row in context["session"].execute(stmt).mappings()
+        ],
+    }
+
+
+def _round(value: float | None) -> float | None:
+    return None if value is None else round(value, 4)
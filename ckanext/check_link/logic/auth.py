@@ -152,6 +152,22 @@ def check_link_report_save(context: types.Context, data_dict: dict[str, Any]):
     return authz.is_authorized("sysadmin", context, data_dict)
 
 
+def check_link_report_bulk_save(context: types.Context, data_dict: dict[str, Any]):
+    """Check if the user is authorized to save multiple reports.
+
+    Only sysadmin users are authorized to save reports. This restriction ensures
+    that only trusted administrators can modify the link check report database.
+
+    Args:
+        context: CKAN context dictionary containing user and authentication info
+        data_dict: Action parameters dictionary
+
+    Returns:
+        Dictionary with 'success' key indicating authorization status
+    """
+    return authz.is_authorized("sysadmin", context, data_dict)
+
+
 def check_link_report_show(context: types.Context, data_dict: dict[str, Any]):
     """Check if the user is authorized to view reports.
 
@@ -200,6 +216,38 @@ def check_link_report_delete(context: types.Context, data_dict: dict[str, Any]):
     return authz.is_authorized("sysadmin", context, data_dict)
 
 
+def check_link_report_bulk_delete(context: types.Context, data_dict: dict[str, Any]):
+    """Check if the user is authorized to delete multiple reports.
+
+    Only sysadmin users are authorized to delete reports. This restriction ensures
+    that only trusted administrators can remove link check reports from the database.
+
+    Args:
+        context: CKAN context dictionary containing user and authentication info
+        data_dict: Action parameters dictionary
+
+    Returns:
+        Dictionary with 'success' key indicating authorization status
+    """
+    return authz.is_authorized("sysadmin", context, data_dict)
+
+
+def check_link_latency_stats(context: types.Context, data_dict: dict[str, Any]):
+    """Check if the user is authorized to see latency statistics.
+
+    Only sysadmin users are authorized to see latency statistics, because they
+    are computed from reports of all resources, including private ones.
+
+    Args:
+        context: CKAN context dictionary containing user and authentication info
+        data_dict: Action parameters dictionary
+
+    Returns:
+        Dictionary with 'success' key indicating authorization status
+    """
+    return authz.is_authorized("sysadmin", context, data_dict)
+
+
 def check_link_view_report_page(context: types.Context, data_dict: dict[str, Any]):
     """Check if the user is authorized to view the report page.
 
@@ -4,6 +4,19 @@ from ckan import types
 from ckan.logic.schema import validator_args
 
 
+@validator_args
+def deadline(
+    ignore_empty: types.Validator,
+    is_positive_integer: types.Validator,
+    default: types.ValidatorFactory,
+    boolean_validator: types.Validator,
+) -> types.Schema:
+    return {
+        "deadline": [ignore_empty, is_positive_integer],
+        "defer": [default(False), boolean_validator],
+    }
+
+
 @validator_args
 def url_check(
     not_missing: types.Validator,
@@ -13,6 +26,7 @@ def url_check(
     boolean_validator: types.Validator,
 ) -> types.Schema:
     return {
+        **deadline(),
         "url": [not_missing, json_list_or_string],
         "save": [default(False), boolean_validator],
         "clear_available": [default(False), boolean_validator],
@@ -30,6 +44,7 @@ def resource_check(
     convert_to_json_if_string: types.Validator,
 ) -> types.Schema:
     return {
+        **deadline(),
         "id": [not_missing, resource_id_exists],
         "save": [default(False), boolean_validator],
         "clear_available": [default(False), boolean_validator],
@@ -45,6 +60,7 @@ def base_search_check(
     convert_to_json_if_string: types.Validator,
 ) -> types.Schema:
     return {
+        **deadline(),
         "save": [default(False), boolean_validator],
         "clear_available": [default(False), boolean_validator],
         "skip_invalid": [default(False), boolean_validator],
@@ -58,8 +74,8 @@ def base_search_check(
 
 
 @validator_args
-def package_check(not_missing: types.Validator, package_id_or_name_exists: types.Validator) -> types.Schema:
-    return dict(base_search_check(), id=[not_missing, package_id_or_name_exists])
+def package_check(not_missing: types.Validator, convert_package_name_or_id_to_id: types.Validator) -> types.Schema:
+    return dict(base_search_check(), id=[not_missing, convert_package_name_or_id_to_id])
 
 
 @validator_args
@@ -68,8 +84,8 @@ def organization_check(not_missing: types.Validator, convert_group_name_or_id_to
 
 
 @validator_args
-def group_check(not_missing: types.Validator, group_id_or_name_exists: types.Validator):
-    return dict(base_search_check(), id=[not_missing, group_id_or_name_exists])
+def group_check(not_missing: types.Validator, convert_group_name_or_id_to_id: types.Validator):
+    return dict(base_search_check(), id=[not_missing, convert_group_name_or_id_to_id])
 
 
 @validator_args
@@ -100,6 +116,19 @@ def report_save(# noqa: PLR0913
     }
 
 
+@validator_args
+def report_bulk_save(
+    not_missing: types.Validator,
+    default: types.ValidatorFactory,
+    boolean_validator: types.Validator,
+    convert_to_json_if_string: types.Validator,
+) -> types.Schema:
+    return {
+        "reports": [not_missing, convert_to_json_if_string],
+        "clear_available": [default(False), boolean_validator],
+    }
+
+
 @validator_args
 def report_show(
     unicode_safe: types.Validator, ignore_missing: types.Validator, resource_id_exists: types.Validator
@@ -112,23 +141,71 @@ def report_show(
 
 
 @validator_args
-def report_search(
+def report_filters(  # noqa: PLR0913
     ignore_empty: types.Validator,
     default: types.ValidatorFactory,
-    int_validator: types.Validator,
     boolean_validator: types.Validator,
     json_list_or_string: types.Validator,
+    convert_package_name_or_id_to_id: types.Validator,
+    convert_group_name_or_id_to_id: types.Validator,
+    isodate: types.Validator,
 ) -> types.Schema:
     return {
-        "limit": [default(10), int_validator],
-        "offset": [default(0), int_validator],
         "exclude_state": [ignore_empty, json_list_or_string],
         "include_state": [ignore_empty, json_list_or_string],
         "attached_only": [default(False), boolean_validator],
         "free_only": [default(False), boolean_validator],
+        "package_id": [ignore_empty, convert_package_name_or_id_to_id],
+        "organization_id": [ignore_empty, convert_group_name_or_id_to_id],
+        "since": [ignore_empty, isodate],
     }
 
 
+@validator_args
+def report_search(
+    default: types.ValidatorFactory,
+    int_validator: types.Validator,
+) -> types.Schema:
+    return dict(
+        report_filters(),
+        limit=[default(10), int_validator],
+        offset=[default(0), int_validator],
+    )
+
+
+@validator_args
+def report_export(one_of: types.ValidatorFactory, default: types.ValidatorFactory) -> types.Schema:
+    return dict(report_filters(), format=[default("ndjson"), one_of(["ndjson", "parquet"])])
+
+
 @validator_args
 def report_delete():
     return report_show()
+
+
+@validator_args
+def report_bulk_delete(
+    default: types.ValidatorFactory,
+    boolean_validator: types.Validator,
+    ignore_empty: types.Validator,
+    is_positive_integer: types.Validator,
+) -> types.Schema:
+    return dict(
+        report_filters(),
+        orphans_only=[default(False), boolean_validator],
+        batch_size=[ignore_empty, is_positive_integer],
+    )
+
+
+@validator_args
+def latency_stats(
+    one_of: types.ValidatorFactory,
+    default: types.ValidatorFactory,
+    int_validator: types.Validator,
+) -> types.Schema:
+    return dict(
+        report_filters(),
+        group_by=[default("host"), one_of(["host", "organization"])],
+        metric=[default("total"), one_of(["connect", "tls", "ttfb", "total"])],
+        limit=[default(20), int_validator],
+    )
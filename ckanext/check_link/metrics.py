@@ -0,0 +1,318 @@
+"""Process-level metrics of the link checker.
+
+Metrics are collected in memory of the current process and rendered in the
+Prometheus text exposition format. Web workers expose them through the
+`/check-link/metrics` endpoint (when enabled by the config option), and CLI
+commands write them into a file that can be picked up by the textfile
+collector of the node exporter.
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from typing import Any
+from urllib.parse import urlsplit
+
+import sqlalchemy as sa
+
+import ckan.plugins.toolkit as tk
+from ckan import model
+
+CONFIG_ENABLED = "ckanext.check_link.metrics.enabled"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HEALTHY_STATES = {"available", "moved"}
+
+__all__ = [
+    "CONTENT_TYPE",
+    "Metric",
+    "Registry",
+    "enabled",
+    "observe",
+    "phase",
+    "record_reports",
+    "registry",
+    "render",
+    "statements",
+    "track_statements",
+    "write",
+]
+
+
+def enabled() -> bool:
+    """Check whether metrics endpoint is enabled.
+
+    Returns:
+        True if metrics are exposed by the web application
+    """
+    return tk.asbool(tk.config.get(CONFIG_ENABLED))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metric:
+    """Single metric with optional labels.
+
+    Args:
+        name: Name of the metric
+        documentation: Description of the metric
+        kind: Prometheus type of the metric, `counter` or `gauge`
+        labels: Names of labels
+    """
+
+    def __init__(self, name: str, documentation: str, kind: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labels = tuple(labels)
+        self.lock = threading.Lock()
+        self.values: dict[tuple[str, ...], float] = {}
+        self.clear()
+
+    def clear(self):
+        """Drop all values. Metrics without labels are reset to zero."""
+        with self.lock:
+            self.values = {} if self.labels else {(): 0}
+
+    def _key(self, labels: dict[str, Any]) -> tuple[str, ...]:
+        return tuple(str(labels[label]) for label in self.labels)
+
+    def inc(self, amount: float = 1, **labels: Any):
+        """Increase the value of the metric.
+
+        Args:
+            amount: Increment
+            labels: Values of labels
+        """
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: Any):
+        """Decrease the value of the gauge.
+
+        Args:
+            amount: Decrement
+            labels: Values of labels
+        """
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: Any):
+        """Set the value of the gauge.
+
+        Args:
+            value: New value
+            labels: Values of labels
+        """
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def get(self, **labels: Any) -> float:
+        """Get the current value of the metric.
+
+        Args:
+            labels: Values of labels
+
+        Returns:
+            Current value
+        """
+        with self.lock:
+            return self.values.get(self._key(labels), 0)
+
+    def render(self) -> Iterator[str]:
+        """Render the metric in text exposition format.
+
+        Yields:
+            Lines of the metric
+        """
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+
+        with self.lock:
+            values = sorted(self.values.items())
+
+        for key, value in values:
+            if self.labels:
+                labels = ",".join(f'{name}="{_escape(v)}"' for name, v in zip(self.labels, key, strict=True))
+                yield f"{self.name}{{{labels}}} {value}"
+            else:
+                yield f"{self.name} {value}"
+
+
+class Registry:
+    """Collection of metrics of the current process."""
+
+    def __init__(self):
+        self.metrics: list[Metric] = []
+
+    def counter(self, name: str, documentation: str, labels: Iterable[str] = ()) -> Metric:
+        """Register a counter.
+
+        Args:
+            name: Name of the metric
+            documentation: Description of the metric
+            labels: Names of labels
+
+        Returns:
+            Registered metric
+        """
+        return self._add(Metric(name, documentation, "counter", labels))
+
+    def gauge(self, name: str, documentation: str, labels: Iterable[str] = ()) -> Metric:
+        """Register a gauge.
+
+        Args:
+            name: Name of the metric
+            documentation: Description of the metric
+            labels: Names of labels
+
+        Returns:
+            Registered metric
+        """
+        return self._add(Metric(name, documentation, "gauge", labels))
+
+    def _add(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Render all metrics in text exposition format.
+
+        Returns:
+            Metrics, one sample per line
+        """
+        return "".join(f"{line}\n" for metric in self.metrics for line in metric.render())
+
+    def reset(self):
+        """Drop values of all metrics."""
+        for metric in self.metrics:
+            metric.clear()
+
+
+registry = Registry()
+
+checks = registry.counter("check_link_checks_total", "Number of checked links by state", ["state"])
+in_flight = registry.gauge("check_link_checks_in_flight", "Number of links that are being checked right now")
+queue_depth = registry.gauge("check_link_queue_depth", "Number of batches waiting for the stage", ["stage"])
+phase_seconds = registry.counter("check_link_phase_seconds_total", "Time spent in the processing phase", ["phase"])
+phase_batches = registry.counter(
+    "check_link_phase_batches_total", "Number of batches processed by the phase", ["phase"]
+)
+db_statements = registry.counter(
+    "check_link_db_statements_total",
+    "Number of SQL statements executed by the processing phase. Divide by batches to get statements per batch",
+    ["phase"],
+)
+host_errors = registry.counter(
+    "check_link_host_errors_total", "Number of unhealthy links by host and state", ["host", "state"]
+)
+last_progress = registry.gauge(
+    "check_link_last_progress_timestamp_seconds", "Unix time when the last batch of links was checked"
+)
+
+_local = threading.local()
+
+
+def _count_statement(*args: Any, **kwargs: Any):
+    _local.statements = getattr(_local, "statements", 0) + 1
+
+
+def track_statements():
+    """Start counting SQL statements executed by the engine.
+
+    Statements are counted per thread, so every phase of the pipeline can
+    measure its own statements. Repeated calls have no effect.
+    """
+    engine = model.meta.engine
+    if engine is not None and not sa.event.contains(engine, "before_cursor_execute", _count_statement):
+        sa.event.listen(engine, "before_cursor_execute", _count_statement)
+
+
+def statements() -> int:
+    """Number of SQL statements executed by the current thread.
+
+    Returns:
+        Number of statements since the thread started
+    """
+    return getattr(_local, "statements", 0)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Measure time and SQL statements of a single batch in the phase.
+
+    Args:
+        name: Name of the phase: enumeration, network or save
+
+    Yields:
+        Nothing
+    """
+    start = time.perf_counter()
+    executed = statements()
+    try:
+        yield
+    finally:
+        observe(name, start, executed)
+
+
+def observe(name: str, start: float, executed: int):
+    """Record a single batch of the phase.
+
+    Args:
+        name: Name of the phase
+        start: Value of `time.perf_counter()` when the batch started
+        executed: Value of `statements()` when the batch started
+    """
+    phase_seconds.inc(time.perf_counter() - start, phase=name)
+    phase_batches.inc(phase=name)
+    db_statements.inc(statements() - executed, phase=name)
+
+
+def record_reports(reports: Iterable[dict[str, Any]]):
+    """Update metrics with results of checks.
+
+    Args:
+        reports: Check results with `url` and `state`
+    """
+    for report in reports:
+        checks.inc(state=report["state"])
+        if report["state"] not in HEALTHY_STATES:
+            try:
+                host = urlsplit(report["url"]).hostname or ""
+            except ValueError:
+                host = ""
+            host_errors.inc(host=host, state=report["state"])
+
+    last_progress.set(time.time())
+
+
+def render() -> str:
+    """Render metrics of the current process.
+
+    Returns:
+        Metrics in text exposition format
+    """
+    return registry.render()
+
+
+def write(path: str):
+    """Atomically replace the file with current metrics.
+
+    Args:
+        path: Path to the metrics file
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".check-link-metrics")
+    with os.fdopen(fd, "w") as dest:
+        dest.write(render())
+    os.chmod(tmp, 0o644)  # noqa: S103
+    os.replace(tmp, path)
@@ -0,0 +1,164 @@
+"""Add table of canonical URLs.
+
+Revision ID: 7c1e4b9a2f60
+Revises: dad15b4f251a
+Create Date: 2026-10-19 10:12:31.418204
+
+"""
+
+import hashlib
+from urllib.parse import urlsplit, urlunsplit
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import JSONB, insert
+
+# revision identifiers, used by Alembic.
+revision = "7c1e4b9a2f60"
+down_revision = "dad15b4f251a"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 10000
+HASH_LENGTH = 32
+DEFAULT_PORTS = {"http": 80, "https": 443, "ftp": 21}
+
+report_table = sa.table(
+    "check_link_report",
+    sa.column("id", sa.UnicodeText),
+    sa.column("url", sa.UnicodeText),
+    sa.column("state", sa.String),
+    sa.column("details", JSONB),
+    sa.column("created_at", sa.DateTime),
+    sa.column("url_id", sa.String),
+)
+
+
+def upgrade():
+    url_table = op.create_table(
+        "check_link_url",
+        sa.Column("id", sa.String(HASH_LENGTH), primary_key=True),
+        sa.Column("url", sa.UnicodeText, nullable=False),
+        sa.Column("state", sa.String(20), nullable=False),
+        sa.Column("details", JSONB, nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime,
+            nullable=False,
+            server_default=sa.func.current_timestamp(),
+        ),
+    )
+    op.add_column("check_link_report", sa.Column("url_id", sa.String(HASH_LENGTH), nullable=True))
+
+    _fill_urls(url_table)
+
+    # spellings of the same URL become duplicates, keep the latest report
+    op.execute(
+        """
+        DELETE FROM check_link_report r
+        USING check_link_report o
+        WHERE r.resource_id IS NULL AND o.resource_id IS NULL
+            AND r.url_id = o.url_id AND (r.created_at, r.id) < (o.created_at, o.id)
+        """
+    )
+
+    op.create_index("ix_check_link_report_url_id", "check_link_report", ["url_id"])
+    op.create_index(
+        "ix_check_link_report_free_url_id",
+        "check_link_report",
+        ["url_id"],
+        unique=True,
+        postgresql_where=sa.text("resource_id IS NULL"),
+    )
+    op.create_foreign_key(
+        "check_link_report_url_id_fkey",
+        "check_link_report",
+        "check_link_url",
+        ["url_id"],
+        ["id"],
+    )
+    op.drop_constraint("check_link_report_url_resource_id_key", "check_link_report")
+    op.drop_index("url_idx", "check_link_report")
+
+
+def _canonical(url: str) -> str:
+    """Canonical form of the URL, as computed by ckanext.check_link.urls at this revision."""
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        host = parts.hostname
+        port = parts.port
+    except ValueError:
+        return url.partition("#")[0]
+
+    if not host:
+        return url.partition("#")[0]
+
+    scheme = parts.scheme.lower()
+    netloc = f"[{host}]" if ":" in host else host
+    if port is not None and DEFAULT_PORTS.get(scheme) != port:
+        netloc = f"{netloc}:{port}"
+
+    userinfo, sep, _hostport = parts.netloc.rpartition("@")
+    if sep:
+        netloc = f"{userinfo}@{netloc}"
+
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+
+
+def _url_hash(url: str) -> str:
+    return hashlib.sha256(_canonical(url).encode()).hexdigest()[:HASH_LENGTH]
+
+
+def _fill_urls(url_table: sa.Table):
+    """Compute hashes of existing reports and keep the latest result of every URL."""
+    conn = op.get_bind()
+    last_id = ""
+    while rows := conn.execute(
+        sa.select(report_table)
+        .where(report_table.c.id > last_id, report_table.c.url.isnot(None))
+        .order_by(report_table.c.id)
+        .limit(BATCH_SIZE)
+    ).all():
+        last_id = rows[-1].id
+
+        latest = {}
+        for row in rows:
+            key = _url_hash(row.url)
+            if key not in latest or latest[key]["created_at"] < row.created_at:
+                latest[key] = {
+                    "id": key,
+                    "url": _canonical(row.url),
+                    "state": row.state,
+                    "details": {k: v for k, v in row.details.items() if k not in ("package_id", "resource_id")},
+                    "created_at": row.created_at,
+                }
+
+        stmt = insert(url_table).values(list(latest.values()))
+        conn.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[url_table.c.id],
+                set_={
+                    "state": stmt.excluded.state,
+                    "details": stmt.excluded.details,
+                    "created_at": stmt.excluded.created_at,
+                },
+                where=url_table.c.created_at < stmt.excluded.created_at,
+            )
+        )
+        conn.execute(
+            report_table.update()
+            .where(report_table.c.id == sa.bindparam("report_id"))
+            .values(url_id=sa.bindparam("report_url_id")),
+            [{"report_id": row.id, "report_url_id": _url_hash(row.url)} for row in rows],
+        )
+
+
+def downgrade():
+    op.create_index("url_idx", "check_link_report", ["url"])
+    op.create_unique_constraint("check_link_report_url_resource_id_key", "check_link_report", ["url", "resource_id"])
+    op.drop_constraint("check_link_report_url_id_fkey", "check_link_report")
+    op.drop_index("ix_check_link_report_free_url_id", "check_link_report")
+    op.drop_index("ix_check_link_report_url_id", "check_link_report")
+    op.drop_column("check_link_report", "url_id")
+    op.drop_table("check_link_url")
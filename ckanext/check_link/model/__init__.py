@@ -1,3 +1,4 @@
 from .report import Report
+from .url import Url
 
-__all__ = ["Report"]
+__all__ = ["Report", "Url"]
@@ -23,6 +23,8 @@ from ckan.model.types import make_uuid
 
 import ckan.plugins.toolkit as tk
 
+from ckanext.check_link.urls import HASH_LENGTH, url_hash
+
 
 class Report(tk.BaseModel):
     """Database model for storing link check reports.
@@ -49,7 +51,21 @@ class Report(tk.BaseModel):
             unique=True,
         ),
         sa.Column("details", JSONB, nullable=False, default=dict),
-        sa.UniqueConstraint("url", "resource_id"),
+        sa.Column(
+            "url_id",
+            sa.String(HASH_LENGTH),
+            sa.ForeignKey("check_link_url.id"),
+            nullable=True,
+            index=True,
+            default=lambda ctx: url_hash(ctx.get_current_parameters()["url"]),
+        ),
+        # every URL has at most one free-standing report
+        sa.Index(
+            "ix_check_link_report_free_url_id",
+            "url_id",
+            unique=True,
+            postgresql_where=sa.text("resource_id IS NULL"),
+        ),
     )
 
     id: Mapped[str]
@@ -58,6 +74,7 @@ class Report(tk.BaseModel):
     created_at: Mapped[datetime]
     resource_id: Mapped[str | None]
     details: Mapped[dict[str, Any]]
+    url_id: Mapped[str | None]
 
     package_id = association_proxy("resource", "package_id")
     package = association_proxy("resource", "package")
@@ -126,7 +143,9 @@ class Report(tk.BaseModel):
 
         This class method queries the database for a report associated with
         a specific URL that is not linked to any resource. This is used for
-        checking arbitrary URLs that are not part of CKAN resources.
+        checking arbitrary URLs that are not part of CKAN resources. URLs are
+        compared in canonical form, so the fragment and the case of the host
+        are ignored.
 
         Args:
             url: The URL to search for
@@ -134,4 +153,4 @@ class Report(tk.BaseModel):
         Returns:
             Report object if found, None otherwise
         """
-        return model.Session.query(cls).filter(cls.resource_id.is_(None), cls.url == url).one_or_none()
+        return model.Session.query(cls).filter(cls.resource_id.is_(None), cls.url_id == url_hash(url)).one_or_none()
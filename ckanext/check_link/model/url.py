@@ -0,0 +1,39 @@
+"""Model definition for checked URLs.
+
+URLs are stored once in canonical form, identified by the fixed-width hash
+of the canonical URL. Every URL holds the latest check result, that is shared
+by all reports referencing it.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped
+
+import ckan.plugins.toolkit as tk
+
+from ckanext.check_link.urls import HASH_LENGTH
+
+
+class Url(tk.BaseModel):
+    """Database model for canonical URLs and their latest check results."""
+
+    __table__: sa.Table = sa.Table(
+        "check_link_url",
+        tk.BaseModel.metadata,
+        sa.Column("id", sa.String(HASH_LENGTH), primary_key=True),
+        sa.Column("url", sa.UnicodeText, nullable=False),
+        sa.Column("state", sa.String(20), nullable=False),
+        sa.Column("details", JSONB, nullable=False, default=dict),
+        sa.Column("created_at", sa.DateTime, nullable=False, default=datetime.utcnow),
+    )
+
+    id: Mapped[str]
+    url: Mapped[str]
+    state: Mapped[str]
+    details: Mapped[dict[str, Any]]
+    created_at: Mapped[datetime]
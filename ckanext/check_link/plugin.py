@@ -10,15 +10,22 @@ from __future__ import annotations
 
 from typing import Any
 
+import sqlalchemy as sa
+
 from ckan import model
 from ckan import plugins as p
 from ckan.plugins import toolkit as tk
 
-from . import implementations
+from . import cache, implementations
 from .logic import action
 from .model import Report
 
 CONFIG_CASCADE_DELETE = "ckanext.check_link.remove_reports_when_resource_deleted"
+CONFIG_PACKAGE_CASCADE_DELETE = "ckanext.check_link.remove_reports_when_package_deleted"
+
+# packages whose reports were already removed in the current transaction
+_CLEANED_PACKAGES = "check_link_cleaned_packages"
+_STALE_SCOPES = "check_link_stale_scopes"
 
 
 @tk.blanket.helpers
@@ -43,19 +50,32 @@ class CheckLinkPlugin(
     def notify(self, entity: Any, operation: str) -> None:
         """Handle domain object modification notifications.
 
-        When a resource is deleted, optionally remove its associated link check report
-        based on the configuration setting. This prevents orphaned reports from
+        When a resource or a whole package is deleted, optionally remove associated
+        link check reports based on the configuration settings. Resources and packages
+        are controlled by separate settings. This prevents orphaned reports from
         accumulating in the database.
 
+        Reports are removed per package with a single statement, that covers all
+        resources deleted in the current transaction, so purging a dataset with
+        thousands of resources does not run a query per resource.
+
         Args:
-            entity: The domain object being modified (expected to be a Resource)
+            entity: The domain object being modified (Resource or Package)
             operation: The type of operation being performed (create, update, delete)
         """
-        # Only process resource deletion events
-        if isinstance(entity, model.Resource) and entity.state == "deleted":
-            # Check if cascade deletion is enabled in configuration
-            if tk.asbool(tk.config.get(CONFIG_CASCADE_DELETE)):
-                _remove_resource_report(entity.id)
+        # Check if cascade deletion is enabled in configuration
+        if isinstance(entity, model.Package) and (
+            entity.state == "deleted" or operation == model.DomainObjectOperation.deleted
+        ):
+            if tk.asbool(tk.config.get(CONFIG_PACKAGE_CASCADE_DELETE)):
+                _remove_package_reports(entity.id, only_deleted=False)
+
+        elif (
+            isinstance(entity, model.Resource)
+            and entity.state == "deleted"
+            and tk.asbool(tk.config.get(CONFIG_CASCADE_DELETE))
+        ):
+            _remove_package_reports(entity.package_id, only_deleted=True)
 
     # IConfigurer
     def update_config(self, config_):
@@ -72,15 +92,50 @@ class CheckLinkPlugin(
         tk.add_resource("assets", "check_link")
 
 
-def _remove_resource_report(resource_id: str):
-    """Remove the link check report associated with a resource.
+def _remove_package_reports(package_id: str, *, only_deleted: bool):
+    """Remove link check reports of the package's resources.
 
-    This internal function handles the removal of link check reports when
-    a resource is deleted, based on the cascade deletion configuration setting.
+    Notifications are sent after the session is flushed, so the statement sees
+    every resource changed in the current transaction. Once reports of the
+    package are removed, notifications about its other resources are skipped
+    until the transaction ends. Cached report pages are invalidated only when
+    the transaction is committed, so concurrent requests cannot cache removed
+    reports again.
 
     Args:
-        resource_id: The ID of the resource whose report should be removed
+        package_id: The ID of the package
+        only_deleted: Only remove reports of resources that are not active
     """
-    report = Report.by_resource_id(resource_id)
-    if report:
-        model.Session.delete(report)
+    cleaned: set[tuple[str, bool]] = model.Session.info.setdefault(_CLEANED_PACKAGES, set())
+    if (package_id, False) in cleaned or (package_id, only_deleted) in cleaned:
+        return
+    cleaned.add((package_id, only_deleted))
+
+    resources = sa.select(model.Resource.id).where(model.Resource.package_id == package_id)
+    if only_deleted:
+        resources = resources.where(model.Resource.state != "active")
+
+    removed = list(
+        model.Session.scalars(
+            sa.delete(Report)
+            .where(Report.resource_id.in_(resources))
+            .returning(Report.resource_id)
+            .execution_options(synchronize_session=False)
+        )
+    )
+    if removed and cache.enabled():
+        # scopes are resolved now, while resources are still visible
+        model.Session.info.setdefault(_STALE_SCOPES, set()).update(cache.resource_scopes(removed))
+
+
+@sa.event.listens_for(model.Session, "after_commit")
+def _invalidate_stale_scopes(session: Any):
+    session.info.pop(_CLEANED_PACKAGES, None)
+    if scopes := session.info.pop(_STALE_SCOPES, None):
+        cache.invalidate(scopes)
+
+
+@sa.event.listens_for(model.Session, "after_rollback")
+def _forget_cleaned_packages(session: Any):
+    session.info.pop(_CLEANED_PACKAGES, None)
+    session.info.pop(_STALE_SCOPES, None)
@@ -0,0 +1,817 @@
+"""Checking and saving of resource links in batches.
+
+This module contains the machinery shared by check actions and CLI commands:
+it receives `(resource_id, package_id, url)` triples from selectors or from
+the search index, checks their URLs and stores the reports.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import threading
+import time
+import zlib
+from collections import Counter
+from collections.abc import Callable, Iterable, Iterator
+from datetime import datetime, timezone
+from itertools import islice
+from queue import Empty, Full, Queue
+from typing import Any, TypeVar
+from urllib.parse import urlsplit
+
+import flask
+
+import ckan.plugins as p
+import ckan.plugins.toolkit as tk
+from ckan import model, types
+
+from . import metrics, retry
+from .interfaces import ICheckLink
+
+T = TypeVar("T")
+
+log = logging.getLogger(__name__)
+
+CONFIG_BATCH_SIZE = "ckanext.check_link.check.batch_size"
+DEFAULT_BATCH_SIZE = 100
+
+# state of links that were not checked before the deadline
+STATE_PENDING = "pending"
+
+__all__ = [
+    "STATE_PENDING",
+    "Pipeline",
+    "batch_size",
+    "batches",
+    "check_batch",
+    "check_deferred",
+    "check_resources",
+    "check_retries",
+    "deadline",
+    "defer_pending",
+    "host_partition",
+    "parallel",
+    "prefetch",
+    "remaining",
+    "save_reports",
+]
+
+_POLL_INTERVAL = 0.1
+
+
+def batch_size() -> int:
+    """Number of links checked concurrently within a single batch.
+
+    Returns:
+        Configured batch size
+    """
+    return tk.asint(tk.config.get(CONFIG_BATCH_SIZE, DEFAULT_BATCH_SIZE))
+
+
+def deadline(context: types.Context, data_dict: dict[str, Any]) -> float | None:
+    """Compute the moment when the check must be finished.
+
+    The deadline of the outer check is passed to nested checks through the
+    `check_link_deadline` key of the context. If the nested check has its own
+    `deadline` parameter, the earliest of them is used.
+
+    Args:
+        context: CKAN context dictionary containing user and session information
+        data_dict: Check parameters with optional `deadline` in seconds
+
+    Returns:
+        Value of `time.monotonic()` or None if the check has no deadline
+    """
+    current: float | None = context.get("check_link_deadline")
+    if data_dict.get("deadline"):
+        own = time.monotonic() + data_dict["deadline"]
+        current = own if current is None else min(current, own)
+
+    return current
+
+
+def remaining(moment: float | None) -> float | None:
+    """Number of seconds left until the deadline.
+
+    Args:
+        moment: Deadline computed by `deadline`
+
+    Returns:
+        Non-negative number of seconds or None if there is no deadline
+    """
+    if moment is None:
+        return None
+
+    return max(moment - time.monotonic(), 0)
+
+
+def batches(items: Iterable[T], size: int) -> Iterator[list[T]]:
+    """Split iterable into lists of the given size.
+
+    Args:
+        items: Source iterable
+        size: Maximum number of items in a batch
+
+    Yields:
+        Lists of items
+    """
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class _Failure:
+    """Exception raised by the producer and re-raised by the consumer."""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+_DONE = object()
+
+
+class _Producer(threading.Thread):
+    """Thread that iterates over the source and fills the bounded queue."""
+
+    def __init__(self, source: Iterable[Any], depth: int):
+        super().__init__(daemon=True)
+        self.source = source
+        self.queue: Queue[Any] = Queue(maxsize=depth)
+        self.stopped = threading.Event()
+
+    def put(self, item: Any) -> bool:
+        """Put item into the queue unless the consumer is gone.
+
+        Args:
+            item: Produced item
+
+        Returns:
+            True if item was added to the queue
+        """
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=_POLL_INTERVAL)
+            except Full:
+                continue
+            metrics.queue_depth.set(self.queue.qsize(), stage="check")
+            return True
+        return False
+
+    def run(self):
+        iterator = iter(self.source)
+        try:
+            while True:
+                start, executed = time.perf_counter(), metrics.statements()
+                item = next(iterator, _DONE)
+                if item is _DONE:
+                    return
+
+                metrics.observe("enumeration", start, executed)
+                if not self.put(item):
+                    return
+        except Exception as e:  # noqa: BLE001
+            self.put(_Failure(e))
+        finally:
+            # the source is closed when the consumer is gone, so server-side
+            # cursors are released before the session is removed
+            if close := getattr(iterator, "close", None):
+                close()
+            model.Session.remove()
+            self.put(_DONE)
+
+    def get(self) -> Any:
+        """Wait for the next item.
+
+        Returns:
+            Produced item or `_DONE` if the producer has finished
+        """
+        while True:
+            try:
+                item = self.queue.get(timeout=_POLL_INTERVAL)
+            except Empty:  # noqa: PERF203
+                if not self.is_alive() and self.queue.empty():
+                    return _DONE
+            else:
+                metrics.queue_depth.set(self.queue.qsize(), stage="check")
+                return item
+
+
+def prefetch(source: Iterable[T], depth: int = 1) -> Iterator[T]:
+    """Consume the source in a background thread, staying ahead of the caller.
+
+    While the caller processes the current item, the next `depth` items are
+    already being produced. Use it to overlap enumeration of the next batch
+    (search or database queries) with checking of the current one.
+
+    The source is iterated in a separate thread, so any database query
+    executed by it uses a separate thread-local session, which is removed
+    when the source is exhausted.
+
+    Args:
+        source: Lazy iterable. It must not execute queries before iteration
+        depth: Maximum number of items produced in advance
+
+    Yields:
+        Items of the source in the original order
+    """
+    producer = _Producer(source, depth)
+    producer.start()
+
+    try:
+        while (item := producer.get()) is not _DONE:
+            if isinstance(item, _Failure):
+                raise item.error
+
+            yield item
+    finally:
+        producer.stopped.set()
+        producer.join()
+
+
+class Pipeline:
+    """Staged bulk checker with bounded memory.
+
+    Resources flow through three stages connected by bounded queues:
+
+    * producer enumerates batches of resources in a background thread;
+    * checker runs network checks for the batch in the calling thread;
+    * writer saves reports to the database in its own thread.
+
+    When a downstream stage falls behind, the upstream stage blocks instead
+    of accumulating data, so at most `depth` batches wait between stages and
+    the whole scope is never held in memory. Database commits of the writer
+    overlap with network I/O of the checker.
+
+    Args:
+        context: CKAN context dictionary containing user and session information
+        options: Check options, see `check_resources`
+        depth: Maximum number of batches waiting between stages
+        on_checked: Callback receiving resource triples and reports of every
+            checked batch. Called from the checker stage
+        on_saved: Callback receiving reports of every saved batch. Called from
+            the writer stage, or right after the check when saving is disabled
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        context: types.Context,
+        options: dict[str, Any],
+        *,
+        depth: int = 2,
+        on_checked: Callable[[list[Any], list[dict[str, Any]]], Any] | None = None,
+        on_saved: Callable[[list[dict[str, Any]]], Any] | None = None,
+    ):
+        self.context = context
+        self.options = options
+        self.depth = depth
+        self.on_checked = on_checked
+        self.on_saved = on_saved
+
+    def run(self, batches: Iterable[list[Any]]):
+        """Process all batches.
+
+        Args:
+            batches: Lazy iterable of lists with `(resource_id, package_id, url)` triples
+        """
+        metrics.track_statements()
+        writer = _Writer(self.context, self.options, self.depth, self.on_saved) if self.options["save"] else None
+        if writer:
+            writer.start()
+
+        # the producer thread and its cursor are stopped even if the check
+        # fails in the middle of the source
+        source = prefetch(batches, self.depth)
+        try:
+            for rows in source:
+                reports = check_batch(self.context, rows, self.options)
+
+                if self.on_checked:
+                    self.on_checked(rows, reports)
+
+                if writer:
+                    writer.submit(reports)
+                elif self.on_saved:
+                    self.on_saved(reports)
+        finally:
+            source.close()
+            if writer:
+                writer.finish()
+
+
+class _Writer(threading.Thread):
+    """Writer stage of the pipeline, that saves reports in background."""
+
+    def __init__(
+        self,
+        context: types.Context,
+        options: dict[str, Any],
+        depth: int,
+        on_saved: Callable[[list[dict[str, Any]]], Any] | None,
+    ):
+        super().__init__(daemon=True)
+        # the writer gets its own copy of the context without objects bound
+        # to the session of the caller's thread, like the user object
+        self.context = context.copy()
+        for key in ("session", "auth_user_obj", "user_obj"):
+            self.context.pop(key, None)
+        self.options = options
+        self.on_saved = on_saved
+        self.queue: Queue[Any] = Queue(maxsize=depth)
+        self.error: BaseException | None = None
+        self.app = flask.current_app._get_current_object() if flask.has_app_context() else None  # noqa: SLF001
+
+    def submit(self, reports: list[dict[str, Any]]):
+        """Pass reports to the writer, waiting while the queue is full.
+
+        Args:
+            reports: Reports of the checked batch
+        """
+        while True:
+            self._raise_error()
+            try:
+                self.queue.put(reports, timeout=_POLL_INTERVAL)
+            except Full:  # noqa: PERF203
+                continue
+            metrics.queue_depth.set(self.queue.qsize(), stage="save")
+            return
+
+    def finish(self):
+        """Wait until all submitted reports are saved."""
+        while self.is_alive():
+            try:
+                self.queue.put(_DONE, timeout=_POLL_INTERVAL)
+            except Full:  # noqa: PERF203
+                continue
+            break
+
+        self.join()
+        self._raise_error()
+
+    def _raise_error(self):
+        if self.error:
+            raise self.error
+
+    def run(self):
+        if self.app:
+            with self.app.app_context():
+                self._consume()
+        else:
+            self._consume()
+
+    def _consume(self):
+        try:
+            while (reports := self.queue.get()) is not _DONE:
+                metrics.queue_depth.set(self.queue.qsize(), stage="save")
+                with metrics.phase("save"):
+                    save_reports(self.context, reports, self.options["clear_available"])
+                if self.on_saved:
+                    self.on_saved(reports)
+        except Exception as e:  # noqa: BLE001
+            self.error = e
+        finally:
+            model.Session.remove()
+
+
+def host_partition(url: str, workers: int) -> int:
+    """Choose the worker responsible for the URL.
+
+    All URLs of the same host go to the same worker, so delays between
+    requests and connection pools of a worker are never shared with another
+    process hitting the same server.
+
+    Args:
+        url: Checked URL
+        workers: Total number of workers
+
+    Returns:
+        Index of the worker
+    """
+    try:
+        host = urlsplit(url).hostname or ""
+    except ValueError:
+        host = ""
+
+    return zlib.crc32(host.encode()) % workers
+
+
+def parallel(  # noqa: PLR0913
+    context: types.Context,
+    options: dict[str, Any],
+    rows: Iterable[tuple[str, str, str]],
+    workers: int,
+    *,
+    size: int,
+    on_checked: Callable[[int, Counter[str]], Any] | None = None,
+    on_saved: Callable[[list[dict[str, Any]]], Any] | None = None,
+):
+    """Check resources using a pool of forked worker processes.
+
+    Rows are read by a thread of the current process and distributed between
+    workers by the host of the URL. Every worker runs its own `Pipeline` with
+    a separate database engine and HTTP client, and reports the number of
+    checked resources with their states back to the current process.
+
+    Args:
+        context: CKAN context dictionary containing user and session information
+        options: Check options, see `check_resources`
+        rows: Lazy iterable of `(resource_id, package_id, url)` triples
+        workers: Number of worker processes
+        size: Number of links checked concurrently by a worker
+        on_checked: Callback receiving the number of checked resources and
+            the counter of their states. Called in the current process
+        on_saved: Callback receiving `resource_id` and `state` of reports
+            from every saved batch. Called in the current process
+
+    Raises:
+        RuntimeError: worker failed
+    """
+    mp = multiprocessing.get_context("fork")
+    results: Any = mp.Queue()
+    tasks: list[Any] = [mp.Queue(maxsize=size * 2) for _ in range(workers)]
+    processes = [
+        mp.Process(target=_work, args=(context, options, size, queue, results), daemon=True) for queue in tasks
+    ]
+
+    # workers are forked before the feeder starts, so they never inherit
+    # its thread or the database connection it uses. The connection of the
+    # current thread is returned to the pool, so it's not checked out at the
+    # moment of fork
+    model.Session.remove()
+    for process in processes:
+        process.start()
+
+    feeder = _Feeder(rows, tasks)
+    feeder.start()
+
+    try:
+        _collect(results, processes, on_checked, on_saved)
+        feeder.join()
+        if feeder.error:
+            raise feeder.error
+    finally:
+        feeder.stopped.set()
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+
+
+def _collect(
+    results: Any,
+    processes: list[Any],
+    on_checked: Callable[[int, Counter[str]], Any] | None,
+    on_saved: Callable[[list[dict[str, Any]]], Any] | None,
+):
+    """Receive statistics from workers until all of them are finished.
+
+    Args:
+        results: Queue shared by workers
+        processes: Worker processes
+        on_checked: Callback receiving statistics of every checked batch
+        on_saved: Callback receiving reports of every saved batch
+
+    Raises:
+        RuntimeError: worker failed or terminated unexpectedly
+    """
+    running = len(processes)
+    while running:
+        try:
+            item = results.get(timeout=_POLL_INTERVAL)
+        except Empty:
+            if any(proc.exitcode not in (None, 0) for proc in processes):
+                msg = "Worker process terminated unexpectedly"
+                raise RuntimeError(msg) from None
+            continue
+
+        if item is None:
+            running -= 1
+        elif isinstance(item, str):
+            raise RuntimeError(item)
+        elif item[0] == "checked":
+            # checks are performed by workers, so their metrics are not
+            # visible in the current process unless recorded here
+            for state, count in item[2].items():
+                metrics.checks.inc(count, state=state)
+            metrics.last_progress.set(time.time())
+
+            if on_checked:
+                on_checked(*item[1:])
+        elif on_saved:
+            on_saved(item[1])
+
+
+class _Feeder(threading.Thread):
+    """Thread that distributes rows between queues of worker processes."""
+
+    def __init__(self, rows: Iterable[tuple[str, str, str]], tasks: list[Any]):
+        super().__init__(daemon=True)
+        self.rows = rows
+        self.tasks = tasks
+        self.stopped = threading.Event()
+        self.error: BaseException | None = None
+
+    def put(self, queue: Any, item: Any) -> bool:
+        """Put item into the worker's queue unless the pool is stopped.
+
+        Args:
+            queue: Queue of the worker
+            item: Resource triple or `None` that terminates the queue
+
+        Returns:
+            True if item was added to the queue
+        """
+        while not self.stopped.is_set():
+            try:
+                queue.put(item, timeout=_POLL_INTERVAL)
+            except Full:
+                continue
+            return True
+        return False
+
+    def run(self):
+        try:
+            for row in self.rows:
+                resource_id, package_id, url = row
+                queue = self.tasks[host_partition(url, len(self.tasks))]
+                if not self.put(queue, (resource_id, package_id, url)):
+                    return
+        except Exception as e:  # noqa: BLE001
+            self.error = e
+        finally:
+            model.Session.remove()
+            for queue in self.tasks:
+                self.put(queue, None)
+
+
+def _work(context: types.Context, options: dict[str, Any], size: int, tasks: Any, results: Any):
+    """Check resources received from the queue inside the worker process.
+
+    Args:
+        context: CKAN context dictionary containing user and session information
+        options: Check options, see `check_resources`
+        size: Number of links checked concurrently
+        tasks: Queue with resource triples, terminated by `None`
+        results: Queue for statistics of checked batches
+    """
+    # connections inherited from the parent process must not be used or
+    # closed here: closing sends ROLLBACK through the socket shared with the
+    # parent. The pool is replaced and the session is forgotten instead
+    model.meta.engine.dispose(close=False)
+    model.Session.registry.clear()
+
+    def on_checked(rows: list[Any], reports: list[dict[str, Any]]):
+        results.put(("checked", len(rows), Counter(r["state"] for r in reports)))
+
+    def on_saved(reports: list[dict[str, Any]]):
+        results.put(("saved", [{"resource_id": r.get("resource_id"), "state": r["state"]} for r in reports]))
+
+    try:
+        Pipeline(context, options, on_checked=on_checked, on_saved=on_saved).run(
+            batches(iter(tasks.get, None), size),
+        )
+    except Exception as e:
+        log.exception("Worker failed")
+        results.put(f"Worker failed: {e}")
+    finally:
+        results.put(None)
+
+
+def check_batch(
+    context: types.Context,
+    rows: Iterable[tuple[str, str, str]],
+    options: dict[str, Any],
+) -> list[dict[str, Any]]:
+    """Check URLs of resources.
+
+    Args:
+        context: CKAN context dictionary containing user and session information
+        rows: Iterable of `(resource_id, package_id, url)` triples
+        options: Dictionary containing:
+            - skip_invalid: Whether to skip invalid URLs
+            - link_patch: Additional parameters for link checking
+            - save: Whether reports will be saved. Links that failed with
+              transient errors are put into the retry queue in this case
+
+    Returns:
+        List of check results extended with resource and package IDs
+    """
+    rows = list(rows)
+    if not rows:
+        return []
+
+    # hooks are called here rather than by the check, so URLs modified by
+    # them can still be matched with their resources
+    urls = [url for _resource_id, _package_id, url in rows]
+    owners = _before_check(urls)
+
+    # Perform URL checks for all extracted URLs
+    result: list[dict[str, Any]] = tk.get_action("check_link_url_check")(
+        dict(context, check_link_before_check=False, check_link_after_check=False, check_link_positions=True),
+        {
+            "url": urls,
+            "skip_invalid": options["skip_invalid"],
+            "link_patch": options["link_patch"],
+        },
+    )
+
+    # Combine check results with resource/package IDs. Invalid and skipped
+    # URLs have no results, so rows are found by positions of checked URLs
+    reports: list[dict[str, Any]] = []
+    for report in result:
+        owner = owners[report.pop("position")]
+        if owner is None:
+            log.debug("URL added by the hook does not belong to a resource: %s", report["url"])
+            continue
+
+        resource_id, package_id, _url = rows[owner]
+        reports.append(dict(report, resource_id=resource_id, package_id=package_id))
+
+    # the queue of retries is kept in saved reports
+    if options.get("save"):
+        retry.schedule(reports)
+
+    for plugin in p.PluginImplementations(ICheckLink):
+        plugin.after_check(reports)
+
+    return reports
+
+
+def _before_check(urls: list[str]) -> list[int | None]:
+    """Call `ICheckLink.before_check` and track the origin of every URL.
+
+    Hooks may replace URLs or remove them from the list in place. When the
+    length of the list is not changed, every URL belongs to the row at the
+    same position. Otherwise remaining URLs are matched with rows in order.
+
+    Args:
+        urls: URLs of rows. Modified in place by hooks
+
+    Returns:
+        Position of the row for every URL, or None if the URL was added by
+        the hook
+    """
+    original = list(urls)
+    for plugin in p.PluginImplementations(ICheckLink):
+        plugin.before_check(urls)
+
+    if len(urls) == len(original):
+        return list(range(len(urls)))
+
+    owners: list[int | None] = []
+    start = 0
+    for url in urls:
+        owner = next((i for i in range(start, len(original)) if original[i] == url), None)
+        owners.append(owner)
+        if owner is not None:
+            start = owner + 1
+
+    return owners
+
+
+def check_resources(
+    context: types.Context,
+    rows: Iterable[tuple[str, str, str]],
+    options: dict[str, Any],
+) -> list[dict[str, Any]]:
+    """Check URLs of resources and optionally save reports.
+
+    Args:
+        context: CKAN context dictionary containing user and session information
+        rows: Iterable of `(resource_id, package_id, url)` triples
+        options: Dictionary containing:
+            - save: Whether to save results to database
+            - clear_available: Whether to remove available reports when saving
+            - skip_invalid: Whether to skip invalid URLs
+            - link_patch: Additional parameters for link checking
+
+    Returns:
+        List of check results extended with resource and package IDs
+    """
+    reports = check_batch(context, rows, options)
+
+    # Save reports to database if requested
+    if options["save"]:
+        save_reports(context, reports, options["clear_available"])
+
+    return reports
+
+
+def save_reports(context: types.Context, reports: Iterable[dict[str, Any]], clear: bool):
+    """Save link check reports to the database.
+
+    This function saves the whole batch of reports with set-based statements.
+    It can optionally remove available reports when saving, which helps
+    keep the database clean by removing successful checks while retaining failed ones.
+
+    Args:
+        context: CKAN context dictionary containing user and session information
+        reports: Iterable of report dictionaries to save to the database
+        clear: Whether to remove available reports when saving (keeps only failed checks)
+    """
+    # links that were not checked before the deadline keep their old reports
+    reports = [r for r in reports if r["state"] != STATE_PENDING]
+    if not reports:
+        return
+
+    tk.get_action("check_link_report_bulk_save")(
+        context.copy(),
+        {"reports": reports, "clear_available": clear},
+    )
+
+
+def defer_pending(reports: list[dict[str, Any]], options: dict[str, Any], *, save: bool = False) -> bool:
+    """Check links that were not checked before the deadline in background.
+
+    A single job is enqueued for all reports of the call.
+
+    Args:
+        reports: Check results, possibly with `pending` reports
+        options: Dictionary containing `clear_available`, `skip_invalid` and
+            `link_patch`
+        save: Whether finished reports must be saved by the job as well
+
+    Returns:
+        True if the background job was enqueued
+    """
+    rows = [(r.get("resource_id"), r.get("package_id"), r["url"]) for r in reports if r["state"] == STATE_PENDING]
+    finished = [r for r in reports if r["state"] != STATE_PENDING] if save else []
+    if not rows and not finished:
+        return False
+
+    tk.enqueue_job(
+        check_deferred,
+        [rows, {key: options[key] for key in ("clear_available", "skip_invalid", "link_patch")}, finished],
+        title=f"Check {len(rows)} links after deadline",
+    )
+    return True
+
+
+def check_deferred(
+    rows: list[tuple[str | None, str | None, str]],
+    options: dict[str, Any],
+    reports: list[dict[str, Any]] | None = None,
+):
+    """Background job that checks and saves links without deadline.
+
+    Args:
+        rows: `(resource_id, package_id, url)` triples. IDs are empty for
+            links that do not belong to resources
+        options: Check options, see `check_resources`
+        reports: Reports finished after the deadline, that are saved as is
+    """
+    user = tk.get_action("get_site_user")({"ignore_auth": True}, {})
+    context: types.Context = {"user": user["name"]}
+
+    if reports:
+        save_reports(context, reports, options["clear_available"])
+
+    for batch in batches(rows, batch_size()):
+        check_resources(context, batch, dict(options, save=True))
+
+
+def check_retries(
+    context: types.Context,
+    options: dict[str, Any],
+    *,
+    wait: bool = False,
+    on_checked: Callable[[list[dict[str, Any]]], Any] | None = None,
+) -> int:
+    """Check links from the retry queue.
+
+    Links whose retry is due are checked and saved in batches. Links that
+    fail again are rescheduled until attempts are exhausted.
+
+    Args:
+        context: CKAN context dictionary containing user and session information
+        options: Check options, see `check_resources`
+        wait: Sleep until remaining retries are due, draining the whole queue
+        on_checked: Callback receiving reports of every checked batch
+
+    Returns:
+        Number of checked links
+    """
+    options = dict(options, save=True)
+    size = batch_size()
+    checked = 0
+
+    # every pass increases attempts of remaining links, so the queue is
+    # empty after the last one
+    for _attempt in range(retry.max_attempts() + 1):
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        rows = model.Session.execute(retry.due(now)).all()
+        for batch in batches(rows, size):
+            reports = check_resources(context, batch, options)
+            checked += len(batch)
+            if on_checked:
+                on_checked(reports)
+
+        if not wait or not (moment := retry.next_due()):
+            break
+
+        pause = (moment - datetime.now(timezone.utc).replace(tzinfo=None)).total_seconds()
+        if pause > 0:
+            log.info("Waiting %.1f seconds for the next retry", pause)
+            time.sleep(pause)
+
+    return checked
@@ -0,0 +1,247 @@
+"""Retention policy of link check reports.
+
+The policy is defined by config options:
+
+* `ckanext.check_link.retention.max_age` - space-separated `state=days`
+  pairs. Reports in the state that were checked earlier than the given
+  number of days ago are removed. `*` stands for states not listed
+  explicitly;
+* `ckanext.check_link.retention.free_max_age` - maximal age in days of
+  reports that are not attached to resources;
+* `ckanext.check_link.retention.orphans` - remove reports of deleted or
+  missing resources.
+
+Reports that match any rule are removed in bounded batches. Every batch is
+deleted and committed in a separate short transaction, optionally followed by
+a pause, so cleanup never holds locks on the whole table and does not produce
+huge transactions for replicas. Before removal, rows can be appended to a
+gzip-compressed NDJSON archive.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import gzip
+import logging
+import os
+import time
+from collections.abc import Callable, Iterable
+from datetime import datetime, timedelta, timezone
+from typing import IO, Any
+
+import sqlalchemy as sa
+
+import ckan.plugins.toolkit as tk
+from ckan import model
+
+from . import cache, export, utils
+from .model import Report
+
+log = logging.getLogger(__name__)
+
+CONFIG_MAX_AGE = "ckanext.check_link.retention.max_age"
+CONFIG_FREE_MAX_AGE = "ckanext.check_link.retention.free_max_age"
+CONFIG_ORPHANS = "ckanext.check_link.retention.orphans"
+CONFIG_BATCH_SIZE = "ckanext.check_link.retention.batch_size"
+CONFIG_SLEEP = "ckanext.check_link.retention.sleep"
+CONFIG_ARCHIVE_DIR = "ckanext.check_link.retention.archive_dir"
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_SLEEP = 0
+
+ANY_STATE = "*"
+
+__all__ = ["Policy", "enforce", "get_policy", "parse_max_age"]
+
+
+@dataclasses.dataclass(frozen=True)
+class Policy:
+    """Rules that decide which reports are removed.
+
+    Attributes:
+        max_age: Maximal age in days per state. `*` applies to other states
+        free_max_age: Maximal age in days of reports without resource
+        orphans: Remove reports of deleted or missing resources
+    """
+
+    max_age: dict[str, int] = dataclasses.field(default_factory=dict)
+    free_max_age: int | None = None
+    orphans: bool = False
+
+    def __bool__(self):
+        return bool(self.max_age) or self.free_max_age is not None or self.orphans
+
+    def condition(self, now: datetime) -> Any:
+        """Build the condition that matches expired reports.
+
+        Args:
+            now: Current moment
+
+        Returns:
+            SQL condition or None if the policy is empty
+        """
+        clauses: list[Any] = []
+        explicit = [state for state in self.max_age if state != ANY_STATE]
+
+        for state, days in self.max_age.items():
+            expired = Report.created_at < now - timedelta(days=days)
+            if state == ANY_STATE:
+                clauses.append(sa.and_(Report.state.notin_(explicit), expired) if explicit else expired)
+            else:
+                clauses.append(sa.and_(Report.state == state, expired))
+
+        if self.free_max_age is not None:
+            clauses.append(
+                sa.and_(
+                    Report.resource_id.is_(None),
+                    Report.created_at < now - timedelta(days=self.free_max_age),
+                )
+            )
+
+        if self.orphans:
+            clauses.append(utils.orphaned())
+
+        return sa.or_(*clauses) if clauses else None
+
+
+def parse_max_age(items: Iterable[str]) -> dict[str, int]:
+    """Parse `state=days` pairs.
+
+    Args:
+        items: Pairs from the config or command line
+
+    Returns:
+        Maximal age in days per state
+
+    Raises:
+        ValueError: If a pair is malformed
+    """
+    result: dict[str, int] = {}
+    for item in items:
+        state, sep, days = item.partition("=")
+        if not sep or not state:
+            msg = f"Retention age must be defined as state=days: {item}"
+            raise ValueError(msg)
+        result[state] = int(days)
+    return result
+
+
+def get_policy() -> Policy:
+    """Get retention policy from the current configuration.
+
+    Returns:
+        Configured policy
+    """
+    free_max_age = tk.config.get(CONFIG_FREE_MAX_AGE)
+    return Policy(
+        max_age=parse_max_age(tk.aslist(tk.config.get(CONFIG_MAX_AGE))),
+        free_max_age=None if free_max_age in (None, "") else tk.asint(free_max_age),
+        orphans=tk.asbool(tk.config.get(CONFIG_ORPHANS)),
+    )
+
+
+def archive_path(directory: str, now: datetime) -> str:
+    """Build the path of the archive created by the scheduled cleanup.
+
+    Args:
+        directory: Directory for archives
+        now: Moment of the cleanup
+
+    Returns:
+        Path to the gzip-compressed NDJSON file
+    """
+    return os.path.join(directory, "check-link-{}.ndjson.gz".format(now.strftime("%Y%m%dT%H%M%S")))
+
+
+def enforce(  # noqa: PLR0913
+    policy: Policy | None = None,
+    *,
+    batch_size: int | None = None,
+    sleep: float | None = None,
+    archive: str | None = None,
+    dry_run: bool = False,
+    on_batch: Callable[[int], Any] | None = None,
+) -> int:
+    """Remove reports that are expired according to the policy.
+
+    When called without arguments, e.g. as a background job, every setting
+    is taken from the config and the archive is written into
+    `ckanext.check_link.retention.archive_dir` if it is set.
+
+    Args:
+        policy: Retention rules. Configured policy by default
+        batch_size: Number of reports removed in a single transaction
+        sleep: Pause in seconds between batches
+        archive: Path to the gzip-compressed NDJSON file that receives removed
+            reports. Existing file is extended
+        dry_run: Only count expired reports
+        on_batch: Callback that receives the number of reports in every
+            removed batch
+
+    Returns:
+        Number of removed reports, or expired reports when `dry_run` is set
+    """
+    if policy is None:
+        policy = get_policy()
+
+    batch_size = batch_size or tk.asint(tk.config.get(CONFIG_BATCH_SIZE, DEFAULT_BATCH_SIZE))
+    if sleep is None:
+        sleep = float(tk.config.get(CONFIG_SLEEP, DEFAULT_SLEEP))
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    if archive is None and (directory := tk.config.get(CONFIG_ARCHIVE_DIR)):
+        archive = archive_path(directory, now)
+
+    condition = policy.condition(now)
+    if condition is None:
+        return 0
+
+    if dry_run:
+        return model.Session.scalar(sa.select(sa.func.count()).select_from(Report).where(condition))
+
+    stmt = utils.export_statement({}).where(condition).order_by(None).order_by(Report.created_at).limit(batch_size)
+
+    with gzip.open(archive, "at", encoding="utf-8") if archive else contextlib.nullcontext() as dest:
+        deleted = _purge(stmt, dest, sleep, on_batch)
+
+    if deleted:
+        cache.invalidate_all()
+
+    log.info("Retention policy removed %d reports", deleted)
+    return deleted
+
+
+def _purge(stmt: Any, dest: IO[str] | None, sleep: float, on_batch: Callable[[int], Any] | None) -> int:
+    """Remove reports selected by the statement batch by batch.
+
+    Args:
+        stmt: Export statement limited by the size of the batch
+        dest: Archive for removed reports
+        sleep: Pause in seconds between batches
+        on_batch: Callback that receives the number of reports in the batch
+
+    Returns:
+        Number of removed reports
+    """
+    deleted = 0
+    while rows := model.Session.execute(stmt).all():
+        if dest:
+            # rows are archived before removal, so a failed write keeps them
+            dest.writelines(export.iter_ndjson(rows))
+            dest.flush()
+
+        deleted += model.Session.execute(
+            sa.delete(Report)
+            .where(Report.id.in_([row.id for row in rows]))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        model.Session.commit()
+
+        if on_batch:
+            on_batch(len(rows))
+
+        if sleep:
+            time.sleep(sleep)
+
+    return deleted
@@ -0,0 +1,217 @@
+"""Deferred retries of links that failed with transient errors.
+
+Timeouts, `502 Bad Gateway`, `503 Service Unavailable` and `429 Too Many
+Requests` often disappear after a while, so reporting them as broken right
+away produces false alarms. When reports of a batch are saved, such links get
+the `retry` state instead, and the moment of the next attempt is stored in
+`details.retry`. The batch does not wait for them: the queue of due retries is
+drained at the end of the CLI run or by `ckan check-link check-retries`.
+
+The delay grows exponentially with every attempt and is randomized ("equal
+jitter"), so links of a single host are not retried at the same moment.
+`Retry-After` header of the response, when present, sets the minimal delay.
+When attempts are exhausted, the actual result of the last check is saved.
+
+Options:
+
+* `ckanext.check_link.retry.max_attempts` - number of retries. 0 disables them;
+* `ckanext.check_link.retry.base_delay` - delay in seconds before the first retry;
+* `ckanext.check_link.retry.max_delay` - upper bound of the delay in seconds.
+"""
+
+from __future__ import annotations
+
+import random
+from collections.abc import Iterable
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any
+
+import sqlalchemy as sa
+
+import ckan.plugins.toolkit as tk
+from ckan import model
+
+from .model import Report
+from .urls import url_hash
+
+CONFIG_MAX_ATTEMPTS = "ckanext.check_link.retry.max_attempts"
+DEFAULT_MAX_ATTEMPTS = 3
+
+CONFIG_BASE_DELAY = "ckanext.check_link.retry.base_delay"
+DEFAULT_BASE_DELAY = 30
+
+CONFIG_MAX_DELAY = "ckanext.check_link.retry.max_delay"
+DEFAULT_MAX_DELAY = 3600
+
+# state of links that wait for the next attempt
+STATE_RETRY = "retry"
+
+TRANSIENT_STATES = {"timeout"}
+TRANSIENT_CODES = {429, 502, 503}
+
+__all__ = [
+    "STATE_RETRY",
+    "backoff",
+    "due",
+    "is_transient",
+    "max_attempts",
+    "next_due",
+    "parse_retry_after",
+    "schedule",
+]
+
+
+def max_attempts() -> int:
+    """Number of retries of a link.
+
+    Returns:
+        Configured number of attempts. 0 means that retries are disabled
+    """
+    return tk.asint(tk.config.get(CONFIG_MAX_ATTEMPTS, DEFAULT_MAX_ATTEMPTS))
+
+
+def is_transient(report: dict[str, Any]) -> bool:
+    """Check whether the failure of the link may disappear by itself.
+
+    Args:
+        report: Check result
+
+    Returns:
+        True if the link must be checked again later
+    """
+    return report["state"] in TRANSIENT_STATES or report.get("code") in TRANSIENT_CODES
+
+
+def parse_retry_after(value: str | None, now: datetime) -> float | None:
+    """Parse `Retry-After` header.
+
+    Args:
+        value: Number of seconds or HTTP date
+        now: Current moment, naive UTC
+
+    Returns:
+        Number of seconds or None if the value is missing or malformed
+    """
+    if not value:
+        return None
+
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if moment.tzinfo:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+    return max((moment - now).total_seconds(), 0)
+
+
+def backoff(attempt: int, retry_after: float | None = None) -> float:
+    """Compute the delay before the attempt.
+
+    Args:
+        attempt: Number of the retry, starting from 1
+        retry_after: Delay requested by the server
+
+    Returns:
+        Number of seconds, not exceeding the configured maximum
+    """
+    base = float(tk.config.get(CONFIG_BASE_DELAY, DEFAULT_BASE_DELAY))
+    limit = float(tk.config.get(CONFIG_MAX_DELAY, DEFAULT_MAX_DELAY))
+
+    delay = min(base * 2 ** (attempt - 1), limit)
+    delay = random.uniform(delay / 2, delay)  # noqa: S311
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+
+    return min(delay, limit)
+
+
+def schedule(reports: Iterable[dict[str, Any]], now: datetime | None = None) -> int:
+    """Put links that failed with transient errors into the retry queue.
+
+    Reports are updated in place: they get the `retry` state and `retry`
+    details with the number of the `attempt`, the actual `state` of the
+    link, the `delay` and the moment of the next attempt as `next_at`.
+    Reports of links that exhausted attempts are left unchanged.
+
+    Args:
+        reports: Check results that will be saved
+        now: Current moment, naive UTC
+
+    Returns:
+        Number of scheduled retries
+    """
+    limit = max_attempts()
+    transient = [r for r in reports if is_transient(r)] if limit else []
+    if not transient:
+        return 0
+
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+    hashes = {url_hash(r["url"]) for r in transient}
+    previous: dict[str, dict[str, Any]] = dict(
+        model.Session.execute(
+            sa.select(Report.url_id, Report.details["retry"]).where(
+                Report.state == STATE_RETRY, Report.url_id.in_(hashes)
+            )
+        ).all()
+    )
+
+    scheduled = 0
+    for report in transient:
+        attempt = (previous.get(url_hash(report["url"])) or {}).get("attempt", 0) + 1
+        if attempt > limit:
+            continue
+
+        delay = backoff(attempt, parse_retry_after(report.get("retry_after"), now))
+        report["retry"] = {
+            "attempt": attempt,
+            "state": report["state"],
+            "delay": round(delay, 1),
+            "next_at": (now + timedelta(seconds=delay)).isoformat(timespec="seconds"),
+        }
+        report["state"] = STATE_RETRY
+        scheduled += 1
+
+    return scheduled
+
+
+def due(now: datetime) -> Any:
+    """Select links whose retry is due.
+
+    Every URL is selected once, even if it is referenced by multiple
+    reports: the result of the retry is shared by all of them.
+
+    Args:
+        now: Current moment, naive UTC
+
+    Returns:
+        Statement that selects `(resource_id, package_id, url)` triples
+    """
+    next_at = Report.details[("retry", "next_at")].astext
+    links = (
+        sa.select(Report.resource_id, model.Resource.package_id, Report.url, next_at.label("next_at"))
+        .outerjoin(model.Resource, Report.resource_id == model.Resource.id)
+        .where(Report.state == STATE_RETRY, next_at <= now.isoformat(timespec="seconds"))
+        .distinct(Report.url_id)
+        .order_by(Report.url_id, next_at)
+        .subquery()
+    )
+    return sa.select(links.c.resource_id, links.c.package_id, links.c.url).order_by(links.c.next_at)
+
+
+def next_due() -> datetime | None:
+    """Find the moment of the earliest retry.
+
+    Returns:
+        Naive UTC moment or None if the queue is empty
+    """
+    value = model.Session.scalar(
+        sa.select(sa.func.min(Report.details[("retry", "next_at")].astext)).where(Report.state == STATE_RETRY)
+    )
+    return datetime.fromisoformat(value) if value else None
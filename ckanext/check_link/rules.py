@@ -0,0 +1,212 @@
+"""Domain and URL-pattern rules applied before links are checked.
+
+Rules are defined by config options, each containing a space-separated list
+of patterns:
+
+* `ckanext.check_link.rules.skip` - links are not checked and not reported;
+* `ckanext.check_link.rules.internal` - links point to hosts that are not
+  reachable from the checker. They are reported with `unknown` state without
+  network requests;
+* `ckanext.check_link.rules.available` - links are reported as available
+  without network requests;
+* `ckanext.check_link.rules.timeout` - `pattern=seconds` pairs that override
+  the timeout of the check.
+
+A pattern is either a domain, that matches the domain itself and all its
+subdomains, an IP network in CIDR notation, that matches IP addresses used as
+hosts, or a regular expression prefixed with `re:`, that is matched against
+the beginning of the URL.
+
+Patterns are compiled once per configuration: domains into a suffix trie of
+labels, regular expressions into an alternation per kind of rules. When a link matches
+rules of different kinds, `skip` wins over `internal`, and `internal` wins
+over `available`.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import functools
+import ipaddress
+import re
+from collections.abc import Iterable
+from typing import Any
+from urllib.parse import urlsplit
+
+import ckan.plugins.toolkit as tk
+
+CONFIG_SKIP = "ckanext.check_link.rules.skip"
+CONFIG_INTERNAL = "ckanext.check_link.rules.internal"
+CONFIG_AVAILABLE = "ckanext.check_link.rules.available"
+CONFIG_TIMEOUT = "ckanext.check_link.rules.timeout"
+
+SKIP = "skip"
+INTERNAL = "internal"
+AVAILABLE = "available"
+TIMEOUT = "timeout"
+
+# kinds of rules that decide the result, from the strongest
+_PRIORITY = [SKIP, INTERNAL, AVAILABLE]
+
+__all__ = ["AVAILABLE", "INTERNAL", "SKIP", "Match", "Rules", "get_rules"]
+
+
+@dataclasses.dataclass(frozen=True)
+class Match:
+    """Rules that apply to the link.
+
+    Attributes:
+        action: `skip`, `internal`, `available` or None if the link must be
+            checked
+        timeout: Timeout of the check or None if the default is used
+    """
+
+    action: str | None = None
+    timeout: int | None = None
+
+
+_NO_MATCH = Match()
+
+
+class _Node:
+    __slots__ = ("children", "rules")
+
+    def __init__(self):
+        self.children: dict[str, _Node] = {}
+        self.rules: dict[str, Any] = {}
+
+
+class Rules:
+    """Compiled set of rules.
+
+    Args:
+        rules: Iterable of `(kind, pattern, value)` triples
+    """
+
+    def __init__(self, rules: Iterable[tuple[str, str, Any]]):
+        self.trie = _Node()
+        self.networks: list[tuple[Any, str, Any]] = []
+        regexes: dict[str, list[str]] = {}
+        self.groups: dict[str, dict[str, Any]] = {}
+
+        for kind, pattern, value in rules:
+            if pattern.startswith("re:"):
+                group = f"r{sum(map(len, regexes.values()))}"
+                regexes.setdefault(kind, []).append(f"(?P<{group}>{pattern[3:]})")
+                self.groups.setdefault(kind, {})[group] = value
+                continue
+
+            try:
+                self.networks.append((ipaddress.ip_network(pattern, strict=False), kind, value))
+            except ValueError:
+                self._add_domain(pattern, kind, value)
+
+        # every kind has its own alternation, so a pattern of one kind never
+        # hides a pattern of another kind listed after it
+        self.regexes = {kind: re.compile("|".join(items)) for kind, items in regexes.items()}
+
+    def __bool__(self):
+        return bool(self.trie.children or self.networks or self.regexes)
+
+    def _add_domain(self, domain: str, kind: str, value: Any):
+        node = self.trie
+        for label in reversed(domain.lower().strip(".").split(".")):
+            node = node.children.setdefault(label, _Node())
+        node.rules[kind] = value
+
+    def match(self, url: str) -> Match:
+        """Find rules that apply to the URL.
+
+        Args:
+            url: URL of the link
+
+        Returns:
+            Action and timeout of the link
+        """
+        try:
+            host = urlsplit(url).hostname
+        except ValueError:
+            return _NO_MATCH
+
+        found: dict[str, Any] = {}
+        for kind, regex in self.regexes.items():
+            if m := regex.match(url):
+                groups = self.groups[kind]
+                found[kind] = groups[next(name for name in groups if m.group(name) is not None)]
+
+        if host:
+            self._match_host(host, found)
+
+        if not found:
+            return _NO_MATCH
+
+        action = next((kind for kind in _PRIORITY if kind in found), None)
+        return Match(action, found.get(TIMEOUT))
+
+    def _match_host(self, host: str, found: dict[str, Any]):
+        try:
+            address = ipaddress.ip_address(host)
+        except ValueError:
+            address = None
+
+        if address is not None:
+            for network, kind, value in self.networks:
+                if address.version == network.version and address in network:
+                    found.setdefault(kind, value)
+            return
+
+        # the most specific domain wins, so rules are collected from the
+        # deepest matching node up to the top-level domain
+        node = self.trie
+        path: list[_Node] = []
+        for label in reversed(host.rstrip(".").split(".")):
+            node = node.children.get(label)
+            if node is None:
+                break
+            path.append(node)
+
+        for node in reversed(path):
+            for kind, value in node.rules.items():
+                found.setdefault(kind, value)
+
+
+def _parse_timeouts(items: Iterable[str]) -> list[tuple[str, str, int]]:
+    result: list[tuple[str, str, int]] = []
+    for item in items:
+        pattern, sep, seconds = item.rpartition("=")
+        if not sep or not pattern:
+            msg = f"Timeout rule must be defined as pattern=seconds: {item}"
+            raise ValueError(msg)
+        result.append((TIMEOUT, pattern, int(seconds)))
+    return result
+
+
+@functools.lru_cache(maxsize=8)
+def _compile(
+    skip: tuple[str, ...], internal: tuple[str, ...], available: tuple[str, ...], timeout: tuple[str, ...]
+) -> Rules:
+    return Rules(
+        [
+            *((SKIP, pattern, True) for pattern in skip),
+            *((INTERNAL, pattern, True) for pattern in internal),
+            *((AVAILABLE, pattern, True) for pattern in available),
+            *_parse_timeouts(timeout),
+        ]
+    )
+
+
+def get_rules() -> Rules:
+    """Get rules compiled from the current configuration.
+
+    Compiled rules are cached, so the function is cheap enough to be called
+    for every check.
+
+    Returns:
+        Compiled rules
+    """
+    return _compile(
+        tuple(tk.aslist(tk.config.get(CONFIG_SKIP))),
+        tuple(tk.aslist(tk.config.get(CONFIG_INTERNAL))),
+        tuple(tk.aslist(tk.config.get(CONFIG_AVAILABLE))),
+        tuple(tk.aslist(tk.config.get(CONFIG_TIMEOUT))),
+    )
@@ -1,5 +1,7 @@
+import asyncio
 from unittest.mock import ANY
 
+import httpx
 import pytest
 
 import ckan.plugins.toolkit as tk
@@ -7,6 +9,8 @@ import ckan.plugins.toolkit as tk
 # from aioresponses import aioresponses
 from ckan.tests.helpers import call_action
 
+from ckanext.check_link import local, processing
+
 
 @pytest.fixture
 def rmock(httpx_mock):
@@ -32,6 +36,7 @@ class TestUrl:
                 "explanation": ANY,
                 "reason": ANY,
                 "state": "available",
+                "timings": ANY,
                 "url": url1,
             },
             {
@@ -39,6 +44,7 @@ class TestUrl:
                 "explanation": ANY,
                 "reason": ANY,
                 "state": "missing",
+                "timings": ANY,
                 "url": url2,
             },
         ]
@@ -68,13 +74,132 @@ class TestUrl:
                 "code": 200,
                 "explanation": "Link is available",
                 "reason": "OK",
+                "timings": ANY,
             },
             "id": ANY,
             "resource_id": None,
             "package_id": None,
             "state": "available",
             "url": url,
+            "url_id": ANY,
+        }
+
+    def test_repeated_url_checked_once(self, faker, rmock):
+        url = faker.url()
+        rmock.add_response(url=url, status_code=404, method="HEAD")
+
+        result = call_action("check_link_url_check", url=[url, url + "#fragment"])
+
+        assert [r["url"] for r in result] == [url, url + "#fragment"]
+        assert [r["state"] for r in result] == ["missing", "missing"]
+        assert len(rmock.get_requests()) == 1
+
+    def test_timings(self, faker, rmock):
+        url = faker.url()
+        rmock.add_response(url=url, status_code=200, method="HEAD")
+
+        result = call_action("check_link_url_check", url=url)
+        assert result[0]["timings"] == {
+            "connect": ANY,
+            "tls": ANY,
+            "ttfb": ANY,
+            "total": ANY,
+            "bytes": 0,
+        }
+        assert result[0]["timings"]["total"] >= 0
+
+    @pytest.mark.ckan_config("ckanext.check_link.check.collect_timings", "false")
+    def test_timings_disabled(self, faker, rmock):
+        url = faker.url()
+        rmock.add_response(url=url, status_code=200, method="HEAD")
+
+        result = call_action("check_link_url_check", url=url)
+        assert "timings" not in result[0]
+
+    def test_redirect_cached(self, faker, rmock):
+        url = faker.url()
+        target = faker.url()
+        rmock.add_response(url=url, method="HEAD", status_code=301, headers={"location": target})
+        rmock.add_response(url=target, method="HEAD", status_code=200)
+        rmock.add_response(url=target, method="HEAD", status_code=200)
+
+        result = call_action("check_link_url_check", url=url, save=True)
+        assert result[0]["state"] == "available"
+        assert result[0]["redirect"] == {
+            "chain": [{"url": url, "code": 301}],
+            "final_url": target,
+            "permanent": True,
+            "target": target,
+        }
+
+        result = call_action("check_link_url_check", url=url, save=True)
+        assert result[0]["state"] == "available"
+        assert result[0]["redirect"]["target"] == target
+        assert [str(r.url) for r in rmock.get_requests()] == [url, target, target]
+
+    def test_redirect_fallback(self, faker, rmock):
+        url = faker.url()
+        old = faker.url()
+        new = faker.url()
+        rmock.add_response(url=url, method="HEAD", status_code=308, headers={"location": old})
+        rmock.add_response(url=old, method="HEAD", status_code=200)
+        rmock.add_response(url=old, method="HEAD", status_code=404)
+        rmock.add_response(url=url, method="HEAD", status_code=308, headers={"location": new})
+        rmock.add_response(url=new, method="HEAD", status_code=200)
+
+        call_action("check_link_url_check", url=url, save=True)
+        result = call_action("check_link_url_check", url=url, save=True)
+        assert result[0]["state"] == "available"
+        assert result[0]["redirect"]["target"] == new
+
+    def test_temporary_redirect_not_cached(self, faker, rmock):
+        url = faker.url()
+        target = faker.url()
+        rmock.add_response(url=url, method="HEAD", status_code=302, headers={"location": target})
+        rmock.add_response(url=target, method="HEAD", status_code=200)
+
+        result = call_action("check_link_url_check", url=url, save=True)
+        assert result[0]["redirect"]["permanent"] is False
+        assert result[0]["redirect"]["target"] is None
+
+    @pytest.mark.ckan_config("ckanext.check_link.check.fingerprint", "true")
+    def test_fingerprint(self, faker, rmock):
+        url = faker.url()
+        rmock.add_response(url=url, method="GET", content=b"hello", headers={"etag": '"v1"'})
+
+        result = call_action("check_link_url_check", url=url)
+        assert result[0]["state"] == "available"
+        assert result[0]["fingerprint"] == {
+            "digest": "sha256:2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824",
+            "size": 5,
+            "complete": True,
+            "headers": {"content-length": "5", "etag": '"v1"'},
         }
+        assert result[0]["changed"] is False
+
+    @pytest.mark.ckan_config("ckanext.check_link.check.fingerprint", "true")
+    @pytest.mark.ckan_config("ckanext.check_link.check.fingerprint_max_bytes", "3")
+    def test_fingerprint_limit(self, faker, rmock):
+        url = faker.url()
+        rmock.add_response(url=url, method="GET", content=b"hello")
+
+        result = call_action("check_link_url_check", url=url)
+        assert result[0]["fingerprint"]["size"] == 3
+        assert result[0]["fingerprint"]["complete"] is False
+
+    @pytest.mark.ckan_config("ckanext.check_link.check.fingerprint", "true")
+    def test_changed(self, faker, rmock):
+        url = faker.url()
+        rmock.add_response(url=url, method="GET", content=b"hello")
+        rmock.add_response(url=url, method="GET", content=b"hello")
+        rmock.add_response(url=url, method="GET", content=b"world")
+
+        assert call_action("check_link_url_check", url=url, save=True)[0]["changed"] is False
+        assert call_action("check_link_url_check", url=url, save=True)[0]["changed"] is False
+        assert call_action("check_link_url_check", url=url, save=True)[0]["changed"] is True
+
+        report = call_action("check_link_report_show", url=url)
+        assert report["details"]["changed"] is True
 
 
 @pytest.mark.usefixtures("with_plugins", "clean_db")
@@ -109,3 +234,163 @@ class TestPackage:
     def test_empty(self, package):
         result = call_action("check_link_package_check", id=package["id"])
         assert result == []
+
+    def test_by_name(self, resource_factory, rmock, package):
+        resource = resource_factory(package_id=package["id"])
+        rmock.add_response(url=resource["url"], status_code=200, method="HEAD")
+        result = call_action("check_link_package_check", id=package["name"])
+        assert [r["resource_id"] for r in result] == [resource["id"]]
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db")
+class TestOrganization:
+    def test_basic(self, organization, package_factory, resource_factory, rmock):
+        package = package_factory(owner_org=organization["id"])
+        resource = resource_factory(package_id=package["id"])
+        resource_factory(package_id=package_factory()["id"])
+
+        rmock.add_response(url=resource["url"], status_code=200, method="HEAD")
+        result = call_action("check_link_organization_check", id=organization["name"])
+
+        assert [r["resource_id"] for r in result] == [resource["id"]]
+        assert result[0]["package_id"] == package["id"]
+
+    def test_private_excluded_by_default(self, organization, package_factory, resource_factory):
+        package = package_factory(owner_org=organization["id"], private=True)
+        resource_factory(package_id=package["id"])
+
+        assert call_action("check_link_organization_check", id=organization["id"]) == []
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db")
+class TestGroup:
+    def test_basic(self, group, package_factory, resource_factory, rmock):
+        package = package_factory(groups=[{"id": group["id"]}])
+        resource = resource_factory(package_id=package["id"])
+
+        rmock.add_response(url=resource["url"], status_code=200, method="HEAD")
+        result = call_action("check_link_group_check", id=group["name"])
+
+        assert [r["resource_id"] for r in result] == [resource["id"]]
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db")
+class TestSearch:
+    def test_basic(self, package_factory, resource_factory, rmock):
+        package = package_factory()
+        resource = resource_factory(package_id=package["id"])
+        resource_factory(package_id=package_factory()["id"])
+
+        rmock.add_response(url=resource["url"], status_code=200, method="HEAD")
+        result = call_action("check_link_search_check", fq=f"name:{package['name']}")
+
+        assert [r["resource_id"] for r in result] == [resource["id"]]
+
+    def test_packages_without_urls_ignored(self, package_factory, resource_factory):
+        package = package_factory()
+        resource_factory(package_id=package["id"], url="")
+
+        assert call_action("check_link_search_check", fq=f"name:{package['name']}") == []
+
+    def test_hidden_packages_excluded_for_user(self, user, organization, package_factory, resource_factory):
+        private = package_factory(owner_org=organization["id"], private=True)
+        resource_factory(package_id=private["id"])
+        draft = package_factory(state="draft")
+        resource_factory(package_id=draft["id"])
+
+        result = call_action(
+            "check_link_search_check",
+            {"user": user["name"]},
+            include_private=True,
+            include_drafts=True,
+        )
+        assert result == []
+
+
+async def _slow_response(request: httpx.Request):
+    await asyncio.sleep(5)
+    return httpx.Response(200)
+
+
+@pytest.fixture()
+def jobs(monkeypatch: pytest.MonkeyPatch):
+    enqueued = []
+    monkeypatch.setattr(tk, "enqueue_job", lambda fn, args, **kwargs: enqueued.append((fn, args)))
+    return enqueued
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db")
+class TestDeadline:
+    def test_unfinished_links_are_pending(self, faker, rmock):
+        fast = faker.url()
+        slow = faker.url()
+        rmock.add_response(url=fast, status_code=200, method="HEAD")
+        rmock.add_callback(_slow_response, url=slow, method="HEAD")
+
+        result = call_action("check_link_url_check", url=[fast, slow], deadline=1, save=True)
+        assert [(r["url"], r["state"]) for r in result] == [(fast, "available"), (slow, "pending")]
+
+        assert call_action("check_link_report_show", url=fast)
+        with pytest.raises(tk.ObjectNotFound):
+            call_action("check_link_report_show", url=slow)
+
+    def test_pending_links_deferred(self, faker, rmock, jobs):
+        url = faker.url()
+        rmock.add_callback(_slow_response, url=url, method="HEAD")
+
+        call_action("check_link_url_check", url=url, deadline=1, defer=True)
+        assert jobs == [(processing.check_deferred, [[(None, None, url)], ANY, []])]
+
+    def test_nothing_deferred_without_pending(self, faker, rmock, jobs):
+        url = faker.url()
+        rmock.add_response(url=url, status_code=200, method="HEAD")
+
+        call_action("check_link_url_check", url=url, deadline=1, defer=True)
+        assert jobs == []
+
+    def test_late_reports_saved_by_job(self, faker, rmock, jobs):
+        fast = faker.url()
+        slow = faker.url()
+        rmock.add_response(url=fast, status_code=200, method="HEAD")
+        rmock.add_callback(_slow_response, url=slow, method="HEAD")
+
+        call_action("check_link_url_check", url=[fast, slow], deadline=1, defer=True, save=True)
+
+        assert jobs == [(processing.check_deferred, [[(None, None, slow)], ANY, [ANY]])]
+        assert jobs[0][1][2][0]["url"] == fast
+        with pytest.raises(tk.ObjectNotFound):
+            call_action("check_link_report_show", url=fast)
+
+    def test_single_job_for_scoped_check(self, package, resource_factory, jobs):
+        resource_factory.create_batch(3, package_id=package["id"])
+
+        call_action("check_link_package_check", {"check_link_deadline": 0}, id=package["id"], defer=True)
+        assert len(jobs) == 1
+        assert len(jobs[0][1][0]) == 3
+
+    def test_local_checks_skipped_after_deadline(self, monkeypatch: pytest.MonkeyPatch, faker):
+        checked = []
+        monkeypatch.setattr(local.UploadChecker, "check", lambda self, links: checked.extend(links) or [])
+        url = tk.config["ckan.site_url"].rstrip("/") + f"/dataset/x/resource/{faker.uuid4()}/download/a.csv"
+
+        result = call_action("check_link_url_check", {"check_link_deadline": 0}, url=url)
+        assert result[0]["state"] == "pending"
+        assert checked == []
+
+    def test_expired_deadline_skips_requests(self, faker):
+        context = {"check_link_deadline": 0}
+
+        result = call_action("check_link_url_check", context, url=faker.url())
+        assert result[0]["state"] == "pending"
+
+
+class TestDeadlineHelpers:
+    def test_nested_deadline_is_earliest(self):
+        outer = processing.deadline({}, {"deadline": 100})
+        assert outer
+        assert processing.deadline({"check_link_deadline": outer}, {"deadline": 1000}) == outer
+        assert processing.deadline({"check_link_deadline": outer}, {"deadline": 1}) < outer
+
+    def test_remaining(self):
+        assert processing.remaining(None) is None
+        assert processing.remaining(0) == 0
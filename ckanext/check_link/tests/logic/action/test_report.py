@@ -68,6 +68,120 @@ class TestSave:
         assert updated["state"] == "updated"
 
 
+@pytest.mark.usefixtures("with_plugins", "clean_db")
+class TestBulkSave:
+    def test_create_and_update(self, resource, report_factory, faker):
+        existing = report_factory(resource_id=None, state="unknown")
+        url = faker.url()
+
+        result = call_action(
+            "check_link_report_bulk_save",
+            reports=[
+                {"url": existing["url"], "state": "missing", "code": 404},
+                {"url": url, "state": "available", "resource_id": resource["id"]},
+            ],
+        )
+        assert result == {"saved": 2, "deleted": 0}
+
+        updated = call_action("check_link_report_show", url=existing["url"])
+        assert updated["id"] == existing["id"]
+        assert updated["state"] == "missing"
+        assert updated["details"] == {"code": 404}
+
+        attached = call_action("check_link_report_show", resource_id=resource["id"])
+        assert attached["url"] == url
+        assert attached["package_id"] == resource["package_id"]
+
+    def test_update_existing_by_resource_id(self, resource, report_factory, faker):
+        report = report_factory(resource_id=resource["id"], state="unknown")
+
+        call_action(
+            "check_link_report_bulk_save",
+            reports=[{"url": faker.url(), "state": "missing", "resource_id": resource["id"]}],
+        )
+
+        updated = call_action("check_link_report_show", resource_id=resource["id"])
+        assert updated["id"] == report["id"]
+        assert updated["state"] == "missing"
+
+    def test_clear_available(self, resource, report_factory):
+        report_factory(resource_id=resource["id"], state="missing")
+
+        result = call_action(
+            "check_link_report_bulk_save",
+            reports=[{"url": resource["url"], "state": "available", "resource_id": resource["id"]}],
+            clear_available=True,
+        )
+        assert result == {"saved": 0, "deleted": 1}
+
+        with pytest.raises(tk.ObjectNotFound):
+            call_action("check_link_report_show", resource_id=resource["id"])
+
+    def test_state_is_mandatory(self, faker):
+        with pytest.raises(tk.ValidationError):
+            call_action("check_link_report_bulk_save", reports=[{"url": faker.url()}])
+
+    def test_result_shared_by_url(self, resource_factory, report_factory):
+        first = resource_factory()
+        second = resource_factory()
+        report_factory(resource_id=first["id"], url="https://example.com/data.csv", state="missing")
+        other = report_factory(resource_id=second["id"], url="https://EXAMPLE.com:443/data.csv#top", state="missing")
+
+        call_action(
+            "check_link_report_bulk_save",
+            reports=[
+                {
+                    "url": "https://example.com/data.csv",
+                    "state": "available",
+                    "resource_id": first["id"],
+                    "package_id": first["package_id"],
+                    "code": 200,
+                }
+            ],
+        )
+
+        shared = call_action("check_link_report_show", resource_id=second["id"])
+        assert shared["id"] == other["id"]
+        assert shared["url"] == other["url"]
+        assert shared["url_id"] == other["url_id"]
+        assert shared["state"] == "available"
+        assert shared["details"]["code"] == 200
+        assert shared["details"].get("package_id") != first["package_id"]
+
+    def test_shared_details_replaced(self, resource_factory, report_factory):
+        first = resource_factory()
+        second = resource_factory()
+        url = "https://example.com/data.csv"
+        report_factory(resource_id=first["id"], url=url, state="available")
+        report_factory(
+            resource_id=second["id"],
+            url=url,
+            state="available",
+            package_id=second["package_id"],
+            redirect="https://example.com/moved.csv",
+        )
+
+        call_action(
+            "check_link_report_bulk_save",
+            reports=[{"url": url, "state": "available", "resource_id": first["id"], "code": 200}],
+        )
+
+        shared = call_action("check_link_report_show", resource_id=second["id"])
+        assert shared["details"] == {"code": 200, "package_id": second["package_id"]}
+
+    def test_single_free_report_per_url(self, report_factory):
+        existing = report_factory(resource_id=None, url="https://example.com/data.csv", state="unknown")
+
+        call_action(
+            "check_link_report_bulk_save",
+            reports=[{"url": "https://EXAMPLE.com/data.csv#top", "state": "missing"}],
+        )
+
+        result = call_action("check_link_report_search", free_only=True)
+        assert [r["id"] for r in result["results"]] == [existing["id"]]
+        assert result["results"][0]["state"] == "missing"
+
+
 @pytest.mark.usefixtures("with_plugins", "clean_db")
 class TestShow:
     def test_shown_by_id(self, report):
@@ -107,6 +221,39 @@ class TestDelete:
             assert call_action("check_link_report_show", id=report["id"])
 
 
+@pytest.mark.usefixtures("with_plugins", "clean_db")
+class TestBulkDelete:
+    def test_filters(self, report_factory):
+        missing = report_factory(state="missing")
+        available = report_factory(state="available")
+
+        result = call_action("check_link_report_bulk_delete", include_state=["missing"])
+        assert result == {"deleted": 1}
+
+        with pytest.raises(tk.ObjectNotFound):
+            call_action("check_link_report_show", id=missing["id"])
+        assert call_action("check_link_report_show", id=available["id"])
+
+    def test_orphans_only(self, report_factory):
+        orphan = report_factory()
+        report = report_factory()
+        free = report_factory(resource_id=None)
+        call_action("resource_delete", id=orphan["resource_id"])
+
+        result = call_action("check_link_report_bulk_delete", orphans_only=True)
+        assert result == {"deleted": 1}
+
+        assert call_action("check_link_report_show", id=report["id"])
+        assert call_action("check_link_report_show", id=free["id"])
+
+    def test_batches(self, report_factory):
+        report_factory.create_batch(5)
+
+        result = call_action("check_link_report_bulk_delete", batch_size=2)
+        assert result == {"deleted": 5}
+        assert call_action("check_link_report_search")["count"] == 0
+
+
 @pytest.mark.usefixtures("with_plugins", "clean_db")
 class TestSearch:
     def test_limit(self, report_factory):
@@ -119,3 +266,45 @@ class TestSearch:
         result = call_action("check_link_report_search", limit=5, offset=8)
         assert result["count"] == 10
         assert len(result["results"]) == 2
+
+    def test_package_filter(self, report_factory, resource):
+        report_factory.create_batch(3)
+        report = report_factory(resource_id=resource["id"])
+
+        result = call_action("check_link_report_search", package_id=resource["package_id"])
+        assert result["count"] == 1
+        assert result["results"][0]["id"] == report["id"]
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db")
+class TestLatencyStats:
+    def test_by_host(self, report_factory):
+        for total in [0.1, 0.2, 0.3]:
+            report_factory(url=f"https://slow.example.com/{total}", details={"timings": {"total": total}})
+        report_factory(url="http://user@FAST.example.com:8080/x", details={"timings": {"total": 0.01}})
+        report_factory(url="https://unknown.example.com", details={})
+
+        result = call_action("check_link_latency_stats")
+        assert result["group_by"] == "host"
+        assert result["metric"] == "total"
+        assert [(r["key"], r["count"]) for r in result["results"]] == [
+            ("slow.example.com", 3),
+            ("fast.example.com", 1),
+        ]
+        assert result["results"][0]["p50"] == pytest.approx(0.2)
+        assert result["results"][0]["avg"] == pytest.approx(0.2)
+
+    def test_by_organization(self, report_factory, organization, package_factory, resource_factory):
+        package = package_factory(owner_org=organization["id"])
+        resource = resource_factory(package_id=package["id"])
+        report_factory(resource_id=resource["id"], details={"timings": {"ttfb": 0.5}})
+        report_factory(details={"timings": {"ttfb": 0.1}})
+
+        result = call_action("check_link_latency_stats", group_by="organization", metric="ttfb", limit=1)
+        assert result["results"] == [
+            {"key": organization["name"], "count": 1, "avg": 0.5, "p50": 0.5, "p90": 0.5, "p99": 0.5},
+        ]
+
+    def test_unknown_metric(self):
+        with pytest.raises(tk.ValidationError):
+            call_action("check_link_latency_stats", metric="dns")
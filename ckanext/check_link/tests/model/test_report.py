@@ -2,7 +2,8 @@ import pytest
 
 import ckan.model as model
 
-from ckanext.check_link.model import Report
+from ckanext.check_link.model import Report, Url
+from ckanext.check_link.urls import canonical, url_hash
 
 
 @pytest.mark.usefixtures("with_plugins", "clean_db")
@@ -10,7 +11,9 @@ class TestReport:
     def test_removed_with_resource(self, resource, faker):
         res = model.Resource.get(resource["id"])
 
-        report = Report(url=faker.url(), resource_id=resource["id"], state="unknown")
+        url = faker.url()
+        model.Session.add(Url(id=url_hash(url), url=canonical(url), state="unknown"))
+        report = Report(url=url, resource_id=resource["id"], state="unknown")
         model.Session.add(report)
         model.Session.commit()
 
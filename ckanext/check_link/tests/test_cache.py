@@ -0,0 +1,153 @@
+import pytest
+
+import ckan.plugins.toolkit as tk
+from ckan import model
+from ckan.tests.helpers import call_action
+
+from ckanext.check_link import cache, plugin
+from ckanext.check_link.plugin import CONFIG_CASCADE_DELETE
+
+
+@pytest.fixture(autouse=True)
+def _memory(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(cache, "_memory", cache._MemoryBackend())
+
+
+@pytest.fixture()
+def render():
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return {"fragment": "<p>page</p>", "total": len(calls)}
+
+    factory.calls = calls
+    return factory
+
+
+@pytest.mark.ckan_config(cache.CONFIG_BACKEND, cache.BACKEND_MEMORY)
+@pytest.mark.usefixtures("with_request_context")
+class TestGetOrRender:
+    def test_cached(self, render):
+        scope = cache.package_scope("cached")
+        assert cache.get_or_render(scope, {"a": 1}, render) == {"fragment": "<p>page</p>", "total": 1}
+        assert cache.get_or_render(scope, {"a": 1}, render) == {"fragment": "<p>page</p>", "total": 1}
+        assert len(render.calls) == 1
+
+        cache.get_or_render(scope, {"a": 2}, render)
+        assert len(render.calls) == 2
+
+    def test_path_in_key(self, render, test_request_context):
+        with test_request_context("/first"):
+            cache.get_or_render(cache.GLOBAL, {}, render)
+        with test_request_context("/second"):
+            cache.get_or_render(cache.GLOBAL, {}, render)
+        with test_request_context("/first"):
+            cache.get_or_render(cache.GLOBAL, {}, render)
+
+        assert len(render.calls) == 2
+
+    def test_invalidate_scope(self, render):
+        scope = cache.package_scope("invalidated")
+        cache.get_or_render(scope, {}, render)
+        cache.get_or_render(cache.GLOBAL, {}, render)
+
+        cache.invalidate([scope])
+        cache.get_or_render(scope, {}, render)
+        cache.get_or_render(cache.GLOBAL, {}, render)
+        assert len(render.calls) == 3
+
+        cache.invalidate_all()
+        cache.get_or_render(cache.GLOBAL, {}, render)
+        assert len(render.calls) == 4
+
+    @pytest.mark.ckan_config(cache.CONFIG_TTL, 0)
+    def test_disabled(self, render):
+        cache.get_or_render(cache.GLOBAL, {}, render)
+        cache.get_or_render(cache.GLOBAL, {}, render)
+        assert len(render.calls) == 2
+
+
+@pytest.mark.ckan_config(cache.CONFIG_BACKEND, cache.BACKEND_MEMORY)
+@pytest.mark.usefixtures("with_plugins", "clean_db", "with_request_context")
+class TestInvalidation:
+    def test_report_save(self, render, organization, package_factory, resource_factory):
+        package = package_factory(owner_org=organization["id"])
+        resource = resource_factory(package_id=package["id"])
+        scopes = [
+            cache.GLOBAL,
+            cache.package_scope(resource["package_id"]),
+            cache.organization_scope(organization["id"]),
+        ]
+        for scope in scopes:
+            cache.get_or_render(scope, {}, render)
+
+        call_action("check_link_report_save", url="https://example.com", state="broken", resource_id=resource["id"])
+
+        for scope in scopes:
+            cache.get_or_render(scope, {}, render)
+
+        assert len(render.calls) == 6
+
+    def test_unrelated_scope_kept(self, render, resource):
+        scope = cache.package_scope("unrelated")
+        cache.get_or_render(scope, {}, render)
+
+        call_action("check_link_report_save", url="https://example.com", state="broken", resource_id=resource["id"])
+        cache.get_or_render(scope, {}, render)
+
+        assert len(render.calls) == 1
+
+    @pytest.mark.ckan_config(CONFIG_CASCADE_DELETE, "true")
+    def test_cascade_invalidated_after_commit(self, render, resource, report_factory):
+        report_factory(resource_id=resource["id"])
+        scope = cache.package_scope(resource["package_id"])
+        cache.get_or_render(scope, {}, render)
+
+        model.Resource.get(resource["id"]).delete()
+        model.Session.flush()
+        model.repo.commit_and_remove()
+        cache.get_or_render(scope, {}, render)
+
+        assert len(render.calls) == 2
+
+    @pytest.mark.ckan_config(CONFIG_CASCADE_DELETE, "true")
+    def test_cascade_waits_for_commit(self, render, resource, report_factory):
+        report_factory(resource_id=resource["id"])
+        scope = cache.package_scope(resource["package_id"])
+        cache.get_or_render(scope, {}, render)
+
+        model.Resource.get(resource["id"]).delete()
+        model.Session.flush()
+        plugin._remove_package_reports(resource["package_id"], only_deleted=True)
+        cache.get_or_render(scope, {}, render)
+        model.Session.rollback()
+        cache.get_or_render(scope, {}, render)
+
+        assert len(render.calls) == 1
+
+
+@pytest.mark.ckan_config(cache.CONFIG_BACKEND, cache.BACKEND_MEMORY)
+@pytest.mark.usefixtures("with_plugins", "clean_db")
+class TestReportPage:
+    def test_page_updated_after_save(self, app, sysadmin, api_token_factory, resource):
+        headers = {"Authorization": api_token_factory(user=sysadmin["id"])["token"]}
+        url = tk.url_for("check_link.package_report", package_id=resource["package_id"])
+
+        assert "https://broken.example.com" not in app.get(url, headers=headers).body
+
+        call_action(
+            "check_link_report_save", url="https://broken.example.com", state="broken", resource_id=resource["id"]
+        )
+        assert "https://broken.example.com" in app.get(url, headers=headers).body
+
+    def test_page_and_table_cached_separately(self, app, sysadmin, api_token_factory, report_factory):
+        headers = {"Authorization": api_token_factory(user=sysadmin["id"])["token"]}
+        report_factory(state="broken")
+        page = tk.url_for("check_link.report")
+        table = tk.url_for("check_link.report_table")
+
+        assert f'href="{page}?' in app.get(page, headers=headers).body
+        body = app.get(table, headers=headers).body
+        assert f'href="{table}?' in body
+        assert f'href="{page}?' not in body
@@ -0,0 +1,44 @@
+from ckanext.check_link.frontier import DONE, PENDING, Frontier
+
+
+def _rows(n):
+    return [(f"res-{i}", "pkg", f"http://example.com/{i}") for i in range(n)]
+
+
+class TestFrontier:
+    def test_reset(self, tmp_path):
+        work = Frontier(str(tmp_path / "frontier.db"))
+        work.reset(_rows(5), chunk=2)
+        work.reset(_rows(3), chunk=2)
+
+        assert work.stats() == {PENDING: 3}
+        assert list(work.pending(2)) == _rows(3)
+
+    def test_saved_items_are_not_pending(self, tmp_path):
+        work = Frontier(str(tmp_path / "frontier.db"))
+        work.reset(_rows(4))
+        work.mark_saved([{"resource_id": "res-1", "state": "missing"}, {"url": "free", "state": "available"}])
+
+        assert work.stats() == {PENDING: 3, DONE: 1}
+        assert [row[0] for row in work.pending(10)] == ["res-0", "res-2", "res-3"]
+
+    def test_marking_during_iteration(self, tmp_path):
+        work = Frontier(str(tmp_path / "frontier.db"))
+        work.reset(_rows(5))
+
+        seen = []
+        for resource_id, _package_id, _url in work.pending(2):
+            seen.append(resource_id)
+            work.mark_saved([{"resource_id": resource_id, "state": "available"}])
+
+        assert seen == [row[0] for row in _rows(5)]
+        assert work.stats() == {DONE: 5}
+
+    def test_resume(self, tmp_path):
+        path = str(tmp_path / "frontier.db")
+        work = Frontier(path)
+        work.reset(_rows(3))
+        work.mark_saved([{"resource_id": "res-0", "state": "available"}])
+        work.close()
+
+        assert [row[0] for row in Frontier(path).pending(10)] == ["res-1", "res-2"]
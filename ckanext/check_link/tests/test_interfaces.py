@@ -0,0 +1,88 @@
+from typing import Any
+
+import pytest
+
+import ckan.plugins as p
+from ckan.tests.helpers import call_action
+
+from ckanext.check_link.interfaces import ICheckLink
+
+
+class Hooks:
+    def __init__(self):
+        self.calls: list[tuple[str, list[Any]]] = []
+
+    def before_check(self, urls: list[str]):
+        self.calls.append(("before_check", list(urls)))
+
+    def after_check(self, reports: list[dict[str, Any]]):
+        self.calls.append(("after_check", reports))
+
+    def after_save(self, reports: list[dict[str, Any]]):
+        self.calls.append(("after_save", reports))
+
+
+@pytest.fixture()
+def hooks(monkeypatch: pytest.MonkeyPatch):
+    instance = Hooks()
+    implementations = p.PluginImplementations
+
+    monkeypatch.setattr(
+        p,
+        "PluginImplementations",
+        lambda interface: [instance] if interface is ICheckLink else implementations(interface),
+    )
+    return instance
+
+
+@pytest.fixture()
+def rmock(httpx_mock):
+    return httpx_mock
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db")
+class TestICheckLink:
+    def test_url_check(self, hooks, faker, rmock):
+        urls = [faker.url(), faker.url()]
+        for url in urls:
+            rmock.add_response(url=url, status_code=200, method="HEAD")
+
+        call_action("check_link_url_check", url=urls, save=True)
+
+        assert [name for name, _ in hooks.calls] == ["before_check", "after_check", "after_save"]
+        assert hooks.calls[0][1] == urls
+        assert [r["url"] for r in hooks.calls[1][1]] == urls
+        assert {r["url"] for r in hooks.calls[2][1]} == set(urls)
+
+    def test_package_check_called_once_per_batch(self, hooks, package, resource_factory, rmock):
+        resources = resource_factory.create_batch(3, package_id=package["id"])
+        for resource in resources:
+            rmock.add_response(url=resource["url"], status_code=200, method="HEAD")
+
+        call_action("check_link_package_check", id=package["id"], save=True)
+
+        assert [name for name, _ in hooks.calls] == ["before_check", "after_check", "after_save"]
+        checked = hooks.calls[1][1]
+        assert {r["resource_id"] for r in checked} == {r["id"] for r in resources}
+        assert all(r["package_id"] == package["id"] for r in checked)
+
+    def test_urls_modified_by_hook(self, hooks, monkeypatch, package, resource_factory, rmock):
+        resources = resource_factory.create_batch(3, package_id=package["id"])
+        for resource in resources:
+            rmock.add_response(url=resource["url"] + "?mirror", status_code=200, method="HEAD")
+
+        def before_check(urls: list[str]):
+            urls[:] = [url + "?mirror" for url in urls]
+
+        monkeypatch.setattr(hooks, "before_check", before_check)
+        reports = call_action("check_link_package_check", id=package["id"])
+
+        assert {(r["resource_id"], r["url"]) for r in reports} == {(r["id"], r["url"] + "?mirror") for r in resources}
+
+    def test_resource_check(self, hooks, resource, rmock):
+        rmock.add_response(url=resource["url"], status_code=200, method="HEAD")
+
+        call_action("check_link_resource_check", id=resource["id"])
+
+        assert [name for name, _ in hooks.calls] == ["before_check", "after_check"]
+        assert hooks.calls[1][1][0]["resource_id"] == resource["id"]
@@ -0,0 +1,110 @@
+import os
+from urllib.parse import SplitResult
+
+import pytest
+from check_link import Link
+
+import ckan.plugins.toolkit as tk
+from ckan.lib import uploader
+from ckan.tests.helpers import call_action
+
+from ckanext.check_link import local
+
+
+class ExampleChecker(local.UrlChecker):
+    def match(self, url: SplitResult) -> bool:
+        return url.hostname == "example.org"
+
+    def check(self, links: list[Link]) -> list[Link]:
+        undecided = []
+        for link in links:
+            if link.link.endswith("/unknown"):
+                undecided.append(link)
+            else:
+                link.state_from_code(200, "OK", {})
+        return undecided
+
+
+class TestCheckLocal:
+    def test_undecided_links_remain(self):
+        links = [Link("https://example.org/a"), Link("https://example.org/unknown"), Link("https://example.com/b")]
+
+        remaining = local.check_local(links, [ExampleChecker()])
+
+        assert [link.link for link in remaining] == ["https://example.org/unknown", "https://example.com/b"]
+        assert links[0].state.name == "available"
+
+    def test_no_checkers(self):
+        links = [Link("https://example.org/a")]
+        assert local.check_local(links, []) == links
+
+
+@pytest.mark.usefixtures("with_request_context")
+class TestGetCheckers:
+    def test_site_checker_disabled_by_default(self):
+        assert not any(isinstance(checker, local.SiteChecker) for checker in local.get_checkers())
+
+    @pytest.mark.ckan_config(local.CONFIG_LOCAL_SITE, "true")
+    def test_site_checker_enabled(self):
+        assert any(isinstance(checker, local.SiteChecker) for checker in local.get_checkers())
+
+
+@pytest.fixture()
+def storage(monkeypatch: pytest.MonkeyPatch, tmp_path):
+    monkeypatch.setattr(uploader, "_storage_path", str(tmp_path))
+    return tmp_path
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db")
+class TestUploadChecker:
+    def test_uploaded_file(self, storage, resource_factory):
+        resource = resource_factory(url="data.csv", url_type="upload")
+
+        report = call_action("check_link_resource_check", id=resource["id"])
+        assert report["state"] == "missing"
+
+        path = uploader.get_resource_uploader(dict(resource)).get_path(resource["id"])
+        os.makedirs(os.path.dirname(path))
+        with open(path, "w") as dest:
+            dest.write("a,b")
+
+        report = call_action("check_link_resource_check", id=resource["id"])
+        assert report["state"] == "available"
+
+    def test_deleted_resource(self, storage, resource_factory):
+        resource = resource_factory(url="data.csv", url_type="upload")
+        url = call_action("resource_show", id=resource["id"])["url"]
+        call_action("resource_delete", id=resource["id"])
+
+        result = call_action("check_link_url_check", url=url)
+        assert result[0]["state"] == "missing"
+
+    def test_unknown_resource_checked_remotely(self, storage, faker, httpx_mock):
+        url = tk.config["ckan.site_url"].rstrip("/") + f"/dataset/x/resource/{faker.uuid4()}/download/data.csv"
+        httpx_mock.add_response(url=url, status_code=200, method="HEAD")
+
+        result = call_action("check_link_url_check", url=url)
+        assert result[0]["state"] == "available"
+
+    def test_package_check_uses_download_url(self, storage, package, resource_factory):
+        resource = resource_factory(package_id=package["id"], url="data.csv", url_type="upload")
+
+        result = call_action("check_link_package_check", id=package["id"])
+        assert result[0]["url"] == call_action("resource_show", id=resource["id"])["url"]
+        assert result[0]["state"] == "missing"
+
+
+@pytest.mark.ckan_config(local.CONFIG_LOCAL_SITE, "true")
+@pytest.mark.usefixtures("with_plugins", "clean_db", "with_request_context")
+class TestSiteChecker:
+    def test_page_checked_in_process(self, package):
+        url = tk.config["ckan.site_url"].rstrip("/") + "/dataset/" + package["name"]
+
+        result = call_action("check_link_url_check", url=url)
+        assert result[0]["state"] == "available"
+
+    def test_missing_page(self):
+        url = tk.config["ckan.site_url"].rstrip("/") + "/dataset/not-a-real-dataset"
+
+        result = call_action("check_link_url_check", url=url)
+        assert result[0]["state"] == "missing"
@@ -0,0 +1,82 @@
+import pytest
+
+import ckan.plugins.toolkit as tk
+from ckan.tests.helpers import call_action
+
+from ckanext.check_link import metrics
+
+
+@pytest.fixture()
+def registry():
+    metrics.registry.reset()
+    yield metrics.registry
+    metrics.registry.reset()
+
+
+class TestRegistry:
+    def test_render(self):
+        registry = metrics.Registry()
+        counter = registry.counter("test_total", "Test counter", ["state"])
+        gauge = registry.gauge("test_gauge", "Test gauge")
+
+        counter.inc(state="ok")
+        counter.inc(2, state='say "hi"')
+        gauge.set(5)
+        gauge.dec()
+
+        assert registry.render().splitlines() == [
+            "# HELP test_total Test counter",
+            "# TYPE test_total counter",
+            'test_total{state="ok"} 1',
+            'test_total{state="say \\"hi\\""} 2',
+            "# HELP test_gauge Test gauge",
+            "# TYPE test_gauge gauge",
+            "test_gauge 4",
+        ]
+
+    def test_write(self, tmp_path):
+        path = tmp_path / "check-link.prom"
+        metrics.write(str(path))
+        assert path.read_text() == metrics.render()
+
+
+def test_record_reports(registry):
+    metrics.record_reports(
+        [
+            {"url": "http://a.com/1", "state": "available"},
+            {"url": "http://a.com/2", "state": "missing"},
+            {"url": "http://b.com/1", "state": "missing"},
+        ]
+    )
+
+    assert metrics.checks.get(state="available") == 1
+    assert metrics.checks.get(state="missing") == 2
+    assert metrics.host_errors.get(host="a.com", state="missing") == 1
+    assert metrics.host_errors.get(host="a.com", state="available") == 0
+    assert metrics.last_progress.get() > 0
+
+
+@pytest.mark.usefixtures("with_plugins")
+def test_url_check_recorded(registry, httpx_mock, faker):
+    url = faker.url()
+    httpx_mock.add_response(url=url, status_code=404, method="HEAD")
+
+    call_action("check_link_url_check", url=[url])
+
+    assert metrics.checks.get(state="missing") == 1
+    assert metrics.in_flight.get() == 0
+    assert metrics.phase_batches.get(phase="network") == 1
+
+
+@pytest.mark.usefixtures("with_plugins")
+class TestEndpoint:
+    def test_disabled_by_default(self, app):
+        app.get(tk.url_for("check_link.metrics_endpoint"), status=404)
+
+    @pytest.mark.ckan_config(metrics.CONFIG_ENABLED, "true")
+    def test_enabled(self, app, registry):
+        metrics.checks.inc(state="available")
+
+        resp = app.get(tk.url_for("check_link.metrics_endpoint"))
+        assert resp.headers["Content-Type"].startswith("text/plain")
+        assert 'check_link_checks_total{state="available"} 1' in resp.get_data(as_text=True)
@@ -33,3 +33,40 @@ class TestCascadeReportRemoval:
         call_action("package_patch", id=resource["package_id"], resources=[])
 
         assert not Report.by_resource_id(report["resource_id"])
+
+    @pytest.mark.ckan_config(
+        "ckanext.check_link.remove_reports_when_resource_deleted", "true"
+    )
+    def test_kept_with_deleted_package(self, package, resource_factory, report_factory):
+        report = report_factory(resource_id=resource_factory(package_id=package["id"])["id"])
+
+        call_action("package_delete", id=package["id"])
+
+        assert Report.by_resource_id(report["resource_id"])
+
+    @pytest.mark.ckan_config(
+        "ckanext.check_link.remove_reports_when_package_deleted", "true"
+    )
+    def test_removed_with_package(self, package, resource_factory, report_factory):
+        reports = [
+            report_factory(resource_id=resource_factory(package_id=package["id"])["id"])
+            for _ in range(3)
+        ]
+        other = report_factory()
+
+        call_action("package_delete", id=package["id"])
+
+        assert not any(Report.by_resource_id(r["resource_id"]) for r in reports)
+        assert Report.by_resource_id(other["resource_id"])
+
+    @pytest.mark.ckan_config(
+        "ckanext.check_link.remove_reports_when_resource_deleted", "true"
+    )
+    def test_only_deleted_resources_cleared(self, package, resource_factory, report_factory):
+        kept = report_factory(resource_id=resource_factory(package_id=package["id"])["id"])
+        removed = report_factory(resource_id=resource_factory(package_id=package["id"])["id"])
+
+        call_action("resource_delete", id=removed["resource_id"])
+
+        assert Report.by_resource_id(kept["resource_id"])
+        assert not Report.by_resource_id(removed["resource_id"])
@@ -0,0 +1,126 @@
+import pytest
+
+import ckan.plugins.toolkit as tk
+from ckan.tests.helpers import call_action
+
+from ckanext.check_link import processing
+
+
+@pytest.fixture()
+def options():
+    return {"save": True, "clear_available": False, "skip_invalid": True, "link_patch": {}}
+
+
+class TestBatches:
+    def test_split(self):
+        assert list(processing.batches(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+    def test_empty(self):
+        assert list(processing.batches([], 2)) == []
+
+
+class TestHostPartition:
+    def test_same_host_same_worker(self):
+        assert processing.host_partition("http://a.com/x", 16) == processing.host_partition("https://A.com:8080/y", 16)
+
+    def test_range(self, faker):
+        assert {processing.host_partition(faker.url(), 3) for _ in range(50)} <= {0, 1, 2}
+
+    def test_invalid_url(self):
+        assert processing.host_partition("http://[invalid/", 4) == processing.host_partition("", 4)
+
+
+class TestPrefetch:
+    def test_order_preserved(self):
+        assert list(processing.prefetch(iter(range(10)), 3)) == list(range(10))
+
+    def test_errors_propagated(self):
+        def source():
+            yield 1
+            raise ZeroDivisionError
+
+        result = processing.prefetch(source())
+        assert next(result) == 1
+        with pytest.raises(ZeroDivisionError):
+            next(result)
+
+    def test_consumer_can_stop_early(self):
+        result = processing.prefetch(iter(range(1000)))
+        assert next(result) == 0
+        result.close()
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db")
+class TestCheckBatch:
+    def test_invalid_urls_skipped(self, httpx_mock, faker, options):
+        url = faker.url()
+        httpx_mock.add_response(url=url, status_code=200, method="HEAD")
+
+        reports = processing.check_batch({}, [("first", "pkg", "not a url"), ("second", "pkg", url)], options)
+
+        assert [r["resource_id"] for r in reports] == ["second"]
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db")
+class TestPipeline:
+    def test_reports_saved(self, resource_factory, httpx_mock, options):
+        resources = resource_factory.create_batch(3)
+        for res in resources:
+            httpx_mock.add_response(url=res["url"], status_code=404, method="HEAD")
+
+        checked = []
+        saved = []
+        processing.Pipeline(
+            {"ignore_auth": True},
+            options,
+            on_checked=lambda rows, reports: checked.extend(reports),
+            on_saved=saved.extend,
+        ).run([[(r["id"], r["package_id"], r["url"])] for r in resources])
+
+        assert len(checked) == 3
+        assert len(saved) == 3
+        for res in resources:
+            assert call_action("check_link_report_show", resource_id=res["id"])["state"] == "missing"
+
+    def test_writer_errors_propagated(self, resource, httpx_mock, options):
+        httpx_mock.add_response(url=resource["url"], status_code=200, method="HEAD")
+
+        def on_saved(reports):
+            raise ZeroDivisionError
+
+        pipeline = processing.Pipeline({"ignore_auth": True}, options, on_saved=on_saved)
+        with pytest.raises(ZeroDivisionError):
+            pipeline.run([[(resource["id"], resource["package_id"], resource["url"])]])
+
+    def test_source_closed_on_error(self, resource, httpx_mock, options):
+        httpx_mock.add_response(url=resource["url"], status_code=200, method="HEAD")
+        closed = []
+
+        def source():
+            try:
+                while True:
+                    yield [(resource["id"], resource["package_id"], resource["url"])]
+            finally:
+                closed.append(True)
+
+        def on_checked(rows, reports):
+            raise ZeroDivisionError
+
+        pipeline = processing.Pipeline({"ignore_auth": True}, dict(options, save=False), on_checked=on_checked)
+        with pytest.raises(ZeroDivisionError):
+            pipeline.run(source())
+
+        assert closed == [True]
+
+    def test_unknown_resources_skipped(self, faker, httpx_mock, options):
+        url = faker.url()
+        httpx_mock.add_response(url=url, status_code=200, method="HEAD")
+
+        saved = []
+        processing.Pipeline({"ignore_auth": True}, options, on_saved=saved.extend).run(
+            [[(faker.uuid4(), faker.uuid4(), url)]],
+        )
+
+        assert len(saved) == 1
+        with pytest.raises(tk.ObjectNotFound):
+            call_action("check_link_report_show", url=url)
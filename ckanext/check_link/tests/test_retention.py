@@ -0,0 +1,88 @@
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import sqlalchemy as sa
+
+from ckan import model
+from ckan.tests.helpers import call_action
+
+from ckanext.check_link import retention
+from ckanext.check_link.model import Report
+
+
+@pytest.fixture()
+def age():
+    def setter(report: dict, days: int):
+        model.Session.execute(
+            sa.update(Report)
+            .where(Report.id == report["id"])
+            .values(created_at=datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=days))
+        )
+        model.Session.commit()
+
+    return setter
+
+
+def _ids():
+    return set(model.Session.scalars(sa.select(Report.id)))
+
+
+class TestPolicy:
+    def test_parse(self):
+        assert retention.parse_max_age(["broken=30", "*=365"]) == {"broken": 30, "*": 365}
+
+    def test_invalid(self):
+        with pytest.raises(ValueError, match="state=days"):
+            retention.parse_max_age(["broken"])
+
+    def test_empty(self):
+        assert not retention.Policy()
+        assert retention.Policy(orphans=True)
+
+    @pytest.mark.ckan_config(retention.CONFIG_MAX_AGE, "available=7")
+    @pytest.mark.ckan_config(retention.CONFIG_FREE_MAX_AGE, "30")
+    def test_config(self):
+        assert retention.get_policy() == retention.Policy({"available": 7}, 30, False)
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db")
+class TestEnforce:
+    def test_max_age(self, report_factory, age):
+        old_available = report_factory(state="available")
+        old_broken = report_factory(state="broken")
+        very_old_broken = report_factory(state="broken")
+        fresh = report_factory(state="available")
+        age(old_available, 10)
+        age(old_broken, 10)
+        age(very_old_broken, 100)
+
+        policy = retention.Policy({"available": 7, "*": 30})
+        assert retention.enforce(policy, dry_run=True) == 2
+        assert retention.enforce(policy, batch_size=1) == 2
+        assert _ids() == {old_broken["id"], fresh["id"]}
+
+    def test_free_and_orphans(self, report_factory, resource, age):
+        free = report_factory(state="broken", resource_id=None)
+        report_factory(state="broken", resource_id=resource["id"])
+        kept = report_factory(state="broken")
+        age(free, 10)
+        call_action("resource_delete", id=resource["id"])
+
+        assert retention.enforce(retention.Policy(free_max_age=7, orphans=True)) == 2
+        assert _ids() == {kept["id"]}
+
+    def test_archive(self, report_factory, age, tmp_path):
+        report = report_factory(state="broken")
+        age(report, 10)
+        archive = tmp_path / "archive.ndjson.gz"
+
+        assert retention.enforce(retention.Policy({"broken": 7}), archive=str(archive)) == 1
+
+        with gzip.open(archive, "rt") as src:
+            assert [json.loads(line)["id"] for line in src] == [report["id"]]
+
+    def test_empty_policy(self, report_factory):
+        report_factory()
+        assert retention.enforce(retention.Policy()) == 0
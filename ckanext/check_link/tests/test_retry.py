@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import ANY
+
+import pytest
+
+from ckan import model
+from ckan.tests.helpers import call_action
+
+from ckanext.check_link import processing, retry
+
+
+@pytest.fixture()
+def options():
+    return {"clear_available": False, "skip_invalid": True, "link_patch": {}}
+
+
+class TestPolicy:
+    @pytest.mark.parametrize(
+        ("report", "expected"),
+        [
+            ({"state": "timeout", "code": None}, True),
+            ({"state": "invalid", "code": 503}, True),
+            ({"state": "invalid", "code": 429}, True),
+            ({"state": "invalid", "code": 500}, False),
+            ({"state": "missing", "code": 404}, False),
+        ],
+    )
+    def test_transient(self, report, expected):
+        assert retry.is_transient(report) is expected
+
+    def test_retry_after(self):
+        now = datetime(2024, 1, 1, 12, tzinfo=timezone.utc).replace(tzinfo=None)
+        assert retry.parse_retry_after("120", now) == 120
+        assert retry.parse_retry_after("Mon, 01 Jan 2024 12:01:00 GMT", now) == 60
+        assert retry.parse_retry_after("Mon, 01 Jan 2024 11:00:00 GMT", now) == 0
+        assert retry.parse_retry_after("soon", now) is None
+        assert retry.parse_retry_after(None, now) is None
+
+    @pytest.mark.ckan_config(retry.CONFIG_BASE_DELAY, "10")
+    @pytest.mark.ckan_config(retry.CONFIG_MAX_DELAY, "50")
+    def test_backoff(self):
+        assert 5 <= retry.backoff(1) <= 10
+        assert 20 <= retry.backoff(3) <= 40
+        assert 25 <= retry.backoff(10) <= 50
+        assert retry.backoff(1, 30) == 30
+        assert retry.backoff(1, 3600) == 50
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db")
+class TestQueue:
+    def test_transient_failure_queued(self, resource, httpx_mock, options):
+        httpx_mock.add_response(url=resource["url"], status_code=503, method="HEAD", headers={"retry-after": "120"})
+
+        reports = processing.check_resources(
+            {}, [(resource["id"], resource["package_id"], resource["url"])], dict(options, save=True)
+        )
+        assert reports[0]["state"] == retry.STATE_RETRY
+        assert reports[0]["retry"] == {"attempt": 1, "state": "invalid", "delay": 120, "next_at": ANY}
+
+        report = call_action("check_link_report_show", resource_id=resource["id"])
+        assert report["state"] == retry.STATE_RETRY
+        assert report["details"]["retry"]["attempt"] == 1
+
+    def test_not_queued_without_save(self, resource, httpx_mock, options):
+        httpx_mock.add_response(url=resource["url"], status_code=503, method="HEAD")
+
+        reports = processing.check_batch(
+            {}, [(resource["id"], resource["package_id"], resource["url"])], dict(options, save=False)
+        )
+        assert reports[0]["state"] == "invalid"
+
+    @pytest.mark.ckan_config(retry.CONFIG_BASE_DELAY, "0")
+    def test_drained(self, resource, httpx_mock, options):
+        httpx_mock.add_response(url=resource["url"], status_code=502, method="HEAD")
+        httpx_mock.add_response(url=resource["url"], status_code=200, method="HEAD")
+        processing.check_resources(
+            {}, [(resource["id"], resource["package_id"], resource["url"])], dict(options, save=True)
+        )
+
+        assert processing.check_retries({}, options) == 1
+        assert call_action("check_link_report_show", resource_id=resource["id"])["state"] == "available"
+        assert retry.next_due() is None
+
+    @pytest.mark.ckan_config(retry.CONFIG_BASE_DELAY, "0")
+    @pytest.mark.ckan_config(retry.CONFIG_MAX_ATTEMPTS, "2")
+    def test_attempts_exhausted(self, resource, httpx_mock, options):
+        for _ in range(3):
+            httpx_mock.add_response(url=resource["url"], status_code=503, method="HEAD")
+        processing.check_resources(
+            {}, [(resource["id"], resource["package_id"], resource["url"])], dict(options, save=True)
+        )
+
+        assert processing.check_retries({}, options, wait=True) == 2
+
+        report = call_action("check_link_report_show", resource_id=resource["id"])
+        assert report["state"] == "invalid"
+        assert "retry" not in report["details"]
+
+    @pytest.mark.ckan_config(retry.CONFIG_MAX_ATTEMPTS, "0")
+    def test_disabled(self, resource, httpx_mock, options):
+        httpx_mock.add_response(url=resource["url"], status_code=503, method="HEAD")
+
+        reports = processing.check_resources(
+            {}, [(resource["id"], resource["package_id"], resource["url"])], dict(options, save=True)
+        )
+        assert reports[0]["state"] == "invalid"
+
+    def test_retry_not_shared(self, resource_factory, report_factory, httpx_mock, options):
+        url = "https://example.com/data.csv"
+        first = resource_factory(url=url)
+        second = resource_factory(url=url)
+        report_factory(resource_id=second["id"], url=url, state="available")
+        httpx_mock.add_response(url=url, status_code=503, method="HEAD")
+
+        processing.check_resources({}, [(first["id"], first["package_id"], url)], dict(options, save=True))
+
+        assert call_action("check_link_report_show", resource_id=first["id"])["state"] == retry.STATE_RETRY
+        sibling = call_action("check_link_report_show", resource_id=second["id"])
+        assert sibling["state"] == "available"
+        assert "retry" not in sibling["details"]
+
+    def test_url_due_once(self, resource_factory, httpx_mock, options):
+        url = "https://example.com/data.csv"
+        resources = [resource_factory(url=url) for _ in range(2)]
+        httpx_mock.add_response(url=url, status_code=503, method="HEAD")
+
+        processing.check_resources({}, [(r["id"], r["package_id"], url) for r in resources], dict(options, save=True))
+
+        later = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(days=1)
+        assert len(model.Session.execute(retry.due(later)).all()) == 1
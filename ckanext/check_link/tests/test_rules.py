@@ -0,0 +1,86 @@
+import pytest
+
+import ckan.plugins.toolkit as tk
+from ckan.tests.helpers import call_action
+
+from ckanext.check_link import rules
+
+
+@pytest.fixture()
+def compiled():
+    return rules.Rules(
+        [
+            (rules.SKIP, "intranet.local", True),
+            (rules.SKIP, "re:https?://[^/]+/private/", True),
+            (rules.INTERNAL, "10.0.0.0/8", True),
+            (rules.INTERNAL, "corp.example.com", True),
+            (rules.AVAILABLE, "example.com", True),
+            (rules.TIMEOUT, "slow.org", 60),
+            (rules.TIMEOUT, r"re:.*\.zip$", 120),
+        ]
+    )
+
+
+class TestRules:
+    @pytest.mark.parametrize(
+        ("url", "action", "timeout"),
+        [
+            ("http://intranet.local/x", rules.SKIP, None),
+            ("http://a.b.intranet.local/x", rules.SKIP, None),
+            ("https://data.org/private/1", rules.SKIP, None),
+            ("http://10.1.2.3/", rules.INTERNAL, None),
+            ("http://11.1.2.3/", None, None),
+            ("http://corp.example.com/a", rules.INTERNAL, None),
+            ("http://www.example.com", rules.AVAILABLE, None),
+            ("http://notexample.com", None, None),
+            ("http://deep.slow.org/a", None, 60),
+            ("http://data.org/f.zip", None, 120),
+            ("http://data.org/", None, None),
+            ("not a url", None, None),
+        ],
+    )
+    def test_match(self, compiled, url, action, timeout):
+        assert compiled.match(url) == rules.Match(action, timeout)
+
+    def test_regex_priority(self):
+        compiled = rules.Rules(
+            [
+                (rules.AVAILABLE, "re:https://data.org/", True),
+                (rules.TIMEOUT, "re:https://data.org/", 30),
+                (rules.SKIP, "re:https://data.org/tmp/", True),
+            ]
+        )
+        assert compiled.match("https://data.org/tmp/x") == rules.Match(rules.SKIP, 30)
+        assert compiled.match("https://data.org/x") == rules.Match(rules.AVAILABLE, 30)
+
+    def test_empty(self):
+        assert not rules.Rules([])
+
+    def test_invalid_timeout(self):
+        with pytest.raises(ValueError, match="pattern=seconds"):
+            rules._compile((), (), (), ("slow.org",))
+
+
+@pytest.mark.usefixtures("with_plugins")
+class TestUrlCheck:
+    @pytest.mark.ckan_config(rules.CONFIG_SKIP, "skipped.org")
+    @pytest.mark.ckan_config(rules.CONFIG_INTERNAL, "intranet.local")
+    @pytest.mark.ckan_config(rules.CONFIG_AVAILABLE, "always.org")
+    def test_rules_applied_without_requests(self):
+        result = call_action(
+            "check_link_url_check",
+            url=["http://skipped.org", "http://intranet.local/x", "http://always.org/y"],
+        )
+
+        assert [(r["url"], r["state"]) for r in result] == [
+            ("http://intranet.local/x", "unknown"),
+            ("http://always.org/y", "available"),
+        ]
+
+    @pytest.mark.usefixtures("clean_db")
+    @pytest.mark.ckan_config(rules.CONFIG_SKIP, "skipped.org")
+    def test_skipped_resource(self, resource_factory):
+        resource = resource_factory(url="http://skipped.org/file.csv")
+
+        with pytest.raises(tk.ValidationError):
+            call_action("check_link_resource_check", id=resource["id"])
@@ -0,0 +1,104 @@
+import csv
+import io
+import json
+
+import pytest
+
+import ckan.plugins.toolkit as tk
+
+
+@pytest.fixture()
+def sysadmin_headers(sysadmin, api_token_factory):
+    token = api_token_factory(user=sysadmin["id"])
+    return {"Authorization": token["token"]}
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db")
+class TestExport:
+    def test_global_export(self, app, sysadmin_headers, report_factory):
+        broken = report_factory(state="broken")
+        report_factory(state="available")
+
+        resp = app.get(tk.url_for("check_link.report_export"), headers=sysadmin_headers)
+        assert resp.headers["Content-Type"].startswith("text/csv")
+
+        rows = list(csv.reader(io.StringIO(resp.get_data(as_text=True))))
+        assert len(rows) == 2
+        assert rows[1][3] == "broken"
+        assert rows[1][5].endswith(f"/resource/{broken['resource_id']}")
+
+    def test_package_export(self, app, sysadmin_headers, report_factory, resource):
+        report_factory(state="broken", resource_id=resource["id"])
+        report_factory(state="broken")
+
+        resp = app.get(
+            tk.url_for("check_link.package_report_export", package_id=resource["package_id"]),
+            headers=sysadmin_headers,
+        )
+
+        rows = list(csv.reader(io.StringIO(resp.get_data(as_text=True))))
+        assert len(rows) == 2
+
+    def test_anonymous_not_allowed(self, app):
+        app.get(tk.url_for("check_link.report_export"), status=403)
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db")
+class TestAnalyticsExport:
+    def test_ndjson(self, app, sysadmin_headers, report_factory):
+        report = report_factory(state="broken")
+        report_factory(state="available")
+
+        resp = app.get(
+            tk.url_for("check_link.export_reports", include_state="broken"),
+            headers=sysadmin_headers,
+        )
+
+        lines = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+        assert [line["id"] for line in lines] == [report["id"]]
+        assert lines[0]["package_id"]
+
+    def test_since(self, app, sysadmin_headers, report_factory):
+        report_factory()
+
+        resp = app.get(
+            tk.url_for("check_link.export_reports", since="2100-01-01"),
+            headers=sysadmin_headers,
+        )
+        assert not resp.get_data(as_text=True)
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db")
+class TestReportTable:
+    @pytest.mark.ckan_config("ckanext.check_link.report.deferred", "true")
+    def test_page_deferred(self, app, sysadmin_headers, report_factory):
+        report = report_factory(state="broken")
+
+        body = app.get(tk.url_for("check_link.report"), headers=sysadmin_headers).body
+        assert 'data-module="check-link-report"' in body
+        assert report["url"] not in body
+        assert "<noscript>" in body
+
+        body = app.get(tk.url_for("check_link.report_table"), headers=sysadmin_headers).body
+        assert report["url"] in body
+        assert "<html" not in body
+
+    def test_page_rendered(self, app, sysadmin_headers, report_factory):
+        report = report_factory(state="broken")
+
+        body = app.get(tk.url_for("check_link.report"), headers=sysadmin_headers).body
+        assert report["url"] in body
+
+    def test_package_table(self, app, sysadmin_headers, report_factory, resource):
+        report = report_factory(state="broken", resource_id=resource["id"])
+        other = report_factory(state="broken")
+
+        body = app.get(
+            tk.url_for("check_link.package_report_table", package_id=resource["package_id"]),
+            headers=sysadmin_headers,
+        ).body
+        assert report["url"] in body
+        assert other["url"] not in body
+
+    def test_anonymous_not_allowed(self, app):
+        app.get(tk.url_for("check_link.report_table"), status=403)
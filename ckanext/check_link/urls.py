@@ -0,0 +1,71 @@
+"""Canonical form of checked URLs.
+
+Different spellings of the same address, like `HTTP://Example.com:80/a#top`
+and `http://example.com/a`, are reduced to a single canonical URL: scheme and
+host are lower-cased, the default port and the fragment are removed and an
+empty path becomes `/`. Path and query are kept as is, because servers may
+treat them as case-sensitive.
+
+Canonical URLs are identified by a fixed-width hash, which is used as the key
+of the URL table and as a reference from reports.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from urllib.parse import urlsplit, urlunsplit
+
+_DEFAULT_PORTS = {"http": 80, "https": 443, "ftp": 21}
+
+# number of hex digits of the SHA-256 digest used as the identifier
+HASH_LENGTH = 32
+
+__all__ = ["HASH_LENGTH", "canonical", "url_hash"]
+
+
+def canonical(url: str) -> str:
+    """Reduce the URL to its canonical form.
+
+    Args:
+        url: URL of the link
+
+    Returns:
+        Canonical URL. Unparsable URLs are returned without the fragment
+    """
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        host = parts.hostname
+        port = parts.port
+    except ValueError:
+        return url.partition("#")[0]
+
+    if not host:
+        return url.partition("#")[0]
+
+    scheme = parts.scheme.lower()
+    netloc = host
+    if ":" in host:
+        # IPv6 literal
+        netloc = f"[{host}]"
+
+    if port is not None and _DEFAULT_PORTS.get(scheme) != port:
+        netloc = f"{netloc}:{port}"
+
+    userinfo, sep, _hostport = parts.netloc.rpartition("@")
+    if sep:
+        netloc = f"{userinfo}@{netloc}"
+
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+
+
+def url_hash(url: str) -> str:
+    """Compute the identifier of the URL.
+
+    Args:
+        url: URL of the link, not necessarily canonical
+
+    Returns:
+        Hex digest of the canonical URL with `HASH_LENGTH` characters
+    """
+    return hashlib.sha256(canonical(url).encode()).hexdigest()[:HASH_LENGTH]
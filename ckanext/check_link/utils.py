@@ -0,0 +1,162 @@
+"""Shared SQL helpers for the ckanext-check-link extension.
+
+This module contains statement builders that are reused by actions, views and
+CLI commands. Keeping them in one place guarantees that every consumer of the
+reports (search API, exports, cleanup tools) applies identical filters.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+import sqlalchemy as sa
+from sqlalchemy.engine import Row
+
+from ckan import model
+
+from .model import Report
+
+
+def as_list(value: Any) -> list[Any]:
+    """Normalize a scalar or a sequence into a list.
+
+    Query-string parameters arrive either as a single value or as a list,
+    depending on the number of occurrences of the parameter.
+
+    Args:
+        value: Scalar value or iterable of values
+
+    Returns:
+        List of values
+    """
+    if isinstance(value, list | tuple | set):
+        return list(value)
+
+    return [value]
+
+
+def report_filters(stmt: Any, params: dict[str, Any]) -> Any:
+    """Apply report filters to the statement.
+
+    Filters are expressed through subqueries, so the statement does not need
+    to join resources or packages itself and can be a `DELETE` as well.
+
+    Args:
+        stmt: Select statement that includes the report table
+        params: Dictionary that may contain:
+            - free_only: Only reports not attached to resources
+            - attached_only: Only reports attached to resources
+            - exclude_state: States to exclude
+            - include_state: States to include
+            - package_id: Only reports of the package's resources
+            - organization_id: Only reports of the organization's resources
+            - since: Only reports checked at or after the given datetime
+            - orphans_only: Only reports of deleted or missing resources
+
+    Returns:
+        Filtered statement
+    """
+    if params.get("free_only"):
+        stmt = stmt.where(Report.resource_id.is_(None))
+
+    if params.get("attached_only"):
+        stmt = stmt.where(Report.resource_id.isnot(None))
+
+    if params.get("exclude_state"):
+        stmt = stmt.where(Report.state.notin_(as_list(params["exclude_state"])))
+
+    if params.get("include_state"):
+        stmt = stmt.where(Report.state.in_(as_list(params["include_state"])))
+
+    if package_id := params.get("package_id"):
+        stmt = stmt.where(
+            Report.resource_id.in_(sa.select(model.Resource.id).where(model.Resource.package_id == package_id))
+        )
+
+    if organization_id := params.get("organization_id"):
+        stmt = stmt.where(
+            Report.resource_id.in_(
+                sa.select(model.Resource.id)
+                .join(model.Package, model.Package.id == model.Resource.package_id)
+                .where(model.Package.owner_org == organization_id)
+            )
+        )
+
+    if since := params.get("since"):
+        stmt = stmt.where(Report.created_at >= since)
+
+    if params.get("orphans_only"):
+        stmt = stmt.where(orphaned())
+
+    return stmt
+
+
+def orphaned() -> Any:
+    """Build the condition that matches reports of deleted or missing resources.
+
+    The subquery never correlates the resource table, so the condition can be
+    applied to statements that join resources themselves.
+
+    Returns:
+        SQL condition
+    """
+    return sa.and_(
+        Report.resource_id.isnot(None),
+        ~sa.exists()
+        .where(model.Resource.id == Report.resource_id, model.Resource.state == "active")
+        .correlate_except(model.Resource),
+    )
+
+
+def export_statement(params: dict[str, Any]) -> Any:
+    """Build a flat statement for exporting reports.
+
+    Package, resource and organization columns are joined in SQL, so the
+    consumer receives plain rows and never dictizes or loads related entities.
+
+    Args:
+        params: Report filters, see `report_filters`
+
+    Returns:
+        Select statement producing one row per report
+    """
+    stmt = (
+        sa.select(
+            Report.id,
+            Report.url,
+            Report.state,
+            Report.created_at,
+            Report.resource_id,
+            Report.details,
+            model.Resource.package_id,
+            model.Resource.name.label("resource_name"),
+            model.Package.name.label("package_name"),
+            model.Package.title.label("package_title"),
+            model.Package.owner_org.label("organization_id"),
+            model.Group.title.label("organization_title"),
+        )
+        .select_from(Report)
+        .outerjoin(model.Resource, model.Resource.id == Report.resource_id)
+        .outerjoin(model.Package, model.Package.id == model.Resource.package_id)
+        .outerjoin(model.Group, model.Group.id == model.Package.owner_org)
+    )
+
+    return report_filters(stmt, params).order_by(Report.created_at.desc())
+
+
+def stream_rows(stmt: Any, batch_size: int) -> Iterator[Row[Any]]:
+    """Iterate over the statement's rows using a server-side cursor.
+
+    Rows are fetched from the database in batches of `batch_size`, so memory
+    consumption does not depend on the total number of rows.
+
+    Args:
+        stmt: Select statement
+        batch_size: Number of rows fetched from the cursor at once
+
+    Yields:
+        Result rows
+    """
+    result: Iterable[Row[Any]] = model.Session.execute(stmt.execution_options(yield_per=batch_size))
+    yield from result
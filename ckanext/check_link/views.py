@@ -9,9 +9,10 @@ a web interface.
 from __future__ import annotations
 
 import csv
+from collections.abc import Iterable
 from typing import Any
 
-from flask import Blueprint
+from flask import Blueprint, Response, stream_with_context
 
 import ckan.plugins.toolkit as tk
 from ckan import model
@@ -19,6 +20,9 @@ from ckan.logic import parse_params
 
 from ckanext.collection import shared
 
+from . import cache, export, metrics, utils
+from .logic import schema
+
 # Define the columns for the CSV export of link check reports
 CSV_COLUMNS = [
     "Data Record title",
@@ -30,11 +34,32 @@ CSV_COLUMNS = [
     "Date and time checked",
 ]
 
+CONFIG_DEFERRED = "ckanext.check_link.report.deferred"
+DEFAULT_DEFERRED = False
+
+_PACKAGE_PLACEHOLDER = "check-link-package-id"
+_RESOURCE_PLACEHOLDER = "check-link-resource-id"
+
 bp = Blueprint("check_link", __name__)
 
 __all__ = ["bp"]
 
 
+@bp.route("/check-link/metrics")
+def metrics_endpoint():
+    """Expose metrics of the current process in Prometheus text format.
+
+    The endpoint is available only when enabled by the config option.
+
+    Returns:
+        Plain text response with metrics
+    """
+    if not metrics.enabled():
+        return tk.abort(404)
+
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
 @bp.route("/organization/<organization_id>/check-link/report")
 def organization_report(organization_id: str):
     """Display link check reports for a specific organization.
@@ -59,24 +84,26 @@ def organization_report(organization_id: str):
         return tk.abort(403)
 
     try:
-        org_dict = tk.get_action("organization_show")({}, {"id": organization_id})
+        org_dict = tk.get_action("organization_show")(
+            {},
+            {
+                "id": organization_id,
+                "include_extras": False,
+                "include_groups": False,
+                "include_users": False,
+            },
+        )
     except tk.ObjectNotFound:
         return tk.abort(404)
 
     col_name = "check-link-organization-report"
-    params: dict[str, Any] = {
-        f"{col_name}:attached_only": True,
-        f"{col_name}:exclude_state": ["available"],
-    }
-    params.update(parse_params(tk.request.args))
-    params[f"{col_name}:organization_id"] = org_dict["id"]
-
-    collection = shared.get_collection(col_name, params)
+    params = _collection_params(col_name, organization_id=org_dict["id"])
 
     return tk.render(
         "check_link/organization_report.html",
         {
-            "collection": collection,
+            "report": _page_report(cache.organization_scope(org_dict["id"]), col_name, params),
+            "report_url": tk.url_for("check_link.organization_report_table", organization_id=org_dict["id"]),
             "group_dict": org_dict,
             "group_type": org_dict["type"],
         },
@@ -112,17 +139,15 @@ def package_report(package_id: str):
         return tk.abort(404)
 
     col_name = "check-link-package-report"
-    params: dict[str, Any] = {
-        f"{col_name}:attached_only": True,
-        f"{col_name}:exclude_state": ["available"],
-    }
-    params.update(parse_params(tk.request.args))
-    params[f"{col_name}:package_id"] = pkg_dict["id"]
-    collection = shared.get_collection(col_name, params)
+    params = _collection_params(col_name, package_id=pkg_dict["id"])
 
     return tk.render(
         "check_link/package_report.html",
-        {"collection": collection, "pkg_dict": pkg_dict},
+        {
+            "report": _page_report(cache.package_scope(pkg_dict["id"]), col_name, params),
+            "report_url": tk.url_for("check_link.package_report_table", package_id=pkg_dict["id"]),
+            "pkg_dict": pkg_dict,
+        },
     )
 
 
@@ -154,25 +179,321 @@ def report(
         return tk.abort(403)
 
     col_name = "check-link-report"
-    params: dict[str, Any] = {
-        f"{col_name}:attached_only": True,
-        f"{col_name}:exclude_state": ["available"],
-    }
-    params.update(parse_params(tk.request.args))
-
-    collection = shared.get_collection(col_name, params)
+    params = _collection_params(col_name)
 
     base_template = "check_link/base_admin.html"
 
     return tk.render(
         "check_link/global_report.html",
         {
-            "collection": collection,
+            "report": _page_report(cache.GLOBAL, col_name, params),
+            "report_url": tk.url_for("check_link.report_table"),
             "base_template": base_template,
         },
     )
 
 
+@bp.route("/organization/<organization_id>/check-link/report/table")
+def organization_report_table(organization_id: str):
+    """Render the table and pager of the organization report.
+
+    Args:
+        organization_id: The ID or name of the organization
+
+    Returns:
+        HTML fragment with reports
+    """
+    try:
+        tk.check_access(
+            "check_link_view_report_page",
+            {"user": tk.g.user},
+            {"organization_id": organization_id},
+        )
+    except tk.NotAuthorized:
+        return tk.abort(403)
+
+    org = model.Group.get(organization_id)
+    if not org or not org.is_organization:
+        return tk.abort(404)
+
+    col_name = "check-link-organization-report"
+    params = _collection_params(col_name, organization_id=org.id)
+
+    return _render_report(cache.organization_scope(org.id), col_name, params)["fragment"]
+
+
+@bp.route("/dataset/<package_id>/check-link/report/table")
+def package_report_table(package_id: str):
+    """Render the table and pager of the package report.
+
+    Args:
+        package_id: The ID or name of the package
+
+    Returns:
+        HTML fragment with reports
+    """
+    try:
+        tk.check_access(
+            "check_link_view_report_page",
+            {"user": tk.g.user},
+            {"package_id": package_id},
+        )
+    except tk.NotAuthorized:
+        return tk.abort(403)
+
+    pkg = model.Package.get(package_id)
+    if not pkg:
+        return tk.abort(404)
+
+    col_name = "check-link-package-report"
+    params = _collection_params(col_name, package_id=pkg.id)
+
+    return _render_report(cache.package_scope(pkg.id), col_name, params)["fragment"]
+
+
+@bp.route("/check-link/report/global/table")
+def report_table():
+    """Render the table and pager of the global report.
+
+    Returns:
+        HTML fragment with reports
+    """
+    try:
+        tk.check_access(
+            "check_link_view_report_page",
+            {"user": tk.g.user},
+            {},
+        )
+    except tk.NotAuthorized:
+        return tk.abort(403)
+
+    col_name = "check-link-report"
+    params = _collection_params(col_name)
+
+    return _render_report(cache.GLOBAL, col_name, params)["fragment"]
+
+
+@bp.route("/organization/<organization_id>/check-link/report/export")
+def organization_report_export(organization_id: str):
+    """Stream link check reports of the organization as CSV.
+
+    Args:
+        organization_id: The ID or name of the organization
+
+    Returns:
+        Streaming CSV response
+    """
+    try:
+        tk.check_access(
+            "check_link_view_report_page",
+            {"user": tk.g.user},
+            {"organization_id": organization_id},
+        )
+    except tk.NotAuthorized:
+        return tk.abort(403)
+
+    org = model.Group.get(organization_id)
+    if not org or not org.is_organization:
+        return tk.abort(404)
+
+    col_name = "check-link-organization-report"
+    params = _collection_params(col_name, organization_id=org.id)
+
+    return _csv_response(f"check-link-{org.name}", _filters(col_name, params))
+
+
+@bp.route("/dataset/<package_id>/check-link/report/export")
+def package_report_export(package_id: str):
+    """Stream link check reports of the package as CSV.
+
+    Args:
+        package_id: The ID or name of the package
+
+    Returns:
+        Streaming CSV response
+    """
+    try:
+        tk.check_access(
+            "check_link_view_report_page",
+            {"user": tk.g.user},
+            {"package_id": package_id},
+        )
+    except tk.NotAuthorized:
+        return tk.abort(403)
+
+    pkg = model.Package.get(package_id)
+    if not pkg:
+        return tk.abort(404)
+
+    col_name = "check-link-package-report"
+    params = _collection_params(col_name, package_id=pkg.id)
+
+    return _csv_response(f"check-link-{pkg.name}", _filters(col_name, params))
+
+
+@bp.route("/check-link/report/global/export")
+def report_export():
+    """Stream global link check reports as CSV.
+
+    Returns:
+        Streaming CSV response
+    """
+    try:
+        tk.check_access(
+            "check_link_view_report_page",
+            {"user": tk.g.user},
+            {},
+        )
+    except tk.NotAuthorized:
+        return tk.abort(403)
+
+    col_name = "check-link-report"
+    params = _collection_params(col_name)
+
+    return _csv_response("check-link-report", _filters(col_name, params))
+
+
+@bp.route("/check-link/report/export")
+def export_reports():
+    """Stream reports in analytics-friendly format.
+
+    Filters are the same as in `check_link_report_search`. The `format`
+    parameter selects between NDJSON (default) and Parquet. Parquet files are
+    written in row groups and require the optional `pyarrow` dependency.
+
+    Returns:
+        Streaming NDJSON or Parquet response
+    """
+    context: Any = {"user": tk.g.user, "model": model, "session": model.Session}
+    try:
+        tk.check_access("check_link_report_search", context, {})
+    except tk.NotAuthorized:
+        return tk.abort(403)
+
+    data_dict, errors = tk.navl_validate(
+        dict(parse_params(tk.request.args)),
+        schema.report_export(),
+        context,
+    )
+    if errors:
+        return tk.abort(400, str(errors))
+
+    rows = utils.stream_rows(utils.export_statement(data_dict), export.batch_size())
+
+    if data_dict["format"] == "parquet":
+        if not export.parquet_available():
+            return tk.abort(400, tk._("Parquet export is not available"))
+
+        return Response(
+            stream_with_context(export.iter_parquet(rows, export.batch_size())),
+            mimetype="application/vnd.apache.parquet",
+            headers={"Content-Disposition": 'attachment; filename="check-link-report.parquet"'},
+        )
+
+    return Response(
+        stream_with_context(export.iter_ndjson(rows)),
+        mimetype="application/x-ndjson",
+    )
+
+
+def _collection_params(col_name: str, **extras: Any) -> dict[str, Any]:
+    """Compute parameters of the report collection from the current request.
+
+    Broken links are shown by default. Explicit filters from the query string
+    override the defaults, while `extras` define the scope of the report and
+    cannot be overridden.
+
+    Args:
+        col_name: Name of the collection
+        **extras: Scope of the report, e.g. package_id or organization_id
+
+    Returns:
+        Collection parameters prefixed by the name of the collection
+    """
+    params: dict[str, Any] = {
+        f"{col_name}:attached_only": True,
+        f"{col_name}:exclude_state": ["available"],
+    }
+    params.update(parse_params(tk.request.args))
+    params.update({f"{col_name}:{k}": v for k, v in extras.items()})
+    return params
+
+
+def _page_report(scope: str, col_name: str, params: dict[str, Any]) -> dict[str, Any] | None:
+    """Render the report collection for the full page unless loading is deferred.
+
+    When loading is deferred, the page is sent without reports and the table
+    is fetched by the `check-link-report` JS module from the table endpoint.
+
+    Args:
+        scope: Cache scope of the report page
+        col_name: Name of the collection
+        params: Collection parameters prefixed by the name of the collection
+
+    Returns:
+        Rendered report or None if it is loaded by the browser
+    """
+    if tk.asbool(tk.config.get(CONFIG_DEFERRED, DEFAULT_DEFERRED)):
+        return None
+
+    return _render_report(scope, col_name, params)
+
+
+def _render_report(scope: str, col_name: str, params: dict[str, Any]) -> dict[str, Any]:
+    """Render the report collection, reusing the cached result when possible.
+
+    Args:
+        scope: Cache scope of the report page
+        col_name: Name of the collection
+        params: Collection parameters prefixed by the name of the collection
+
+    Returns:
+        Dictionary with the rendered `fragment` and the `total` number of reports
+    """
+
+    def render() -> dict[str, Any]:
+        collection = shared.get_collection(col_name, params)
+        return {
+            "fragment": collection.serializer.serialize(),
+            "total": collection.data.total,
+        }
+
+    return cache.get_or_render(scope, params, render)
+
+
+def _filters(col_name: str, params: dict[str, Any]) -> dict[str, Any]:
+    """Extract report filters from the collection parameters.
+
+    Args:
+        col_name: Name of the collection
+        params: Collection parameters prefixed by the name of the collection
+
+    Returns:
+        Report filters without prefix
+    """
+    prefix = f"{col_name}:"
+    return {k[len(prefix) :]: v for k, v in params.items() if k.startswith(prefix)}
+
+
+def _csv_response(filename: str, filters: dict[str, Any]) -> Response:
+    """Build a streaming CSV response for the reports matching filters.
+
+    Args:
+        filename: Name of the downloaded file without extension
+        filters: Report filters, see `utils.report_filters`
+
+    Returns:
+        Streaming response with CSV content
+    """
+    rows = utils.stream_rows(utils.export_statement(filters), export.batch_size())
+
+    return Response(
+        stream_with_context(_stream_csv(rows)),
+        mimetype="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}.csv"'},
+    )
+
+
 class _FakeBuffer:
     """A fake buffer class for CSV writing that yields values instead of writing to a file.
 
@@ -195,47 +516,50 @@ class _FakeBuffer:
         return value
 
 
-def _stream_csv(reports: Any):
+def _stream_csv(rows: Iterable[Any]):
     """Generate CSV rows for the provided reports.
 
     This internal function generates CSV content for link check reports,
-    which can be used for exporting reports to CSV format. It includes
-    caching for organization data to improve performance.
+    which can be used for exporting reports to CSV format. It consumes flat
+    rows produced by `utils.export_statement`, so no per-row queries or
+    dictization happen while the content is streamed.
 
     Args:
-        reports: Iterable of report dictionaries to convert to CSV
+        rows: Iterable of report rows to convert to CSV
 
     Yields:
         CSV row strings formatted according to the defined column structure
     """
     writer = csv.writer(_FakeBuffer())
 
+    # Build the link to the resource page once and substitute identifiers for
+    # every row instead of resolving the route repeatedly
+    link_template = tk.url_for(
+        "resource.read",
+        id=_PACKAGE_PLACEHOLDER,
+        resource_id=_RESOURCE_PLACEHOLDER,
+        _external=True,
+    )
+
     # Write the header row
     yield writer.writerow(CSV_COLUMNS)
-    # Cache organization data to avoid repeated database queries
-    _org_cache = {}
 
-    for report in reports:
-        # Get the organization ID for this report
-        owner_org = report["details"]["package"]["owner_org"]
-        # Cache organization data to avoid repeated database queries
-        if owner_org not in _org_cache:
-            _org_cache[owner_org] = model.Group.get(owner_org)
+    for row in rows:
+        link = (
+            link_template.replace(_PACKAGE_PLACEHOLDER, row.package_id).replace(_RESOURCE_PLACEHOLDER, row.resource_id)
+            if row.resource_id
+            else row.url
+        )
 
         # Write the data row for this report
         yield writer.writerow(
             [
-                report["details"]["package"]["title"],
-                report["details"]["resource"]["name"] or "Unknown",
-                _org_cache[owner_org] and _org_cache[owner_org].title,
-                report["state"],
-                report["details"]["explanation"],
-                tk.url_for(
-                    "resource.read",
-                    id=report["package_id"],
-                    resource_id=report["resource_id"],
-                    _external=True,
-                ),
-                tk.h.render_datetime(report["created_at"], None, True),
+                row.package_title,
+                row.resource_name or "Unknown",
+                row.organization_title,
+                row.state,
+                row.details.get("explanation"),
+                link,
+                tk.h.render_datetime(row.created_at, None, True),
             ]
         )